@@ -10,6 +10,11 @@ timeout /t 1 /nobreak >nul
 :: Start the VBScript file
 start "" "wscript.exe" "%~dp0launcher.vbs"
 
+:: Wait for the lockscreen's ready event (set the moment its window is up)
+powershell -NoProfile -NonInteractive -Command "exit [int](-not (New-Object System.Threading.EventWaitHandle($false, 'ManualReset', 'Local\KeystrokeAuth.lockscreen.ready')).WaitOne(30000))" >nul 2>&1
+if "%ERRORLEVEL%"=="0" goto :restore_explorer
+
+:: No event (or it timed out): fall back to polling for the lock file
 :wait_for_lock
 timeout /t 1 /nobreak >nul
 if exist "%~dp0lockscreen.lock" (
@@ -19,7 +24,6 @@ if exist "%~dp0lockscreen.lock" (
 )
 
 :restore_explorer
-timeout /t 1 /nobreak >nul
 start explorer.exe
 
 :wait_explorer
@@ -0,0 +1,102 @@
+import numpy as np
+
+import model_store
+import scoring
+from running_stats import RunningIntervalStats
+
+# Opt-in settings, stored in the model under "adaptive_enrollment"
+DEFAULT_ADAPTATION_SETTINGS = {
+    "enabled": False,
+    "window_size": 30  # Most recent accepted attempts kept as training samples
+}
+
+# Hard cap on the rolling window. One update costs O(window * k) for the
+# statistics and rescaling plus O(window^2 * k) for the self-similarity,
+# so this bounds the work done after every successful unlock.
+MAX_WINDOW_SIZE = 200
+MIN_WINDOW_SIZE = 3
+
+
+def adaptation_settings(model):
+    """Return the adaptation settings of a model, filled in with the defaults"""
+    settings = dict(DEFAULT_ADAPTATION_SETTINGS)
+    settings.update(model.get("adaptive_enrollment") or {})
+    settings["window_size"] = min(max(int(settings["window_size"]), MIN_WINDOW_SIZE), MAX_WINDOW_SIZE)
+    return settings
+
+
+def _window_stats(model, window):
+    """Running statistics for the current window, restored from the model when available"""
+    m2 = model.get("interval_m2", None)
+    mean = model.get("scaler_mean", None)
+    # The restored state must describe exactly this window, not an earlier training set
+    if (m2 is not None and mean is not None and len(m2) == window.shape[1]
+            and model.get("interval_m2_count", None) == len(window)):
+        return RunningIntervalStats.from_state(len(window), mean, m2)
+    return RunningIntervalStats.from_samples(window)
+
+
+def adapt_model(model, intervals, path=model_store.ADAPTED_MODEL_PATH):
+    """
+    Fold an accepted attempt into the model's rolling window of training samples.
+
+    The statistics are updated in O(k) (one sample added, the evicted ones
+    taken back out), the window is rescaled, and the bounds, speed statistics
+    and self-similarity are recomputed. Only the adapted arrays are written,
+    atomically, to the sidecar next to the base model.
+
+    Args:
+        model: Binary model as returned by model_store.load_model(lazy=True)
+        intervals: Keystroke intervals of the accepted attempt
+
+    Returns:
+        Dictionary of the adapted values, or None when adaptation is disabled
+        or the attempt does not fit the model
+    """
+    settings = adaptation_settings(model)
+    if not settings["enabled"]:
+        return None
+
+    window = np.asarray(model.get("raw_training_data", []), dtype=np.float64)
+    sample = np.asarray(intervals, dtype=np.float64).reshape(-1)
+    if window.ndim != 2 or not len(window) or window.shape[1] != len(sample):
+        return None
+
+    stats = _window_stats(model, window)
+
+    # Oldest samples (the wizard's first) are evicted first
+    evict = max(0, len(window) + 1 - settings["window_size"])
+    stats.push(sample)
+    for old_sample in window[:evict]:
+        stats.remove(old_sample)
+    window = np.vstack((window[evict:], sample))
+
+    # Reverse updates accumulate rounding error, so start fresh once per window
+    adapted_samples = int(model.get("adapted_samples", 0)) + 1
+    if adapted_samples % settings["window_size"] == 0:
+        stats = RunningIntervalStats.from_samples(window)
+
+    scaler_mean, scaler_scale = stats.scaler()
+    scaled_window = (window - scaler_mean) / scaler_scale
+    self_similarities = scoring.self_similarities(scaled_window, 1)
+    lower_thresholds, upper_thresholds = stats.bounds()
+    avg_typing_speed, std_dev_typing_speed = stats.speed_stats(
+        scoring.interval_columns_for(model, window.shape[1]))
+
+    adapted = {
+        "scaler_mean": scaler_mean,
+        "scaler_scale": scaler_scale,
+        "train_data": scaled_window,
+        "raw_training_data": window,
+        "interval_lower_thresholds": lower_thresholds,
+        "interval_upper_thresholds": upper_thresholds,
+        "interval_m2": stats.m2,
+        "interval_m2_count": stats.count,
+        "avg_typing_speed": avg_typing_speed,
+        "std_dev_typing_speed": std_dev_typing_speed,
+        "avg_self_similarity": float(np.mean(self_similarities)),
+        "min_self_similarity": float(np.min(self_similarities)),
+        "adapted_samples": adapted_samples
+    }
+    model_store.write_adapted_model(model, adapted, path)
+    return adapted
@@ -0,0 +1,155 @@
+"""Detection latency vs wakeups of fixed and adaptive polling, replayed on a detector trace (python benchmarks/bench_adaptive_polling.py)"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import check_unlock
+import lock_probes
+
+UNLOCKED_PROCESSES = {4: "System", 900: "explorer.exe"}
+LOGONUI_PID = 1200
+CONSENT_PID = 1300
+
+
+def write_synthetic_trace(path, hours, locks_per_hour, uac_per_hour=0.0, glitches_per_hour=0.0, seed=1905):
+    """
+    Write the trace of a simulated working day in the format check_unlock.py --record writes.
+
+    While unlocked the user types now and then (idle time resets, foreground
+    window changes). A lock blanks the foreground, resets the idle time,
+    hides most windows and starts LogonUI; SESSION records mark it as the
+    ground truth. Optionally there are UAC prompts (consent.exe with a blank
+    foreground that returns a moment after it exits, sometimes followed by
+    a lock) and brief foreground glitches that are not locks.
+
+    Returns:
+        End of the trace in seconds
+    """
+    rng = random.Random(seed)
+    writer = lock_probes.TraceWriter(path, clock=lambda: 0.0)
+    end = hours * 3600
+
+    def start_process(t, pid, name):
+        writer.write(lock_probes.PROCESS_START, pid | writer.name_id(name, t) << 32, t)
+
+    def desktop(t, foreground, windows):
+        writer.write(lock_probes.FOREGROUND, foreground, t)
+        writer.write(lock_probes.IDLE, 0, t)
+        writer.write(lock_probes.WINDOWS, windows, t)
+
+    for pid, name in UNLOCKED_PROCESSES.items():
+        start_process(0.0, pid, name)
+
+    # Random events of each kind, merged in time order
+    events = []
+    for kind, per_hour in (("lock", locks_per_hour), ("uac", uac_per_hour), ("glitch", glitches_per_hour)):
+        t = 0.0
+        while per_hour > 0:
+            t += rng.expovariate(per_hour / 3600)
+            if t >= end:
+                break
+            events.append((t, kind))
+    events.sort()
+
+    t = 0.0
+    for event_time, kind in events:
+        if event_time < t:
+            continue  # Overlaps the previous event
+
+        # Activity bursts up to the event
+        while t < event_time:
+            desktop(t, 0x1000 + rng.randrange(8), 20 + rng.randrange(4))
+            t += rng.uniform(5, 120)
+        t = event_time
+
+        if kind == "uac":
+            # Secure desktop while consent.exe runs; the foreground comes back a little after it exits
+            desktop(t, 0, 20)
+            start_process(t, CONSENT_PID, "consent.exe")
+            t += rng.uniform(3, 20)
+            writer.write(lock_probes.PROCESS_STOP, CONSENT_PID, t)
+            t += rng.uniform(0.2, 4.0)
+            desktop(t, 0x1000 + rng.randrange(8), 20 + rng.randrange(4))
+            if rng.random() < 0.2:
+                # Approve, then lock the workstation straight away
+                t += rng.uniform(1, 10)
+                kind = "lock"
+        elif kind == "glitch":
+            # Foreground briefly blank while switching windows
+            writer.write(lock_probes.FOREGROUND, 0, t)
+            t += rng.uniform(0.05, 0.6)
+            writer.write(lock_probes.FOREGROUND, 0x1000 + rng.randrange(8), t)
+
+        if kind == "lock":
+            writer.write(lock_probes.SESSION, 1, t)
+            desktop(t, 0, 4)
+            start_process(t, LOGONUI_PID, "LogonUI.exe")
+            t += rng.uniform(60, 1800)
+            writer.write(lock_probes.PROCESS_STOP, LOGONUI_PID, t)
+            writer.write(lock_probes.SESSION, 0, t)
+            desktop(t, 0x1000 + rng.randrange(8), 20 + rng.randrange(4))
+        t += 1.0
+    desktop(end, 0x1000, 20)
+    writer.close()
+    return end
+
+
+def replay_trace(records, end, poll_settings=None, **detector_settings):
+    """Replay a trace through a fresh detector with these poll settings and attribute overrides"""
+    detector = check_unlock.LockDetector(poll_settings, probes=lock_probes.ReplayProbes(records))
+    for name, value in detector_settings.items():
+        setattr(detector, name, value)
+    result = lock_probes.replay(detector, records, end)
+    result["bound"] = detector.poll_scheduler.worst_case_latency(detector.confirmations_required)
+    return result
+
+
+def load_trace(args):
+    """Records and end time of --trace, or of a freshly generated synthetic trace"""
+    if args.trace:
+        _, records = lock_probes.read_trace(args.trace)
+        return records, records[-1][0] if records else 0.0
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "synthetic.trace")
+        end = write_synthetic_trace(path, args.hours, args.locks_per_hour,
+                                    getattr(args, "uac_per_hour", 0.0), getattr(args, "glitches_per_hour", 0.0))
+        _, records = lock_probes.read_trace(path)
+    return records, end
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trace", help="replay a trace recorded with check_unlock.py --record instead")
+    parser.add_argument("--hours", type=float, default=48)
+    parser.add_argument("--locks-per-hour", type=float, default=1.5)
+    parser.add_argument("--ceilings", type=float, nargs="+", default=[1.0, 2.0, 4.0])
+    args = parser.parse_args()
+    logging.getLogger('LockDetector').setLevel(logging.WARNING)
+
+    records, end = load_trace(args)
+    configurations = [("fixed 0.25 s", {"fast_interval": 0.25, "ceiling": 0.25})]
+    configurations += [(f"adaptive <= {ceiling:g} s", {"ceiling": ceiling}) for ceiling in args.ceilings]
+
+    print(f"{len(lock_probes.session_episodes(records, end))} locks over {end / 3600:g} h")
+    print(f"{'polling':>18} {'wakeups/h':>10} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'bound ms':>9} "
+          f"{'missed':>7} {'false':>6}")
+    failures = 0
+    for label, settings in configurations:
+        result = replay_trace(records, end, settings)
+        latencies = result["latencies"] or [0.0]
+        worst = latencies[-1]
+        ok = not result["missed"] and worst <= result["bound"] + 1e-9
+        failures += not ok
+        print(f"{label:>18} {result['polls_per_hour']:>10.0f} "
+              f"{latencies[len(latencies) // 2] * 1000:>8.0f} {latencies[int(len(latencies) * 0.95) - 1] * 1000:>8.0f} "
+              f"{worst * 1000:>8.0f} {result['bound'] * 1000:>9.0f} {result['missed']:>7} "
+              f"{result['false_triggers']:>6}{'' if ok else '  FAILED'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Tune confirmations_required and uac_cooldown by replaying a detector trace (python benchmarks/bench_detector_replay.py [--trace FILE])"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import check_unlock
+import lock_probes
+from bench_adaptive_polling import load_trace, replay_trace
+
+
+def check_round_trip(records, end):
+    """
+    Record a replayed run through RecordingProbes and replay the recording:
+    the detector must make the same decisions from it.
+
+    Returns:
+        (triggers of the original, triggers of the re-recording, recording size in bytes)
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "recorded.trace")
+        source = lock_probes.ReplayProbes(records)
+        writer = lock_probes.TraceWriter(path, clock=source.now)
+        probes = lock_probes.RecordingProbes(source, writer)
+        probes.advance = source.advance
+        detector = check_unlock.LockDetector(probes=probes)
+        original = lock_probes.replay(detector, records, end)["triggers"]
+        writer.close()
+
+        size = os.path.getsize(path)
+        _, recorded = lock_probes.read_trace(path)
+    again = replay_trace(recorded, end)["triggers"]
+    return original, again, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trace", help="trace recorded with check_unlock.py --record (default: a synthetic one)")
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--locks-per-hour", type=float, default=1.5)
+    parser.add_argument("--uac-per-hour", type=float, default=2.0)
+    parser.add_argument("--glitches-per-hour", type=float, default=6.0)
+    parser.add_argument("--confirmations", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--cooldowns", type=float, nargs="+", default=[0, 1, 3, 5, 10])
+    args = parser.parse_args()
+    logging.getLogger('LockDetector').setLevel(logging.WARNING)
+
+    records, end = load_trace(args)
+    episodes = lock_probes.session_episodes(records, end)
+    print(f"{len(records)} records, {len(episodes)} locks over {end / 3600:g} h")
+
+    original, again, size = check_round_trip(records, end)
+    print(f"round trip: {len(original)} triggers, {len(again)} from the re-recording ({size} bytes)")
+    failures = original != again
+
+    print(f"{'confirm':>7} {'cooldown s':>10} {'p50 ms':>8} {'max ms':>8} {'missed':>7} {'false':>6} {'polls/h':>8}")
+    for confirmations in args.confirmations:
+        for cooldown in args.cooldowns:
+            result = replay_trace(records, end, confirmations_required=confirmations, uac_cooldown=cooldown)
+            latencies = result["latencies"] or [0.0]
+            print(f"{confirmations:>7} {cooldown:>10g} {latencies[len(latencies) // 2] * 1000:>8.0f} "
+                  f"{latencies[-1] * 1000:>8.0f} {result['missed']:>7} {result['false_triggers']:>6} "
+                  f"{result['polls_per_hour']:>8.0f}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
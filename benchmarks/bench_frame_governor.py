@@ -0,0 +1,75 @@
+"""Simulated frame governor run: budget tracking, typing back-off and idle recovery (python benchmarks/bench_frame_governor.py)"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import frame_governor
+
+
+class FakeClock:
+    """Clock advanced by the simulation instead of real time"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def simulate(full_cost_ms, seconds, typing_start, typing_end, key_interval_s=0.2):
+    """
+    Run the governor against a machine whose frame cost scales with density.
+
+    Returns:
+        List of (time, density, fps mode) samples, one per frame, and the governor
+    """
+    clock = FakeClock()
+    governor = frame_governor.FrameGovernor({"log_interval_s": 1e9}, clock=clock)
+    next_key = typing_start
+    samples = []
+    while clock.now < seconds:
+        # Keys arriving between frames
+        while typing_start <= next_key < typing_end and next_key <= clock.now:
+            governor.note_key()
+            next_key += key_interval_s
+
+        start = clock.now
+        cost_ms = full_cost_ms * governor.density
+        clock.now += cost_ms / 1000
+        delay = governor.record_frame(start, cost_ms)
+        samples.append((start, governor.density, governor.typing))
+        clock.now += delay / 1000
+    return samples, governor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--costs", type=float, nargs="+", default=[2, 12, 30],
+                        help="frame cost in ms at full density (fast, medium, slow machine)")
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'full cost ms':>12} {'idle density':>12} {'typing density':>14} {'recovered':>10}  summary")
+    for full_cost in args.costs:
+        samples, governor = simulate(full_cost, args.seconds, typing_start=8, typing_end=12)
+        before = [density for t, density, typing in samples if 6 <= t < 8]
+        during = [density for t, density, typing in samples if 10 <= t < 12]
+        after = [density for t, density, typing in samples if t >= args.seconds - 2]
+        idle_density = max(before)
+        typing_density = max(during)
+        recovered = max(after)
+
+        # Typing must never show more than the idle level, and must stay capped
+        ok = (typing_density <= governor.settings["typing_density"] + 1e-9 and
+              typing_density <= idle_density and recovered == idle_density)
+        failures += not ok
+        print(f"{full_cost:>12.1f} {idle_density:>12.1f} {typing_density:>14.1f} {str(recovered == idle_density):>10}  "
+              f"{governor.summary()}{'' if ok else '  FAILED'}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
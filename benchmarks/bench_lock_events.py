@@ -0,0 +1,91 @@
+"""Event-driven LockDetector on simulated feeds: triggers, latency and wakeups (python benchmarks/bench_lock_events.py)"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import check_unlock
+import lock_events
+
+# A working day: lock for lunch, a UAC prompt, lock in the evening (delay_s, kind, data)
+DAY_SCRIPT = [
+    (3 * 3600, lock_events.SESSION_LOCK, {}),
+    (3600, lock_events.SESSION_UNLOCK, {}),
+    (1800, lock_events.PROCESS_START, {"name": "consent.exe", "pid": 4242}),
+    (5, lock_events.PROCESS_STOP, {"name": "consent.exe", "pid": 4242}),
+    (4 * 3600, lock_events.SESSION_LOCK, {}),
+    (600, lock_events.SESSION_UNLOCK, {})
+]
+EXPECTED_TRIGGERS = 2
+
+# Wakeups per hour of the previous detector: a full check every 0.25 s
+POLLING_WAKEUPS_PER_HOUR = 3600 / 0.25
+
+
+class RecordingDetector(check_unlock.LockDetector):
+    """LockDetector that records triggers instead of launching the lockscreen"""
+
+    def __init__(self):
+        super().__init__()
+        self.triggers = []
+
+    def trigger_lockscreen(self):
+        self.triggers.append(time.monotonic())
+
+
+def simulated_processes(table):
+    """PID list and name lookup over a mutable {pid: name} table"""
+    return (lambda: list(table), lambda pid: table.get(pid))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--speed", type=float, default=20000, help="simulated seconds per real second")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.getLogger('LockDetector').setLevel(logging.DEBUG if args.verbose else logging.WARNING)
+
+    # Session events from the script; the process watcher diffs a simulated process table
+    table = {4: "System", 1000: "explorer.exe", 1200: "LogonUI.exe"}
+    list_pids, name_of = simulated_processes(table)
+    watcher = lock_events.ProcessWatchSource(interval=0.01, list_pids=list_pids, name_of=name_of)
+    feed = lock_events.SimulatedSource(DAY_SCRIPT, speed=args.speed)
+    pipeline = lock_events.EventPipeline([feed, watcher])
+
+    detector = RecordingDetector()
+    lock_times = []
+    handle_event = detector.handle_event
+
+    def timed_handle_event(event):
+        if event.kind == lock_events.SESSION_LOCK:
+            lock_times.append(event.timestamp)
+        handle_event(event)
+        if event.kind == lock_events.SESSION_LOCK:
+            # The watcher never finishes on its own; stop it after the last scripted lock
+            if len(lock_times) == EXPECTED_TRIGGERS:
+                watcher.stopping.set()
+
+    detector.handle_event = timed_handle_event
+    start = time.perf_counter()
+    detector.run(pipeline)
+    elapsed = time.perf_counter() - start
+
+    latencies = [(trigger - lock) * 1000 for lock, trigger in zip(lock_times, detector.triggers)]
+    simulated_hours = sum(delay for delay, _, _ in DAY_SCRIPT) / 3600
+    event_wakeups = len(DAY_SCRIPT) / simulated_hours + 3600 / lock_events.PROCESS_WATCH_INTERVAL
+
+    print(f"simulated {simulated_hours:.1f} h in {elapsed:.2f} s")
+    print(f"triggers: {len(detector.triggers)} (expected {EXPECTED_TRIGGERS}), "
+          f"lock -> trigger latency: {', '.join(f'{latency:.3f} ms' for latency in latencies)}")
+    print(f"UAC cooldown armed by process event: {detector.uac_detected_time is not None}")
+    print(f"wakeups / hour: polling {POLLING_WAKEUPS_PER_HOUR:.0f} full checks, "
+          f"event-driven ~{event_wakeups:.0f} (PID diffs only, no window or name scans)")
+
+    ok = len(detector.triggers) == EXPECTED_TRIGGERS and detector.uac_detected_time is not None
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
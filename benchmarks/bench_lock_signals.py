@@ -0,0 +1,117 @@
+"""Short-circuiting lock signals vs evaluating all of them, on a simulated desktop (python benchmarks/bench_lock_signals.py)"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import check_unlock
+from process_snapshot import ProcessSnapshot
+
+
+def busy_wait(microseconds):
+    end = time.perf_counter() + microseconds / 1e6
+    while time.perf_counter() < end:
+        pass
+
+
+class SimulatedDesktop:
+    """
+    Desktop state per cycle: mostly unlocked, with occasional locks and UAC prompts.
+
+    Probe costs are emulated with busy waits so the timing statistics are meaningful.
+    """
+
+    def __init__(self, cycles, seed=1905, window_scan_us=300, process_scan_us=800):
+        rng = random.Random(seed)
+        self.window_scan_us = window_scan_us
+        self.process_scan_us = process_scan_us
+        self.states = []
+        idle = 0
+        state = "unlocked"
+        for _ in range(cycles):
+            roll = rng.random()
+            if state == "unlocked" and roll < 0.005:
+                state = "locking"
+            elif state == "locking":
+                state = "locked"
+            elif state == "locked" and roll < 0.05:
+                state = "unlocked"
+            elif state == "unlocked" and roll < 0.01:
+                state = "uac"
+            elif state == "uac" and roll < 0.3:
+                state = "unlocked"
+            idle = 0 if state == "locking" else idle + 250
+            self.states.append({
+                "foreground": 0 if state in ("locking", "locked", "uac") else 0x1000 + rng.randrange(4),
+                "idle": idle,
+                "windows": 4 if state in ("locking", "locked") else 20 + rng.randrange(3),
+                "processes": {4: "System", 900: "explorer.exe"} | (
+                    {1200: "LogonUI.exe"} if state in ("locking", "locked") else {}) | (
+                    {1300: "consent.exe"} if state == "uac" else {})
+            })
+        self.cycle = 0
+
+    @property
+    def state(self):
+        return self.states[self.cycle]
+
+
+class SimulatedDetector(check_unlock.LockDetector):
+    """LockDetector whose probes read the simulated desktop"""
+
+    def __init__(self, desktop, short_circuit):
+        super().__init__()
+        self.desktop = desktop
+        self.signals.short_circuit = short_circuit
+
+        def list_pids():
+            busy_wait(desktop.process_scan_us)
+            return list(desktop.state["processes"])
+
+        self.processes = ProcessSnapshot(list_pids, lambda pid: desktop.state["processes"].get(pid))
+
+    def get_foreground_window(self):
+        return self.desktop.state["foreground"]
+
+    def get_idle_time(self):
+        return self.desktop.state["idle"]
+
+    def get_window_count(self):
+        busy_wait(self.desktop.window_scan_us)
+        return self.desktop.state["windows"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cycles", type=int, default=4000)
+    args = parser.parse_args()
+    logging.getLogger('LockDetector').setLevel(logging.WARNING)
+
+    decisions = {}
+    for short_circuit in (False, True):
+        desktop = SimulatedDesktop(args.cycles)
+        detector = SimulatedDetector(desktop, short_circuit)
+        results = []
+        start = time.perf_counter()
+        for cycle in range(args.cycles):
+            desktop.cycle = cycle
+            results.append(detector.is_lock_condition())
+        elapsed = (time.perf_counter() - start) * 1000
+        decisions[short_circuit] = results
+
+        print(f"{'short-circuit' if short_circuit else 'evaluate all'}: {elapsed / args.cycles * 1000:.0f} us / cycle, "
+              f"{sum(results)} locked cycles")
+        for row in detector.signals.stats():
+            print(f"    {row['name']:>18} {row['total_ms']:>8.1f} ms  run {row['calls']:>5}  "
+                  f"skipped {row['skipped']:>5}  fired {row['hits']:>5}")
+
+    mismatches = sum(a != b for a, b in zip(decisions[False], decisions[True]))
+    print(f"cycles with a different decision: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Detector time spent launching the lockscreen, with a stand-in lockscreen process (python benchmarks/bench_lockscreen_launch.py)"""
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import lockscreen_launcher
+
+
+class StandInLauncher(lockscreen_launcher.LockscreenLauncher):
+    """Launches a Python process that stays up for a while instead of Lockscreen.exe"""
+
+    def __init__(self, up_seconds):
+        super().__init__(sys.executable, lock_file=os.devnull)
+        self.up_seconds = up_seconds
+
+    def launch(self):
+        if self.running():
+            return False
+        self.child = subprocess.Popen([self.path, "-c", f"import time; time.sleep({self.up_seconds})"])
+        self.launches += 1
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--up", type=float, default=2.0, help="seconds the stand-in lockscreen stays up")
+    args = parser.parse_args()
+    logging.getLogger('LockDetector').setLevel(logging.WARNING)
+
+    # Blocking launch, as subprocess.run did before
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import time; time.sleep({args.up})"])
+    blocking_ms = (time.perf_counter() - start) * 1000
+
+    # Launcher: returns at once, later triggers while it is up are ignored, the exit is noticed
+    launcher = StandInLauncher(args.up)
+    start = time.perf_counter()
+    launched = launcher.launch()
+    launch_ms = (time.perf_counter() - start) * 1000
+
+    cycles = 0
+    duplicates = 0
+    while launcher.running():
+        duplicates += launcher.launch()
+        cycles += 1
+        time.sleep(0.05)
+    gone_after = time.perf_counter() - start
+
+    print(f"blocking run: detector stalled {blocking_ms:.0f} ms")
+    print(f"launcher: launch returned in {launch_ms:.1f} ms, {cycles} detector cycles while it was up, "
+          f"{duplicates} duplicate launches, exit noticed after {gone_after:.2f} s")
+    ok = launched and not duplicates and launch_ms < blocking_ms / 4 and cycles > 0
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
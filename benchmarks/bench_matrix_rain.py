@@ -0,0 +1,180 @@
+"""Frame time and canvas item churn of the matrix rain render modes and glyph kinds (python benchmarks/bench_matrix_rain.py)"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import glyph_atlas
+import matrix_rain
+
+RESOLUTIONS = {"1080p": (1920, 1080), "4k": (3840, 2160)}
+GLYPH_KINDS = ("text", "sprite")
+
+
+class StubAtlas:
+    """Glyph atlas stand-in for the stub canvas: rasterizes masks, but no PhotoImage (needs a display)"""
+
+    available = True
+
+    def __init__(self):
+        self.atlas = glyph_atlas.GlyphAtlas(rasterizer=glyph_atlas.default_rasterizer() or glyph_atlas.box_rasterizer)
+
+    def sprite(self, char, color, size, bold=False):
+        rgba = glyph_atlas.glyph_rgba(self.atlas.mask(char, size, bold), glyph_atlas.parse_color(color))
+        return glyph_atlas.png_bytes(rgba)
+
+
+class CountingCanvas:
+    """Stand-in for tk.Canvas that counts calls and item allocations (no display needed)"""
+
+    def __init__(self):
+        self.next_item = 1
+        self.live_items = 0
+        self.calls = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def create_text(self, x, y, **options):
+        self._count("create_text")
+        self.live_items += 1
+        self.next_item += 1
+        return self.next_item - 1
+
+    def create_image(self, x, y, **options):
+        self._count("create_image")
+        self.live_items += 1
+        self.next_item += 1
+        return self.next_item - 1
+
+    def delete(self, *tags):
+        self._count("delete")
+        self.live_items = 0
+
+    def coords(self, item, *coordinates):
+        self._count("coords")
+
+    def itemconfig(self, item, **options):
+        self._count("itemconfig")
+
+    def move(self, tag, dx, dy):
+        self._count("move")
+
+    def update_idletasks(self):
+        pass
+
+
+def make_canvas(backend, width, height):
+    """Counting stub, or a real Tk canvas when a display is available"""
+    if backend == "stub":
+        return CountingCanvas(), None
+    import tkinter as tk
+    root = tk.Tk()
+    root.geometry(f"{width}x{height}")
+    canvas = tk.Canvas(root, width=width, height=height, bg='black', highlightthickness=0)
+    canvas.pack()
+    root.update()
+    return canvas, root
+
+
+def make_atlas(glyphs, root):
+    """Glyph atlas for the sprite runs, None for text items"""
+    if glyphs == "text":
+        return None
+    if root is None:
+        return StubAtlas()
+    return glyph_atlas.GlyphAtlas(root)
+
+
+def run(backend, mode, glyphs, width, height, density, frames):
+    """Median/p95 frame time in ms and Tk calls per frame for one configuration"""
+    settings = {"char_set": "alphanumeric", "special_char": "o", "matrix_color": "lime",
+                "matrix_speed": 10, "matrix_density": density}
+    canvas, root = make_canvas(backend, width, height)
+    rain = matrix_rain.MatrixRain(canvas, settings, width, height, render_mode=mode,
+                                  atlas=make_atlas(glyphs, root))
+    rain.seed_initial_drops()
+    while rain.add_drops():
+        pass
+
+    # Warm up, then measure
+    for _ in range(3):
+        rain.frame()
+    if isinstance(canvas, CountingCanvas):
+        canvas.calls = {}
+
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        rain.frame()
+        if root is not None:
+            root.update_idletasks()  # Include Tk's redraw
+        samples.append((time.perf_counter() - start) * 1000)
+
+    calls = {}
+    if isinstance(canvas, CountingCanvas):
+        calls = {name: count / frames for name, count in canvas.calls.items()}
+    if root is not None:
+        root.destroy()
+    samples.sort()
+    return len(rain), statistics.median(samples), samples[int(len(samples) * 0.95) - 1], calls
+
+
+def simulation_report(width, height, density, frames):
+    """Simulation-only cost and memory per drop of the array state"""
+    settings = {"char_set": "alphanumeric", "special_char": "o", "matrix_color": "lime",
+                "matrix_speed": 10, "matrix_density": density}
+    rain = matrix_rain.MatrixRain(None, settings, width, height, seed=1905)
+    rain.seed_initial_drops()
+    while rain.add_drops():
+        pass
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        rain.step()
+    step_ms = (time.perf_counter() - start) * 1000 / frames
+
+    array_bytes = sum(array.itemsize for array in (rain.x, rain.y, rain.speed, rain.glyph, rain.special, rain.items,
+                                                      rain.level))
+    # The previous representation: one dict per drop
+    drop = {'x': 1915, 'y': 1000, 'speed': 7, 'char': 'a'}
+    dict_bytes = sys.getsizeof(drop) + sum(sys.getsizeof(value) for value in (1915, 1000))
+    return len(rain), step_ms, array_bytes, dict_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", choices=("stub", "tk"), default="stub",
+                        help="stub counts canvas calls without a display, tk draws on a real canvas")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--modes", nargs="+", default=list(matrix_rain.RENDER_MODES))
+    parser.add_argument("--glyphs", nargs="+", default=list(GLYPH_KINDS),
+                        help="text items, or image items from the glyph atlas")
+    parser.add_argument("--densities", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS))
+    args = parser.parse_args()
+
+    print(f"{'resolution':>10} {'density':>7} {'mode':>11} {'glyphs':>7} {'drops':>7} {'median ms':>10} {'p95 ms':>8}  "
+          f"canvas calls / frame")
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+        for density in args.densities:
+            for mode in args.modes:
+                for glyphs in args.glyphs:
+                    drops, median, p95, calls = run(args.backend, mode, glyphs, width, height, density, args.frames)
+                    churn = ", ".join(f"{name} {count:.0f}" for name, count in sorted(calls.items()))
+                    print(f"{resolution:>10} {density:>7} {mode:>11} {glyphs:>7} {drops:>7} {median:>10.2f} "
+                          f"{p95:>8.2f}  {churn}")
+
+    print(f"\n{'resolution':>10} {'density':>7} {'drops':>7} {'step ms':>8}  bytes / drop")
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+        for density in args.densities:
+            drops, step_ms, array_bytes, dict_bytes = simulation_report(width, height, density, args.frames)
+            print(f"{resolution:>10} {density:>7} {drops:>7} {step_ms:>8.3f}  {array_bytes} (dict per drop: ~{dict_bytes})")
+
+
+if __name__ == "__main__":
+    main()
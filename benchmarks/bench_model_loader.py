@@ -0,0 +1,92 @@
+"""Tk-thread stalls while the lockscreen loads its model, on the Tk thread vs the background loader (python benchmarks/bench_model_loader.py)"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import model_store
+from bench_model_loading import make_model
+
+# Runs in a fresh interpreter so numpy and the model modules are imported cold, like at lockscreen start
+SCENARIO = """
+import json, sys, threading, time, tkinter
+sys.path.insert(0, {root!r})
+import model_loader
+
+interp = tkinter.Tcl()  # Tk event loop without a display
+main_thread = threading.get_ident()
+tick_ms = 5
+lateness = []
+state = {{"loaded_at": None, "callback_thread": None, "waiter_ran": False}}
+start = time.perf_counter()
+
+def tick(expected):
+    now = time.perf_counter()
+    lateness.append((now - expected) * 1000)
+    interp.after(tick_ms, tick, now + tick_ms / 1000)
+
+def loaded(future):
+    future.result()
+    state["loaded_at"] = (time.perf_counter() - start) * 1000
+    state["callback_thread"] = threading.get_ident()
+
+def load_on_tk_thread():
+    model_loader.load_model_data({path!r})
+    state["loaded_at"] = (time.perf_counter() - start) * 1000
+    state["callback_thread"] = threading.get_ident()
+
+interp.after(tick_ms, tick, start + tick_ms / 1000)
+if {mode!r} == "background":
+    future = model_loader.BackgroundLoader(interp).submit(model_loader.load_model_data, {path!r})
+    future.add_done_callback(loaded)
+    # An Enter press before the model is in waits for it
+    future.add_done_callback(lambda f: state.update(waiter_ran=state["loaded_at"] is not None))
+else:
+    interp.after(0, load_on_tk_thread)
+    state["waiter_ran"] = True
+
+while state["loaded_at"] is None or time.perf_counter() - start < state["loaded_at"] / 1000 + 0.1:
+    interp.update()
+    time.sleep(0.0005)
+print(json.dumps({{"max_stall_ms": max(lateness), "loaded_ms": state["loaded_at"],
+                  "on_tk_thread": state["callback_thread"] == main_thread, "waiter_ran": state["waiter_ran"]}}))
+"""
+
+
+def run(mode, path):
+    code = SCENARIO.format(root=ROOT, path=path, mode=mode)
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True, cwd=ROOT)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--features", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "typing_model.ktm")
+        model_store.write_binary_model(make_model(np.random.default_rng(1905), args.samples, args.features), path)
+
+        for mode in ("tk-thread", "background"):
+            results = [run(mode, path) for _ in range(args.runs)]
+            stall = sorted(result["max_stall_ms"] for result in results)[len(results) // 2]
+            loaded = sorted(result["loaded_ms"] for result in results)[len(results) // 2]
+            ok = all(result["on_tk_thread"] and result["waiter_ran"] for result in results)
+            failures += not ok
+            print(f"{mode:>10}: longest Tk stall {stall:6.1f} ms, model ready after {loaded:6.1f} ms, "
+                  f"callbacks on the Tk thread: {'yes' if ok else 'NO'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
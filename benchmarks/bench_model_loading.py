@@ -0,0 +1,112 @@
+"""Compare loading a pickled model with the binary model container (python benchmarks/bench_model_loading.py)"""
+import argparse
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import model_store
+
+
+def make_model(rng, num_samples, num_features):
+    """Build a synthetic model dictionary in the compiled layout"""
+    raw = rng.uniform(0.08, 0.35, size=(num_samples, num_features))
+    mean, scale = model_store.fit_scaler(raw)
+    std = raw.std(axis=0)
+    return {
+        "password": "x" * (num_features + 1),
+        "threshold": 70,
+        "security_level": "high",
+        "security_questions": {"What was your pet's name?": "rex"},
+        "matrix_settings": {"char_set": "alphanumeric", "special_char": "o", "matrix_color": "lime",
+                            "matrix_speed": 10, "matrix_density": 5},
+        "scaler_mean": mean,
+        "scaler_scale": scale,
+        "train_data": (raw - mean) / scale,
+        "raw_training_data": raw,
+        "interval_lower_thresholds": mean - 1.5 * std,
+        "interval_upper_thresholds": mean + 1.5 * std,
+        "avg_typing_speed": float(mean.mean()),
+        "std_dev_typing_speed": float(std.mean()),
+        "avg_self_similarity": 0.45,
+        "min_self_similarity": 0.30
+    }
+
+
+def time_calls(function, repeat):
+    """Median wall time of a call in microseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def time_cold(code, repeat):
+    """Median wall time of a fresh interpreter running code, in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=ROOT)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=5, help="training samples in the model")
+    parser.add_argument("--features", type=int, default=9, help="intervals per attempt")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--cold-repeat", type=int, default=5, help="fresh interpreter runs per format")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1905)
+    model = make_model(rng, args.samples, args.features)
+
+    with tempfile.TemporaryDirectory() as directory:
+        pickle_path = os.path.join(directory, "typing_model.pkl")
+        binary_path = os.path.join(directory, "typing_model.ktm")
+        with open(pickle_path, "wb") as model_file:
+            pickle.dump(model, model_file)
+        model_store.write_binary_model(model, binary_path)
+
+        def load_pickle():
+            with open(pickle_path, "rb") as model_file:
+                pickle.load(model_file)
+
+        def open_binary():
+            model_store.BinaryModel(binary_path)
+
+        def open_binary_and_map():
+            binary_model = model_store.BinaryModel(binary_path)
+            for key in model_store.ARRAY_KEYS:
+                if key in binary_model:
+                    binary_model[key]
+
+        print(f"model: {args.samples} samples x {args.features} features, "
+              f"pickle {os.path.getsize(pickle_path)} B, binary {os.path.getsize(binary_path)} B")
+        print(f"pickle.load:                    {time_calls(load_pickle, args.repeat):8.1f} us")
+        print(f"binary open (metadata only):    {time_calls(open_binary, args.repeat):8.1f} us")
+        print(f"binary open + map all arrays:   {time_calls(open_binary_and_map, args.repeat):8.1f} us")
+        print(f"load_model (in-memory copy):    "
+              f"{time_calls(lambda: model_store.load_model(binary_path), args.repeat):8.1f} us")
+
+        if args.cold_repeat:
+            cold_pickle = time_cold(
+                f"import pickle; pickle.load(open({pickle_path!r}, 'rb'))", args.cold_repeat)
+            cold_binary = time_cold(
+                f"import model_store; model_store.load_model({binary_path!r}, lazy=True)", args.cold_repeat)
+            print(f"cold process, pickle:           {cold_pickle:8.1f} ms")
+            print(f"cold process, binary (lazy):    {cold_binary:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
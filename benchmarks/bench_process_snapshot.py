@@ -0,0 +1,113 @@
+"""Process lookups per detector cycle: one scan per lookup vs the shared snapshot (python benchmarks/bench_process_snapshot.py)"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from process_snapshot import ProcessSnapshot
+
+# Lookups is_lock_condition makes per cycle (LogonUI, UAC)
+LOOKUPS = ("logonui.exe", "consent.exe")
+
+
+class SimulatedProcessTable:
+    """
+    Process table with churn; name queries cost like a process open (busy-wait).
+
+    Like Windows, freed PIDs are handed out again, so a new process
+    (consent.exe included) often lands on the PID of one that just exited.
+    """
+
+    def __init__(self, size, name_cost_us, seed=1905, reuse_rate=0.5):
+        self.rng = random.Random(seed)
+        self.name_cost = name_cost_us / 1e6
+        self.reuse_rate = reuse_rate
+        self.next_pid = 100
+        self.launches = 0
+        self.freed = []
+        self.table = {}    # pid -> name
+        self.created = {}  # pid -> launch number (stands in for the creation time)
+        for _ in range(size):
+            self.spawn(f"proc{self.next_pid}.exe")
+
+    def spawn(self, name):
+        if self.freed and self.rng.random() < self.reuse_rate:
+            pid = self.freed.pop(self.rng.randrange(len(self.freed)))
+        else:
+            pid = self.next_pid
+            self.next_pid += 4
+        self.launches += 1
+        self.table[pid] = name
+        self.created[pid] = self.launches
+        return pid
+
+    def exit(self, pid):
+        del self.table[pid]
+        del self.created[pid]
+        self.freed.append(pid)
+
+    def churn(self):
+        """A few processes exit and start, and consent.exe comes and goes"""
+        for pid in self.rng.sample(sorted(self.table), 2):
+            self.exit(pid)
+        consent = [pid for pid, name in self.table.items() if name == "consent.exe"]
+        if consent:
+            self.exit(consent[0])
+        elif self.rng.random() < 0.1:
+            self.spawn("consent.exe")
+        for _ in range(2):
+            self.spawn(f"proc{self.launches}.exe")
+
+    def pids(self):
+        return list(self.table)
+
+    def created_of(self, pid):
+        return self.created.get(pid)
+
+    def name_of(self, pid):
+        end = time.perf_counter() + self.name_cost
+        while time.perf_counter() < end:
+            pass
+        return self.table.get(pid)
+
+    def scan_running(self, name):
+        """The previous lookup: a name query for every process"""
+        return any((self.name_of(pid) or "").lower() == name for pid in self.pids())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=250)
+    parser.add_argument("--cycles", type=int, default=200)
+    parser.add_argument("--name-cost-us", type=float, default=5.0)
+    args = parser.parse_args()
+
+    table = SimulatedProcessTable(args.processes, args.name_cost_us)
+    table.spawn("LogonUI.exe")
+    snapshot = ProcessSnapshot(table.pids, table.name_of, table.created_of)
+
+    scan_seconds = snapshot_seconds = 0.0
+    mismatches = 0
+    for _ in range(args.cycles):
+        table.churn()
+
+        start = time.perf_counter()
+        expected = [table.scan_running(name) for name in LOOKUPS]
+        scan_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        snapshot.begin_cycle()
+        actual = [snapshot.running(name) for name in LOOKUPS]
+        snapshot_seconds += time.perf_counter() - start
+        mismatches += expected != actual
+
+    print(snapshot.summary())
+    print(f"per cycle: scan per lookup {scan_seconds / args.cycles * 1000:.2f} ms, "
+          f"snapshot {snapshot_seconds / args.cycles * 1000:.3f} ms, mismatching cycles {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Cost of the composited matrix rain backend, with Tk's frame decode when a display is available (python benchmarks/bench_rain_compositor.py)"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tkinter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import glyph_atlas
+import matrix_rain
+import rain_compositor
+
+RESOLUTIONS = {"1080p": (1920, 1080), "4k": (3840, 2160)}
+
+
+def make_compositor(width, height, density):
+    """Full-density rain drawn by a compositor, with real glyphs if a rasterizer is installed"""
+    settings = {"char_set": "alphanumeric", "special_char": "o", "matrix_color": "lime",
+                "matrix_speed": 10, "matrix_density": density}
+    rain = matrix_rain.MatrixRain(None, settings, width, height, seed=1905)
+    rain.seed_initial_drops()
+    while rain.add_drops():
+        pass
+    atlas = glyph_atlas.GlyphAtlas(rasterizer=glyph_atlas.default_rasterizer() or glyph_atlas.box_rasterizer)
+    return rain_compositor.RainCompositor(rain, atlas, width, height)
+
+
+def render_times(compositor, frames):
+    """Median and p95 worker time per frame in ms"""
+    for _ in range(3):
+        compositor.render()
+    samples = []
+    for _ in range(frames):
+        compositor.render()
+        samples.append(compositor.render_ms)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def make_photo(width, height):
+    """A PhotoImage to present into, or None without a display"""
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError:
+        return None
+    root.withdraw()
+    return tkinter.PhotoImage(master=root, width=width, height=height)
+
+
+def present_times(compositor, photo, frames):
+    """Median and p95 Tk-thread time of present() in ms (PPM decode into the photo included)"""
+    samples = []
+    for _ in range(frames):
+        compositor.render()
+        start = time.perf_counter()
+        compositor.present(photo)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main_thread_lateness(compositor, seconds, photo=None, fps=20):
+    """
+    p95 lateness in ms of 1 ms timers on the main thread, with and without the worker drawing at fps.
+
+    Stands in for keystroke handling on the Tk thread. With a photo the main
+    thread also presents every frame, as the lockscreen's animation loop
+    does, so Tk's decode counts; headless only the worker's competition for
+    the GIL is measured.
+    """
+    def lateness(animate):
+        samples = []
+        next_frame = time.perf_counter()
+        end = next_frame + seconds
+        while time.perf_counter() < end:
+            if animate and time.perf_counter() >= next_frame:
+                if photo is not None:
+                    compositor.present(photo)
+                else:
+                    compositor.wake.set()
+                next_frame += 1 / fps
+            start = time.perf_counter()
+            time.sleep(0.001)
+            samples.append((time.perf_counter() - start - 0.001) * 1000)
+        samples.sort()
+        return samples[int(len(samples) * 0.95) - 1]
+
+    idle = lateness(False)
+    compositor.start()
+    busy = lateness(True)
+    compositor.stop()
+    return idle, busy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--densities", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS))
+    parser.add_argument("--latency-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{'resolution':>10} {'density':>7} {'drops':>7} {'render ms':>10} {'p95 ms':>8} "
+          f"{'present ms':>10} {'p95 ms':>8} {'main p95 late ms (idle / animating)':>36}")
+    headless = False
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+        photo = make_photo(width, height)
+        headless = photo is None
+        for density in args.densities:
+            compositor = make_compositor(width, height, density)
+            median, p95 = render_times(compositor, args.frames)
+            if photo is not None:
+                present = "{:>10.2f} {:>8.2f}".format(*present_times(compositor, photo, args.frames))
+            else:
+                present = f"{'n/a':>10} {'n/a':>8}"
+            idle, busy = main_thread_lateness(compositor, args.latency_seconds, photo)
+            print(f"{resolution:>10} {density:>7} {len(compositor.rain):>7} {median:>10.2f} {p95:>8.2f} "
+                  f"{present} {idle:>19.2f} / {busy:.2f}")
+        if photo is not None:
+            photo.tk.call("destroy", ".")
+    if headless:
+        print("no display: present() (Tk's PPM decode on the Tk thread) was not measured")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Time from a process announcing ready to a waiter waking up, vs the old lock file polling (python benchmarks/bench_readiness.py)"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import readiness
+
+# Announces ready after a delay and prints the wall time it did so
+SIGNALLER = """
+import sys, time
+sys.path.insert(0, {root!r})
+import readiness
+channel = readiness.ReadinessChannel({name!r}, {directory!r})
+time.sleep({delay})
+print(repr(time.time()), flush=True)
+channel.signal(readiness.READY)
+time.sleep(0.5)  # Keep the named events alive while the waiter wakes
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--delay", type=float, default=0.3, help="seconds before the signaller announces ready")
+    parser.add_argument("--old-interval", type=float, default=1.0, help="polling interval being replaced (0.bat: 1 s)")
+    args = parser.parse_args()
+
+    latencies = []
+    with tempfile.TemporaryDirectory() as directory:
+        for run in range(args.runs):
+            name = f"bench{os.getpid()}_{run}"
+            channel = readiness.ReadinessChannel(name, directory)
+            code = SIGNALLER.format(root=ROOT, name=name, directory=directory, delay=args.delay)
+            signaller = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+            woke = channel.wait(readiness.READY, timeout=10)
+            woke_at = time.time()
+            signalled_at = float(signaller.stdout.readline())
+            signaller.wait()
+            channel.close()
+            if not woke:
+                print(f"run {run}: timed out")
+                sys.exit(1)
+            latencies.append(woke_at - signalled_at)
+
+    latencies.sort()
+    transport = "named events" if readiness.win32event is not None else "state file fallback"
+    print(f"{transport}: median {latencies[len(latencies) // 2] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms "
+          f"over {args.runs} runs")
+    print(f"old polling every {args.old_interval:g} s: {args.old_interval * 500:.0f} ms on average, "
+          f"up to {args.old_interval * 1000:.0f} ms")
+    sys.exit(0 if latencies[-1] < args.old_interval / 2 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Headless benchmark for the scoring engine (python benchmarks/bench_scoring.py)"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scoring
+
+
+def make_model(rng, num_samples, num_features):
+    """Build a synthetic compiled model shaped like the wizard's output"""
+    raw = rng.uniform(0.08, 0.35, size=(num_samples, num_features))
+    mean = raw.mean(axis=0)
+    std = raw.std(axis=0)
+    scale = np.where(std == 0, 1.0, std)
+    compiled = scoring.CompiledModel(
+        mean=mean,
+        scale=scale,
+        train_data=(raw - mean) / scale,
+        lower_bounds=mean - 1.5 * std,
+        upper_bounds=mean + 1.5 * std,
+        avg_typing_speed=float(mean.mean()),
+        std_dev_typing_speed=max(float(std.mean()), 0.01),
+        avg_self_similarity=0.45
+    )
+    return compiled, raw
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--attempts", type=int, default=100000)
+    parser.add_argument("--samples", type=int, default=5, help="training samples in the model")
+    parser.add_argument("--features", type=int, default=9, help="intervals per attempt")
+    parser.add_argument("--single", type=int, default=2000, help="attempts to score one by one")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1905)
+    compiled, raw = make_model(rng, args.samples, args.features)
+    attempts = raw[rng.integers(0, len(raw), args.attempts)] + rng.normal(0, 0.04, (args.attempts, args.features))
+
+    # Warm up
+    scoring.verify_batch(compiled, attempts[:100])
+
+    start = time.perf_counter()
+    for row in attempts[:args.single]:
+        scoring.score_attempt(compiled, row)
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = scoring.verify_batch(compiled, attempts)
+    batch_time = time.perf_counter() - start
+
+    print(f"model: {args.samples} samples x {args.features} features")
+    print(f"score_attempt: {args.single} attempts in {single_time * 1000:.1f} ms "
+          f"({single_time / args.single * 1e6:.1f} us/attempt)")
+    print(f"verify_batch:  {args.attempts} attempts in {batch_time * 1000:.1f} ms "
+          f"({batch_time / args.attempts * 1e6:.2f} us/attempt)")
+    print(f"accepted: {int(result['accepted'].sum())}/{args.attempts}")
+
+
+if __name__ == "__main__":
+    main()
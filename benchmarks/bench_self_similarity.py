@@ -0,0 +1,92 @@
+"""Check and time the leave-one-out self-similarity computation (python benchmarks/bench_self_similarity.py)"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import model_store
+import scoring
+
+
+def similarity_score(test_features, train_features, avg_self_similarity):
+    """Per-row similarity exactly as the training wizard computed it before"""
+    distances = [np.linalg.norm(test_features - train_sample)
+                 for train_sample in train_features]
+    avg_distance = np.mean(distances)
+    similarity = avg_self_similarity / (avg_self_similarity + avg_distance)
+    return max(0.0, min(similarity, 1.0))
+
+
+def reference_self_similarities(scaled_train_data):
+    """The original np.delete loop from process_training_data"""
+    self_similarities = []
+    for i in range(len(scaled_train_data)):
+        test_sample = scaled_train_data[i:i+1]
+        remaining_samples = np.delete(scaled_train_data, i, axis=0)
+        self_similarities.append(similarity_score(test_sample, remaining_samples, 1))
+    return self_similarities
+
+
+def make_training_data(rng, num_samples, num_features):
+    """Scaled training matrix with a few duplicated rows to exercise zero distances"""
+    raw = rng.uniform(0.08, 0.35, size=(num_samples, num_features))
+    if num_samples > 3:
+        raw[1] = raw[0]
+    mean, scale = model_store.fit_scaler(raw)
+    return (raw - mean) / scale
+
+
+def check_equivalence(rng, sizes, num_features, tolerance):
+    """Compare avg/min self-similarity with the original loop, return the largest error"""
+    worst = 0.0
+    for num_samples in sizes:
+        scaled = make_training_data(rng, num_samples, num_features)
+        expected = reference_self_similarities(scaled)
+        actual = scoring.self_similarities(scaled, 1)
+
+        errors = (
+            np.max(np.abs(actual - np.array(expected))),
+            abs(np.mean(actual) - np.mean(expected)),
+            abs(np.min(actual) - np.min(expected))
+        )
+        worst = max(worst, *errors)
+        if max(errors) > tolerance:
+            print(f"MISMATCH for {num_samples} samples: max error {max(errors):.3e}")
+            return None
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=500, help="training samples to time")
+    parser.add_argument("--features", type=int, default=9, help="intervals per attempt")
+    parser.add_argument("--tolerance", type=float, default=1e-12)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1905)
+
+    worst = check_equivalence(rng, [2, 3, 5, 10, 37, 120], args.features, args.tolerance)
+    if worst is None:
+        sys.exit(1)
+    print(f"equivalence: ok (largest difference {worst:.3e})")
+
+    scaled = make_training_data(rng, args.samples, args.features)
+
+    start = time.perf_counter()
+    reference_self_similarities(scaled)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scoring.self_similarities(scaled, 1)
+    matrix_time = time.perf_counter() - start
+
+    print(f"{args.samples} samples x {args.features} features")
+    print(f"np.delete loop:  {loop_time * 1000:9.1f} ms")
+    print(f"distance matrix: {matrix_time * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
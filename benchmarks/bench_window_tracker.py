@@ -0,0 +1,182 @@
+"""Window tracker (notified and enumerating) vs a full EnumWindows scan per count, on a synthetic window list (python benchmarks/bench_window_tracker.py)"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import window_tracker
+
+
+def busy_wait(microseconds):
+    end = time.perf_counter() + microseconds / 1e6
+    while time.perf_counter() < end:
+        pass
+
+
+class SyntheticWindowSource(window_tracker.WindowSource):
+    """
+    Top-level windows of a desktop that changes a little every cycle:
+    windows open (hidden first, shown a cycle later) and close, get hidden
+    and shown, and now and then gain or lose their title.
+
+    Call costs are emulated with busy waits: GetWindowText is a message
+    round trip to the owning thread, IsWindowVisible a style check. Once
+    subscribed, every change is notified, except for a drop_rate share
+    that is lost (the tracker's periodic resync has to catch those).
+    """
+
+    def __init__(self, windows, seed=1905, title_us=15, visible_us=0.5, enum_us=0.2, drop_rate=0.0):
+        self.rng = random.Random(seed)
+        self.drop_rng = random.Random(seed + 1)  # Separate, so the desktop changes the same either way
+        self.drop_rate = drop_rate
+        self.notify = None
+        self.title_us = title_us
+        self.visible_us = visible_us
+        self.enum_us = enum_us
+        self.next_hwnd = 0x10000
+        self.state = {}  # hwnd -> [visible, has_title]
+        self.pending_show = []
+        for _ in range(windows):
+            self.state[self.new_hwnd()] = [self.rng.random() < 0.15, self.rng.random() < 0.8]
+
+    def new_hwnd(self):
+        self.next_hwnd += 2
+        return self.next_hwnd
+
+    def changed(self, hwnd):
+        if self.notify is not None and self.drop_rng.random() >= self.drop_rate:
+            self.notify(hwnd)
+
+    def step(self):
+        """Apply one cycle of changes"""
+        rng = self.rng
+        for hwnd in self.pending_show:
+            if hwnd in self.state:
+                self.state[hwnd] = [True, True]
+                self.changed(hwnd)
+        self.pending_show = []
+        if rng.random() < 0.05:
+            hwnd = self.new_hwnd()
+            self.state[hwnd] = [False, False]
+            self.pending_show.append(hwnd)
+            self.changed(hwnd)
+        if rng.random() < 0.05:
+            hwnd = rng.choice(list(self.state))
+            del self.state[hwnd]
+            self.changed(hwnd)
+        if rng.random() < 0.1:
+            hwnd = rng.choice(list(self.state))
+            self.state[hwnd][0] ^= True
+            self.changed(hwnd)
+        if rng.random() < 0.01:
+            hwnd = rng.choice(list(self.state))
+            self.state[hwnd][1] ^= True
+            self.changed(hwnd)
+
+    def handles(self):
+        busy_wait(self.enum_us * len(self.state))
+        return list(self.state)
+
+    def is_visible(self, hwnd):
+        busy_wait(self.visible_us)
+        return self.state[hwnd][0]
+
+    def has_title(self, hwnd):
+        busy_wait(self.title_us)
+        return self.state[hwnd][1]
+
+    def exists(self, hwnd):
+        return hwnd in self.state
+
+    def subscribe(self, notify):
+        self.notify = notify
+        return True
+
+    def unsubscribe(self):
+        self.notify = None
+
+    def full_scan_count(self):
+        """What the old EnumWindows callback counted"""
+        return sum(1 for hwnd in self.handles() if self.is_visible(hwnd) and self.has_title(hwnd))
+
+
+def run(args, notifications):
+    """
+    Count the windows every cycle with a full scan and with the tracker.
+
+    Returns:
+        (full scan s, tracker s, tracker, stale cycles, longest stale run)
+    """
+    source = SyntheticWindowSource(args.windows, drop_rate=args.drop_rate)
+    tracker = window_tracker.WindowTracker(source, notifications=notifications)
+    full_s = 0.0
+    tracked_s = 0.0
+    mismatches = 0
+    stale_run = 0
+    worst_stale_run = 0
+    for _ in range(args.cycles):
+        source.step()
+
+        start = time.perf_counter()
+        expected = source.full_scan_count()
+        full_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        counted = tracker.count()
+        tracked_s += time.perf_counter() - start
+
+        # Enumerating, only title changes of windows that stay visible may be missed until the
+        # next title recheck; notified, only dropped notifications until the next resync
+        if counted != expected:
+            mismatches += 1
+            stale_run += 1
+            worst_stale_run = max(worst_stale_run, stale_run)
+        else:
+            stale_run = 0
+    return full_s, tracked_s, tracker, mismatches, worst_stale_run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--windows", type=int, default=400)
+    parser.add_argument("--cycles", type=int, default=2000)
+    parser.add_argument("--drop-rate", type=float, default=0.01, help="share of window notifications lost")
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{args.windows} windows, {args.cycles} cycles")
+
+    # The hooks are only set by the first count, and changes pile up in a bounded set however long counts stop
+    source = SyntheticWindowSource(args.windows)
+    tracker = window_tracker.WindowTracker(source)
+    subscribed_early = source.notify is not None
+    tracker.count()
+    for _ in range(args.cycles * 10):
+        source.step()
+    dirty = len(tracker.dirty)
+    overflowed = tracker.overflowed
+    tracker.stop()
+    ok = not subscribed_early and dirty <= window_tracker.MAX_DIRTY_WINDOWS and source.notify is None
+    failures += not ok
+    print(f"lifecycle: subscribed before the first count: {subscribed_early}, "
+          f"{dirty} dirty windows after {args.cycles * 10} uncounted cycles"
+          f"{' (bound reached, next count enumerates)' if overflowed else ''}, "
+          f"unsubscribed by stop(): {source.notify is None}{'' if ok else '  FAILED'}")
+    for notifications, bound in ((False, window_tracker.TITLE_RECHECK_REFRESHES),
+                                 (True, window_tracker.RESYNC_COUNTS)):
+        full_s, tracked_s, tracker, mismatches, worst_stale_run = run(args, notifications)
+        ok = worst_stale_run <= bound
+        failures += not ok
+        print(f"{'notified' if notifications else 'enumerating'}:")
+        print(f"    full scan: {full_s / args.cycles * 1e3:.3f} ms / count")
+        print(f"    tracker:   {tracked_s / args.cycles * 1e3:.3f} ms / count")
+        print(f"    {tracker.summary()}")
+        print(f"    stale cycles: {mismatches}, longest run {worst_stale_run} (bound {bound})"
+              f"{'' if ok else '  FAILED'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
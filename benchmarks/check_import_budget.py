@@ -0,0 +1,142 @@
+"""Import cost of the lockscreen's GUI-free modules under python -X importtime, against a budget (python benchmarks/check_import_budget.py)"""
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCKSCREEN_PATH = os.path.join(ROOT, "lockscreen.py")
+
+# Budgets in ms: the repo modules lockscreen.py imports before its first frame,
+# and its DEFERRED_MODULES, loaded on the background thread after it
+STARTUP_BUDGET_MS = 80
+DEFERRED_BUDGET_MS = 400
+
+# Never wanted by the lockscreen (the startup group must not pull in the deferred modules either)
+HEAVY_MODULES = ("sklearn", "scipy", "PIL")
+
+# Prints what lockscreen defers and which of those importing it loaded anyway
+LOCKSCREEN_PROBE = ("import json, sys, lockscreen; print(json.dumps({"
+                    "'deferred': list(lockscreen.DEFERRED_MODULES), "
+                    "'loaded': [name for name in lockscreen.DEFERRED_MODULES if name in sys.modules]}))")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(modules):
+    """
+    Import the modules in a fresh interpreter.
+
+    Returns:
+        (cumulative ms of each requested module's top-level import, every module imported)
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    cumulative = {}
+    imported = set()
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, total_us, indent, name = match.groups()
+        imported.add(name)
+        if not indent.strip(" ") and len(indent) == 1 and name in modules:
+            cumulative[name] = int(total_us) / 1000
+    return cumulative, imported
+
+
+def deferred_from_source():
+    """DEFERRED_MODULES as written in lockscreen.py, for machines that cannot import it"""
+    with open(LOCKSCREEN_PATH, encoding="utf-8") as source:
+        tree = ast.parse(source.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == "DEFERRED_MODULES"
+                                                for target in node.targets):
+            return tuple(ast.literal_eval(node.value))
+    raise RuntimeError("lockscreen.py has no DEFERRED_MODULES")
+
+
+def lockscreen_modules():
+    """
+    Import lockscreen in a fresh interpreter.
+
+    Returns:
+        (its DEFERRED_MODULES, those already in sys.modules after the import),
+        the second None if lockscreen cannot be imported here (no pywin32 off Windows)
+    """
+    result = subprocess.run([sys.executable, "-c", LOCKSCREEN_PROBE], cwd=ROOT, capture_output=True, text=True)
+    if not result.returncode:
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        return tuple(report["deferred"]), report["loaded"]
+    error = result.stderr.strip().splitlines()[-1]
+    if not error.startswith(("ImportError", "ModuleNotFoundError")):
+        raise RuntimeError(error)
+    print(f"lockscreen cannot be imported here ({error}), reading DEFERRED_MODULES from its source")
+    return deferred_from_source(), None
+
+
+def startup_modules(deferred):
+    """Repo modules lockscreen.py imports at module level, except the deferred ones"""
+    with open(LOCKSCREEN_PATH, encoding="utf-8") as source:
+        tree = ast.parse(source.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module)
+    return tuple(name for name in dict.fromkeys(names)
+                 if name not in deferred and os.path.exists(os.path.join(ROOT, name + ".py")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per group (the fastest counts)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the budgets (slow machines)")
+    args = parser.parse_args()
+
+    failures = 0
+    deferred, loaded = lockscreen_modules()
+    if loaded is None:
+        print("import lockscreen: skipped")
+    else:
+        # The deferred modules must only be loaded by the background thread
+        failures += bool(loaded)
+        if loaded:
+            print(f"import lockscreen: loads {', '.join(loaded)}  FAILED")
+        else:
+            print("import lockscreen: no deferred modules loaded")
+
+    groups = [
+        # Imported by lockscreen.py before its first frame
+        ("startup", startup_modules(deferred), STARTUP_BUDGET_MS, deferred + HEAVY_MODULES),
+        # Loaded on the background thread after the first frame (numpy is expected here, nothing heavier)
+        ("deferred", deferred, DEFERRED_BUDGET_MS, HEAVY_MODULES),
+    ]
+    for group, modules, budget_ms, forbidden in groups:
+        best = None
+        for _ in range(args.runs):
+            cumulative, imported = import_profile(modules)
+            if best is None or sum(cumulative.values()) < sum(best.values()):
+                best = cumulative
+        total = sum(best.values())
+        budget = budget_ms * args.scale
+        pulled_in = sorted(name for name in imported if name.split(".")[0] in forbidden)
+
+        ok = total <= budget and not pulled_in
+        failures += not ok
+        print(f"{group}: {total:.1f} ms (budget {budget:.0f} ms){'' if ok else '  FAILED'}")
+        for name, ms in sorted(best.items(), key=lambda item: item[1], reverse=True):
+            print(f"    {name:<20} {ms:>7.1f} ms")
+        if pulled_in:
+            print(f"    imports {', '.join(pulled_in)}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
-import win32gui
-import win32process
-import psutil
+import argparse
 import time
-import subprocess
 import logging
 from datetime import datetime, timedelta
-import ctypes
+
+import lock_events
+import lock_probes
+import lockscreen_launcher
+import lock_signals
+from process_snapshot import ProcessSnapshot
 
 # Configure logging
 logging.basicConfig(
@@ -18,11 +20,22 @@ logger = logging.getLogger('LockDetector')
 LOCKSCREEN_PATH = "Lockscreen.exe"
 
 class LockDetector:
-    def __init__(self):
+    def __init__(self, poll_settings=None, probes=None, warm_lockscreen=False, always_poll=False):
+        # Desktop probes: the real Windows APIs, or a recording/replaying stand-in
+        self.probes = probes or lock_probes.WindowsProbes()
+        
+        # Starts the lockscreen in the background (optionally keeping a hidden one ready)
+        self.launcher = lockscreen_launcher.LockscreenLauncher(LOCKSCREEN_PATH, warm=warm_lockscreen)
+        
         self.lock_detected = False
         self.lock_confirmation_counter = 0
         self.confirmations_required = 2  # Reduced to 2 for faster response
-        self.check_interval = 0.25  # Check 4 times per second for better responsiveness
+        
+        # Fallback polling when there are no session notifications: 4 times per second
+        # around lock precursors, backing off to the ceiling while the desktop is stable
+        self.poll_scheduler = lock_events.AdaptivePollScheduler(poll_settings)
+        # Poll even with session notifications (recording a trace needs the probe samples)
+        self.always_poll = always_poll
         
         # UAC detection
         self.uac_detected_time = None
@@ -36,134 +49,137 @@ class LockDetector:
         self.last_foreground_window = None
         self.last_idle_time = 0
         self.last_window_count = 0
+        self.current_foreground = None
+        self.current_idle_time = 0
+        self.last_lock_score = 0
+        
+        # Lock score needed to count a cycle as locked, and the cost-ordered signals that make it up
+        self.lock_threshold = 2
+        self.signals = self.build_signals()
+        
+        # Process names, enumerated at most once per detection cycle
+        self.processes = ProcessSnapshot(self.probes.pids, self.probes.process_name, self.probes.process_created)
+        self.stats_log_interval = 3600  # Log the snapshot and signal counters every this many polls
         
         logger.info(f"Enhanced Lock Detector started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         logger.info(f"Using lockscreen executable: {LOCKSCREEN_PATH}")
 
     def get_idle_time(self):
         """Get system idle time in milliseconds."""
-        class LASTINPUTINFO(ctypes.Structure):
-            _fields_ = [
-                ('cbSize', ctypes.c_uint),
-                ('dwTime', ctypes.c_uint),
-            ]
-        
-        lastInputInfo = LASTINPUTINFO()
-        lastInputInfo.cbSize = ctypes.sizeof(lastInputInfo)
-        if ctypes.windll.user32.GetLastInputInfo(ctypes.byref(lastInputInfo)):
-            millis = ctypes.windll.kernel32.GetTickCount() - lastInputInfo.dwTime
-            return millis
-        return 0
+        return self.probes.idle_time_ms()
+
+    def get_foreground_window(self):
+        """Handle of the foreground window (0 while the secure desktop is up)."""
+        return self.probes.foreground_window()
 
     def get_window_count(self):
         """Count the number of visible windows."""
-        def callback(hwnd, windows):
-            if win32gui.IsWindowVisible(hwnd) and win32gui.GetWindowText(hwnd):
-                windows.append(hwnd)
-            return True
-            
-        windows = []
-        win32gui.EnumWindows(callback, windows)
-        return len(windows)
+        return self.probes.window_count()
 
     def is_uac_active(self):
         """Check if UAC (User Account Control) is active."""
         # Check for consent.exe which is the UAC process
-        for proc in psutil.process_iter(['name']):
-            try:
-                if proc.info['name'].lower() == 'consent.exe':
-                    logger.debug("UAC process detected (consent.exe)")
-                    self.uac_detected_time = datetime.now()
-                    return True
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
+        if self.processes.running('consent.exe'):
+            logger.debug("UAC process detected (consent.exe)")
+            self.uac_detected_time = self.probes.now()
+            return True
         return False
 
     def detect_logon_ui(self):
         """Check if LogonUI.exe is running (appears during lock screens)."""
-        for proc in psutil.process_iter(['name']):
-            try:
-                if proc.info['name'].lower() == 'logonui.exe':
-                    return True
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
+        return self.processes.running('logonui.exe')
+
+    def foreground_zero(self):
+        """No foreground window (strong indicator)"""
+        if self.current_foreground == 0:
+            logger.debug("Foreground window is 0")
+            return True
         return False
 
-    def is_lock_condition(self):
+    def foreground_changed(self):
+        """Foreground window suddenly changed to 0"""
+        if (self.last_foreground_window is not None and
+                self.last_foreground_window != 0 and
+                self.current_foreground == 0):
+            logger.debug("Foreground window suddenly changed to 0")
+            return True
+        return False
+
+    def idle_time_reset(self):
+        """Sudden drop of the idle time (happens with Win+L)"""
+        if self.last_idle_time > 1000 and self.current_idle_time < 500:
+            logger.debug(f"Idle time reset: {self.last_idle_time} -> {self.current_idle_time}")
+            return True
+        return False
+
+    def window_count_dropped(self):
         """
-        Enhanced detection for Windows+L lock events
+        Visible window count fell below 70% of the previous count.
+
+        Only runs when the cheaper signals leave the outcome open, so the
+        previous count is the last one measured, not necessarily last cycle's.
         """
-        # Get current foreground window
-        current_foreground = win32gui.GetForegroundWindow()
-        foreground_zero = (current_foreground == 0)
-        
-        # Get current idle time
-        current_idle_time = self.get_idle_time()
-        
-        # Check for sudden changes in idle time (happens with Win+L)
-        idle_time_reset = False
-        if self.last_idle_time > 1000 and current_idle_time < 500:
-            idle_time_reset = True
-            logger.debug(f"Idle time reset: {self.last_idle_time} -> {current_idle_time}")
-            
-        # Update last idle time
-        self.last_idle_time = current_idle_time
-        
-        # Get window count for additional validation
         current_window_count = self.get_window_count()
-        window_count_changed = False
-        
-        if self.last_window_count > 0 and current_window_count < self.last_window_count * 0.7:
-            window_count_changed = True
+        dropped = self.last_window_count > 0 and current_window_count < self.last_window_count * 0.7
+        if dropped:
             logger.debug(f"Window count changed: {self.last_window_count} -> {current_window_count}")
-            
         self.last_window_count = current_window_count
-        
-        # Track sudden foreground window change
-        foreground_changed = (self.last_foreground_window is not None and 
-                            self.last_foreground_window != 0 and
-                            current_foreground == 0)
-                            
-        # Update last foreground window
-        self.last_foreground_window = current_foreground
-        
-        # LogonUI.exe check for additional confirmation
-        logon_ui_running = self.detect_logon_ui()
-        
-        # Check if UAC is active
-        if self.is_uac_active():
-            return False
-            
-        # Check if we're within the UAC cooldown period
+        return dropped
+
+    def logon_ui_running(self):
+        """LogonUI.exe is running (supplemental indicator)"""
+        if self.detect_logon_ui():
+            logger.debug("LogonUI.exe is running")
+            return True
+        return False
+
+    def in_uac_cooldown(self):
+        """Within the cooldown after a UAC prompt"""
         if self.uac_detected_time:
-            elapsed = (datetime.now() - self.uac_detected_time).total_seconds()
+            elapsed = self.probes.now() - self.uac_detected_time
             if elapsed < self.uac_cooldown:
                 logger.debug(f"Within UAC cooldown period ({elapsed:.1f}s < {self.uac_cooldown}s)")
-                return False
+                return True
+        return False
+
+    def build_signals(self):
+        """Lock indicators with their weights and declared costs, and the UAC vetoes"""
+        return lock_signals.SignalPipeline(
+            [
+                lock_signals.Signal("foreground_zero", 2, lock_signals.COST_TRIVIAL, self.foreground_zero),
+                lock_signals.Signal("foreground_changed", 1, lock_signals.COST_TRIVIAL, self.foreground_changed),
+                lock_signals.Signal("idle_time_reset", 1, lock_signals.COST_TRIVIAL, self.idle_time_reset),
+                lock_signals.Signal("window_count", 1, lock_signals.COST_WINDOW_SCAN, self.window_count_dropped),
+                lock_signals.Signal("logon_ui", 1, lock_signals.COST_PROCESS_SCAN, self.logon_ui_running)
+            ],
+            threshold=self.lock_threshold,
+            vetoes=[
+                lock_signals.Signal("uac_cooldown", 0, lock_signals.COST_TRIVIAL, self.in_uac_cooldown),
+                lock_signals.Signal("uac_active", 0, lock_signals.COST_PROCESS_SCAN, self.is_uac_active)
+            ]
+        )
+
+    def is_lock_condition(self):
+        """
+        Enhanced detection for Windows+L lock events
+        """
+        # All process lookups of this cycle share one snapshot
+        self.processes.begin_cycle()
         
-        # Calculate a lock score based on indicators
-        lock_score = 0
+        # Cheap observations, read once per cycle; the signals compare them with the last cycle's
+        self.current_foreground = self.get_foreground_window()
+        self.current_idle_time = self.get_idle_time()
         
-        if foreground_zero:
-            lock_score += 2  # Strong indicator
-            logger.debug("Foreground window is 0")
-            
-        if foreground_changed:
-            lock_score += 1  # Moderate indicator
-            logger.debug("Foreground window suddenly changed to 0")
-            
-        if idle_time_reset:
-            lock_score += 1  # Moderate indicator
-            
-        if logon_ui_running:
-            lock_score += 1  # Supplemental indicator
-            logger.debug("LogonUI.exe is running")
-            
-        if window_count_changed:
-            lock_score += 1  # Supplemental indicator
+        # Cheapest signals first, stopping as soon as the score is decided
+        lock_score, vetoed = self.signals.evaluate()
+        self.last_lock_score = lock_score
+        
+        # Update last foreground window and idle time
+        self.last_foreground_window = self.current_foreground
+        self.last_idle_time = self.current_idle_time
         
-        # Determine if locked based on score
-        is_locked = lock_score >= 2
+        # Determine if locked based on score (a UAC prompt vetoes it)
+        is_locked = lock_score >= self.lock_threshold and not vetoed
         
         if is_locked:
             logger.debug(f"Lock condition detected (score: {lock_score})")
@@ -173,62 +189,159 @@ class LockDetector:
     def trigger_lockscreen(self):
         """Trigger the lockscreen executable with safety checks."""
         # Check the time since last trigger
-        current_time = time.time()
+        current_time = self.probes.now()
         if current_time - self.last_trigger_time < self.min_trigger_interval:
             logger.debug("Skipping trigger - too soon since last trigger")
             return
             
         logger.info("🔒 LOCK CONFIRMED - Triggering lockscreen application")
+        self.probes.note_trigger()
         try:
-            subprocess.run([LOCKSCREEN_PATH], shell=True)
-            self.last_trigger_time = current_time
+            # Returns at once: detection goes on while the lockscreen is up
+            if self.launcher.launch():
+                self.last_trigger_time = current_time
         except Exception as e:
             logger.error(f"Error triggering lockscreen: {e}")
 
-    def run(self):
-        """Main detector loop."""
+    def log_stats(self):
+        """Log the process snapshot, signal and probe counters"""
+        logger.info(self.processes.summary())
+        logger.info(self.signals.summary())
+        probe_summary = self.probes.summary()
+        if probe_summary:
+            logger.info(probe_summary)
+
+    def poll(self):
+        """Evaluate the heuristic lock signals (fallback when there are no session notifications)"""
+        # Check lock condition
+        current_lock = self.is_lock_condition()
+        
+        if self.processes.cycles % self.stats_log_interval == 0:
+            self.log_stats()
+        
+        if current_lock:
+            # Increment confirmation counter
+            self.lock_confirmation_counter += 1
+            
+            if self.lock_confirmation_counter == 1:
+                logger.debug("Initial lock detection - starting confirmation")
+                
+            # Only trigger after enough consecutive lock detections
+            if self.lock_confirmation_counter >= self.confirmations_required and not self.lock_detected:
+                self.lock_detected = True
+                self.trigger_lockscreen()
+        else:
+            # Reset detection state if not locked
+            if self.lock_confirmation_counter > 0:
+                logger.debug(f"Lock state ended after {self.lock_confirmation_counter} confirmations")
+                
+            self.lock_confirmation_counter = 0
+            self.lock_detected = False
+            
+        # Poll fast while anything looks like an unconfirmed lock, back off otherwise
+        # (once the lockscreen has been triggered there is nothing left to hurry for)
+        precursor = self.last_lock_score > 0 or self.lock_confirmation_counter > 0
+        self.poll_scheduler.observe(precursor and not self.lock_detected)
+
+    def handle_event(self, event):
+        """Update the detection state from one event of the pipeline"""
+        if event.kind == lock_events.SESSION_LOCK:
+            # Windows says so: no scoring or confirmation needed
+            logger.debug("Session lock notification")
+            self.probes.note_session(True)
+            if not self.lock_detected:
+                self.lock_detected = True
+                self.trigger_lockscreen()
+        elif event.kind == lock_events.SESSION_UNLOCK:
+            logger.debug("Session unlock notification")
+            self.probes.note_session(False)
+            self.lock_detected = False
+            self.lock_confirmation_counter = 0
+        elif event.kind == lock_events.PROCESS_START:
+            if event.data["name"] == 'consent.exe':
+                # UAC prompt: start the cooldown even if no poll sees consent.exe
+                logger.debug("UAC process started (consent.exe)")
+                self.uac_detected_time = self.probes.now()
+            elif event.data["name"] == 'logonui.exe':
+                logger.debug("LogonUI.exe started")
+                self.poll_scheduler.hurry()  # Precursor: check the other signals now
+        elif event.kind == lock_events.PROCESS_STOP:
+            logger.debug(f"{event.data['name']} exited")
+        elif event.kind == lock_events.POLL:
+            self.poll_scheduler.poll_queued = False  # The source may queue the next one
+            self.poll()
+
+    def default_pipeline(self):
+        """Session notifications and the process watcher, with polling as the fallback (or always)"""
+        return lock_events.EventPipeline(
+            [lock_events.SessionNotificationSource(), lock_events.ProcessWatchSource()],
+            fallback=lock_events.PollingSource(self.poll_scheduler),
+            always_poll=self.always_poll
+        )
+
+    def run(self, pipeline=None):
+        """
+        Main detector loop: consume events until stopped (or a simulated feed runs out).
+
+        Args:
+            pipeline: lock_events.EventPipeline to consume, default_pipeline() if None
+        """
+        pipeline = pipeline or self.default_pipeline()
         try:
-            # Initialize with current window state
-            self.last_foreground_window = win32gui.GetForegroundWindow()
-            self.last_idle_time = self.get_idle_time()
-            self.last_window_count = self.get_window_count()
+            logger.info(f"Event sources: {', '.join(pipeline.start())}")
             
-            logger.info(f"Initial state: foreground={self.last_foreground_window}, idle={self.last_idle_time}ms, windows={self.last_window_count}")
+            # Initialize with current window state, only needed (and only paid for) when polling:
+            # the first window count sets system-wide window hooks
+            if self.probes.available and pipeline.polling:
+                self.last_foreground_window = self.get_foreground_window()
+                self.last_idle_time = self.get_idle_time()
+                self.last_window_count = self.get_window_count()
+                
+                logger.info(f"Initial state: foreground={self.last_foreground_window}, idle={self.last_idle_time}ms, windows={self.last_window_count}")
             
             while True:
-                try:
-                    # Check lock condition
-                    current_lock = self.is_lock_condition()
-                    
-                    if current_lock:
-                        # Increment confirmation counter
-                        self.lock_confirmation_counter += 1
-                        
-                        if self.lock_confirmation_counter == 1:
-                            logger.debug("Initial lock detection - starting confirmation")
-                            
-                        # Only trigger after enough consecutive lock detections
-                        if self.lock_confirmation_counter >= self.confirmations_required and not self.lock_detected:
-                            self.lock_detected = True
-                            self.trigger_lockscreen()
-                    else:
-                        # Reset detection state if not locked
-                        if self.lock_confirmation_counter > 0:
-                            logger.debug(f"Lock state ended after {self.lock_confirmation_counter} confirmations")
-                            
-                        self.lock_confirmation_counter = 0
-                        self.lock_detected = False
-                    
-                    # Sleep for the check interval
-                    time.sleep(self.check_interval)
+                self.launcher.update()
+                event = pipeline.get(timeout=1.0)
+                if event is None:
+                    if pipeline.exhausted:
+                        break
+                    continue
                     
+                try:
+                    self.handle_event(event)
                 except Exception as e:
-                    logger.error(f"Error in detection cycle: {e}")
-                    time.sleep(5)  # Longer delay after error
+                    # Back off the polling, not this loop: session events must still be handled at once
+                    delay = self.poll_scheduler.failed()
+                    logger.error(f"Error in detection cycle: {e} (polling again in {delay:.1f}s)")
                     
         except KeyboardInterrupt:
             logger.info("Lock detector stopped by user")
+        finally:
+            pipeline.stop()
+            self.probes.close()
+            self.launcher.stop()
+            if self.processes.cycles:
+                self.log_stats()
 
 if __name__ == "__main__":
-    detector = LockDetector()
-    detector.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Launch the lockscreen when the workstation is locked")
+    parser.add_argument("--record", metavar="TRACE",
+                        help="also write every probe change to a binary trace (replay it with benchmarks/bench_detector_replay.py)")
+    parser.add_argument("--warm", action="store_true",
+                        help="keep a hidden lockscreen running and only signal it to show on lock")
+    args = parser.parse_args()
+    
+    probes = None
+    writer = None
+    if args.record:
+        writer = lock_probes.TraceWriter(args.record)
+        probes = lock_probes.RecordingProbes(lock_probes.WindowsProbes(), writer)
+        logger.info(f"Recording probe trace to {args.record}")
+    
+    # A trace without polls has no probe samples to replay, so poll even when Windows reports locks
+    detector = LockDetector(probes=probes, warm_lockscreen=args.warm, always_poll=writer is not None)
+    try:
+        detector.run()
+    finally:
+        if writer is not None:
+            writer.close()
\ No newline at end of file
@@ -0,0 +1,147 @@
+import logging
+import time
+from array import array
+
+# Defaults, overridable per model under matrix_settings["frame_governor"]
+DEFAULT_GOVERNOR_SETTINGS = {
+    "target_fps": 20,            # Frame rate while idle (the old fixed 50 ms interval)
+    "frame_budget_ms": 8.0,      # Main-thread time one frame may take
+    "typing_fps": 10,            # Frame rate while a password is being typed
+    "typing_density": 0.5,       # Highest share of the drops shown while typing
+    "min_density": 0.2,          # Never thin the rain out beyond this share
+    "idle_after_ms": 1500,       # Typing mode ends this long after the last key
+    "log_interval_s": 30         # How often fps and frame-time percentiles are logged
+}
+
+# Density moves in tenths, one step per frame that misses (or comfortably makes) the budget
+DENSITY_LEVELS = 10
+
+# Frame cost must stay below this share of the budget before density is raised again
+HEADROOM = 0.6
+
+# Frame costs kept for the percentiles (a few seconds of frames)
+HISTORY_SIZE = 256
+
+
+def governor_settings(matrix_settings):
+    """Return the governor settings of the matrix settings, filled in with the defaults"""
+    settings = dict(DEFAULT_GOVERNOR_SETTINGS)
+    settings.update((matrix_settings or {}).get("frame_governor") or {})
+    return settings
+
+
+class FrameGovernor:
+    """
+    Paces the matrix rain from measured frame cost.
+
+    After each frame the caller reports how long it took on the Tk thread.
+    The governor answers with the delay until the next frame, so the frame
+    period stays on target instead of adding the frame cost on top, and with
+    a density level (tenths of the drops to show). Density drops a level
+    whenever a frame exceeds the budget and recovers once frames are well
+    inside it. While the user is typing both the frame rate and the density
+    are capped so keystroke handling is not starved; they come back once the
+    keyboard has been idle for a moment.
+    """
+
+    def __init__(self, settings=None, clock=time.perf_counter):
+        self.settings = dict(DEFAULT_GOVERNOR_SETTINGS)
+        self.settings.update(settings or {})
+        self.clock = clock
+
+        self.density_level = DENSITY_LEVELS
+        self.min_level = max(1, round(self.settings["min_density"] * DENSITY_LEVELS))
+        self.typing_level = max(self.min_level, round(self.settings["typing_density"] * DENSITY_LEVELS))
+        self.last_key_time = None
+        self.idle_level = None  # Level to go back to when typing stops
+
+        # Ring buffers of frame costs (ms) and frame start times (s)
+        self._costs = array('d', bytes(8 * HISTORY_SIZE))
+        self._starts = array('d', bytes(8 * HISTORY_SIZE))
+        self._frames = 0
+        self._last_log = clock()
+
+    def note_key(self):
+        """Record keyboard activity (switches to typing mode)"""
+        self.last_key_time = self.clock()
+
+    @property
+    def typing(self):
+        """Whether a key was pressed recently"""
+        if self.last_key_time is None:
+            return False
+        return (self.clock() - self.last_key_time) * 1000 < self.settings["idle_after_ms"]
+
+    def frame_interval_ms(self):
+        """Target frame period for the current mode"""
+        fps = self.settings["typing_fps"] if self.typing else self.settings["target_fps"]
+        return 1000 / max(1, fps)
+
+    def record_frame(self, start, cost_ms):
+        """
+        Record a frame and adjust the density.
+
+        Args:
+            start: Clock time the frame started
+            cost_ms: Main-thread time the frame took
+
+        Returns:
+            Delay in ms until the next frame should start
+        """
+        index = self._frames % HISTORY_SIZE
+        self._costs[index] = cost_ms
+        self._starts[index] = start
+        self._frames += 1
+
+        typing = self.typing
+        if typing and self.idle_level is None:
+            self.idle_level = self.density_level
+        elif not typing and self.idle_level is not None:
+            # Typing stopped: restore the density it interrupted, the budget corrects it from there
+            self.density_level = max(self.density_level, self.idle_level)
+            self.idle_level = None
+
+        ceiling = self.typing_level if typing else DENSITY_LEVELS
+        if cost_ms > self.settings["frame_budget_ms"]:
+            self.density_level -= 1
+        elif cost_ms < self.settings["frame_budget_ms"] * HEADROOM:
+            self.density_level += 1
+        self.density_level = max(self.min_level, min(self.density_level, ceiling))
+
+        self.maybe_log()
+        return max(1, int(self.frame_interval_ms() - cost_ms))
+
+    @property
+    def density(self):
+        """Share of the drops currently shown"""
+        return self.density_level / DENSITY_LEVELS
+
+    def fps(self):
+        """Achieved frame rate over the recorded history"""
+        count = min(self._frames, HISTORY_SIZE)
+        if count < 2:
+            return 0.0
+        newest = self._starts[(self._frames - 1) % HISTORY_SIZE]
+        oldest = self._starts[(self._frames - count) % HISTORY_SIZE]
+        return (count - 1) / (newest - oldest) if newest > oldest else 0.0
+
+    def percentiles(self, points=(50, 95, 99)):
+        """Frame cost percentiles in ms over the recorded history"""
+        costs = sorted(self._costs[:min(self._frames, HISTORY_SIZE)])
+        if not costs:
+            return {point: 0.0 for point in points}
+        return {point: costs[min(len(costs) - 1, int(len(costs) * point / 100))] for point in points}
+
+    def summary(self):
+        """One log line with fps, frame time percentiles and density"""
+        p = self.percentiles()
+        mode = "typing" if self.typing else "idle"
+        return (f"Matrix rain: {self.fps():.1f} fps, frame p50 {p[50]:.2f} ms, p95 {p[95]:.2f} ms, "
+                f"p99 {p[99]:.2f} ms, density {self.density_level}/{DENSITY_LEVELS} ({mode})")
+
+    def maybe_log(self):
+        """Log the summary once per log interval"""
+        now = self.clock()
+        if now - self._last_log >= self.settings["log_interval_s"]:
+            self._last_log = now
+            logging.info(self.summary())
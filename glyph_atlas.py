@@ -0,0 +1,216 @@
+import base64
+import struct
+import sys
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Sprites kept at most; older (char, color, size) combinations are evicted first
+DEFAULT_CAPACITY = 256
+
+# Font used for the matrix glyphs
+FONT_FACE = "Courier New"
+PIL_FONT_FILES = {False: ("cour.ttf", "DejaVuSansMono.ttf"), True: ("courbd.ttf", "DejaVuSansMono-Bold.ttf")}
+
+# Tk font sizes are points; glyphs are rasterized at 96 dpi
+POINTS_TO_PIXELS = 96 / 72
+
+# Colors the matrix settings use, for resolving names without a Tk interpreter
+NAMED_COLORS = {
+    "lime": (0, 255, 0),
+    "green": (0, 128, 0),
+    "cyan": (0, 255, 255),
+    "red": (255, 0, 0),
+    "white": (255, 255, 255),
+    "yellow": (255, 255, 0)
+}
+
+
+def parse_color(color, master=None):
+    """Convert a Tk color name or #rrggbb string to an (r, g, b) tuple"""
+    if color.startswith("#") and len(color) == 7:
+        return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+    if color in NAMED_COLORS:
+        return NAMED_COLORS[color]
+    if master is not None:
+        return tuple(channel >> 8 for channel in master.winfo_rgb(color))
+    raise ValueError(f"Unknown color {color}")
+
+
+def png_bytes(rgba):
+    """Encode an (h, w, 4) uint8 array as a PNG (Tk 8.6 loads PNG with alpha natively)"""
+    height, width, _ = rgba.shape
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    # Filter type 0 (None) in front of every row
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) +
+            chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+def glyph_rgba(mask, rgb):
+    """Color a coverage mask: solid color, coverage as alpha"""
+    rgba = np.empty(mask.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = rgb
+    rgba[..., 3] = mask
+    return rgba
+
+
+def _pil_rasterizer():
+    """Glyph rasterizer backed by Pillow, or None if it is not installed"""
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        return None
+
+    fonts = {}
+
+    def load_font(pixel_size, bold):
+        key = (pixel_size, bold)
+        if key not in fonts:
+            for name in PIL_FONT_FILES[bold]:
+                try:
+                    fonts[key] = ImageFont.truetype(name, pixel_size)
+                    break
+                except OSError:
+                    continue
+            else:
+                fonts[key] = ImageFont.load_default()
+        return fonts[key]
+
+    def rasterize(char, pixel_size, bold):
+        font = load_font(pixel_size, bold)
+        left, top, right, bottom = font.getbbox("M" + char)
+        width = max(1, int(font.getlength(char)))
+        image = Image.new("L", (width, max(1, bottom)), 0)
+        ImageDraw.Draw(image).text((0, 0), char, fill=255, font=font)
+        return np.asarray(image, dtype=np.uint8)
+
+    return rasterize
+
+
+def _gdi_rasterizer():
+    """Glyph rasterizer backed by Windows GDI (pywin32), or None elsewhere"""
+    if sys.platform != "win32":
+        return None
+    try:
+        import win32con
+        import win32gui
+        import win32ui
+    except ImportError:
+        return None
+
+    def rasterize(char, pixel_size, bold):
+        screen_handle = win32gui.GetDC(0)
+        screen = win32ui.CreateDCFromHandle(screen_handle)
+        memory = screen.CreateCompatibleDC()
+        bitmap = win32ui.CreateBitmap()
+        try:
+            font = win32ui.CreateFont({
+                "name": FONT_FACE,
+                "height": -pixel_size,
+                "weight": win32con.FW_BOLD if bold else win32con.FW_NORMAL
+            })
+            memory.SelectObject(font)
+            width, height = memory.GetTextExtent(char)
+            width, height = max(1, width), max(1, height)
+
+            bitmap.CreateCompatibleBitmap(screen, width, height)
+            memory.SelectObject(bitmap)
+            memory.SetBkMode(win32con.OPAQUE)
+            memory.SetBkColor(0)
+            memory.SetTextColor(0xFFFFFF)
+            memory.TextOut(0, 0, char)
+
+            bits = bitmap.GetBitmapBits(True)
+            if len(bits) != width * height * 4:
+                return None  # Not a 32-bit display surface
+            pixels = np.frombuffer(bits, dtype=np.uint8).reshape(height, width, 4)
+            return pixels[..., :3].max(axis=2)
+        finally:
+            memory.DeleteDC()
+            win32gui.DeleteObject(bitmap.GetHandle())
+            win32gui.ReleaseDC(0, screen_handle)
+
+    return rasterize
+
+
+def box_rasterizer(char, pixel_size, bold):
+    """Stand-in glyphs (filled cells) for headless benchmarks without a font rasterizer"""
+    height = max(1, int(pixel_size))
+    width = max(1, height * 3 // 5)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    mask[height // 5:height - height // 6, 1:width - 1] = 255 if bold else 200
+    return mask
+
+
+def default_rasterizer():
+    """Best available glyph rasterizer: GDI on Windows, then Pillow, else None"""
+    return _gdi_rasterizer() or _pil_rasterizer()
+
+
+class GlyphAtlas:
+    """
+    Pre-rendered glyph sprites with LRU eviction.
+
+    Every (char, color, size, bold) combination is rasterized once into a
+    coverage mask and a PhotoImage sprite. When the matrix settings change
+    (char set, color) the new glyphs push the least recently used ones out,
+    so memory stays bounded by the capacity. Callers keep references to the
+    sprites they put on the canvas, so an evicted sprite stays alive until
+    its items are gone.
+    """
+
+    def __init__(self, master=None, capacity=DEFAULT_CAPACITY, rasterizer=None):
+        self.master = master
+        self.capacity = capacity
+        self.rasterizer = rasterizer if rasterizer is not None else default_rasterizer()
+        self._masks = OrderedDict()
+        self._sprites = OrderedDict()
+
+    @property
+    def available(self):
+        """Whether glyphs can be rasterized here"""
+        return self.rasterizer is not None
+
+    def __len__(self):
+        return len(self._sprites)
+
+    @staticmethod
+    def _touch(cache, key, capacity):
+        """Mark key as most recently used and evict beyond capacity"""
+        cache.move_to_end(key)
+        while len(cache) > capacity:
+            cache.popitem(last=False)
+
+    def mask(self, char, size, bold=False):
+        """Coverage mask (uint8, 0-255) of a glyph at a Tk point size"""
+        key = (char, size, bold)
+        if key not in self._masks:
+            mask = self.rasterizer(char, max(1, round(size * POINTS_TO_PIXELS)), bold)
+            if mask is None:
+                raise RuntimeError(f"Could not rasterize {char!r}")
+            self._masks[key] = mask
+        self._touch(self._masks, key, self.capacity)
+        return self._masks[key]
+
+    def sprite(self, char, color, size, bold=False):
+        """PhotoImage of a glyph in a color"""
+        key = (char, color, size, bold)
+        if key not in self._sprites:
+            import tkinter as tk
+            rgba = glyph_rgba(self.mask(char, size, bold), parse_color(color, self.master))
+            data = base64.b64encode(png_bytes(rgba))
+            self._sprites[key] = tk.PhotoImage(master=self.master, data=data, format="png")
+        self._touch(self._sprites, key, self.capacity)
+        return self._sprites[key]
+
+    def clear(self):
+        """Drop every cached mask and sprite"""
+        self._masks.clear()
+        self._sprites.clear()
@@ -0,0 +1,376 @@
+import atexit
+import sys
+import threading
+import time
+from array import array
+
+# Capacity of the event ring buffer (a power of two so the index wraps with a mask)
+DEFAULT_CAPACITY = 256
+
+# Windows message ids delivered to a low-level keyboard hook
+WM_KEYDOWN = 0x0100
+WM_KEYUP = 0x0101
+WM_SYSKEYDOWN = 0x0104
+WM_SYSKEYUP = 0x0105
+KEY_UP_MESSAGES = (WM_KEYUP, WM_SYSKEYUP)
+
+# Feature channels of an attempt, in the order they appear in the feature vector
+#   down_down: press to the next press (n - 1 values, the original feature)
+#   dwell:     press to release of the same key (n values)
+#   flight:    release to the next press, negative when keys overlap (n - 1 values)
+FEATURE_CHANNELS = ("down_down", "dwell", "flight")
+
+# Models trained before release capture only have down-down intervals
+LEGACY_CHANNELS = ("down_down",)
+
+# Channel length relative to the number of keys in the password
+CHANNEL_LENGTH_OFFSETS = {"down_down": -1, "dwell": 0, "flight": -1}
+
+# Most keys a single attempt record holds
+MAX_RECORD_KEYS = 128
+
+# Lower than any clock reading, so nothing counts as consumed yet
+NOTHING_CONSUMED_NS = -(1 << 63)
+
+
+class KeystrokeCapture:
+    """
+    Preallocated ring buffer of key events with nanosecond timestamps.
+
+    A producer (the low-level keyboard hook, or a synthetic source in tests)
+    calls record() as early as possible after a key changes state; the Tk
+    handlers later call take_press() with the key code of the event they are
+    handling and get the capture-time timestamp back, so intervals no longer
+    include Tk event queue latency or jitter from the animation running on
+    the same thread. Nothing is allocated per event.
+
+    The producer may run on another thread (the hook thread): record() fills
+    the slot before it publishes it by advancing the write counter.
+    Callers clear() the buffer when an attempt starts so keys from an
+    earlier attempt or screen cannot be matched.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, clock=time.perf_counter_ns):
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError(f"Capacity must be a power of two, got {capacity}")
+        self.capacity = capacity
+        self.clock = clock
+        self._mask = capacity - 1
+        self._timestamps = array('q', bytes(8 * capacity))
+        self._key_codes = array('L', [0]) * capacity
+        self._is_up = array('B', bytes(capacity))
+        self._write = 0  # Total events ever recorded
+        self._read = 0   # First event not consumed by a Tk handler yet
+        self._consumed_ns = NOTHING_CONSUMED_NS  # Timestamp of the last consumed event
+
+    def __len__(self):
+        """Number of recorded events that have not been consumed"""
+        return self._write - max(self._read, self._write - self.capacity)
+
+    def record(self, key_code, is_up=False, timestamp_ns=None):
+        """Record a key event (producer side, must stay cheap)"""
+        index = self._write & self._mask
+        self._timestamps[index] = self.clock() if timestamp_ns is None else timestamp_ns
+        self._key_codes[index] = key_code
+        self._is_up[index] = 1 if is_up else 0
+        self._write += 1
+
+    def _take(self, key_code, is_up, fallback_ns):
+        """
+        Return the capture timestamp of the oldest unconsumed matching event.
+
+        Events before the match are keys the handlers never saw (modifiers,
+        blocked keys) and are dropped; Tk delivers events in capture order,
+        so events older than the last consumed one are never matched either.
+        If the key was not captured (no hook, buffer overrun) the fallback,
+        or the current clock, is returned.
+        """
+        position = max(self._read, self._write - self.capacity)
+        while position < self._write:
+            index = position & self._mask
+            position += 1
+            if self._timestamps[index] < self._consumed_ns:
+                self._read = position
+                continue
+            if self._is_up[index] == is_up and self._key_codes[index] == key_code:
+                self._read = position
+                self._consumed_ns = self._timestamps[index]
+                return self._consumed_ns
+        return self.clock() if fallback_ns is None else fallback_ns
+
+    def take_press(self, key_code, fallback_ns=None):
+        """Capture timestamp of the press being handled"""
+        return self._take(key_code, 0, fallback_ns)
+
+    def take_release(self, key_code, fallback_ns=None):
+        """Capture timestamp of the release being handled"""
+        return self._take(key_code, 1, fallback_ns)
+
+    def clear(self):
+        """Drop every unconsumed event (start of an attempt)"""
+        self._read = self._write
+        self._consumed_ns = NOTHING_CONSUMED_NS
+
+    def events(self):
+        """Snapshot of the unconsumed events as (timestamp_ns, key_code, is_up) tuples"""
+        start = max(self._read, self._write - self.capacity)
+        return [(self._timestamps[p & self._mask], self._key_codes[p & self._mask], bool(self._is_up[p & self._mask]))
+                for p in range(start, self._write)]
+
+
+class KeystrokeRecord:
+    """
+    Press and release timestamps of one attempt, one slot per typed key.
+
+    Backed by preallocated arrays; features() turns the slots into the
+    multi-channel feature vector (seconds) used by training and scoring.
+    """
+
+    def __init__(self, capacity=MAX_RECORD_KEYS):
+        self.capacity = capacity
+        self._key_codes = array('L', [0]) * capacity
+        self._press = array('q', bytes(8 * capacity))
+        self._release = array('q', bytes(8 * capacity))
+        self._released = array('B', bytes(capacity))
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def press(self, key_code, timestamp_ns):
+        """Start a new key slot; presses beyond the capacity are ignored"""
+        if self.length >= self.capacity:
+            return
+        self._key_codes[self.length] = key_code
+        self._press[self.length] = timestamp_ns
+        self._released[self.length] = 0
+        self.length += 1
+
+    def release(self, key_code, timestamp_ns):
+        """Close the oldest unreleased slot for key_code, return False if there is none"""
+        for slot in range(self.length):
+            if not self._released[slot] and self._key_codes[slot] == key_code:
+                self._release[slot] = timestamp_ns
+                self._released[slot] = 1
+                return True
+        return False
+
+    def pop(self):
+        """Forget the last key (backspace)"""
+        if self.length:
+            self.length -= 1
+
+    def clear(self):
+        """Forget every key"""
+        self.length = 0
+
+    def features(self, channels=FEATURE_CHANNELS):
+        """
+        Feature vector in seconds for the given channels, in channel order.
+
+        A key that is still held when the attempt ends (typically the last
+        one, when Enter comes first) gets the average dwell of the others.
+        """
+        n = self.length
+        press = self._press
+        released = [slot for slot in range(n) if self._released[slot]]
+        if released:
+            average_dwell = sum(self._release[slot] - press[slot] for slot in released) // len(released)
+        else:
+            average_dwell = 0
+        release = [self._release[slot] if self._released[slot] else press[slot] + average_dwell
+                   for slot in range(n)]
+
+        values = []
+        for channel in channels:
+            if channel == "down_down":
+                values.extend((press[i + 1] - press[i]) / 1e9 for i in range(n - 1))
+            elif channel == "dwell":
+                values.extend((release[i] - press[i]) / 1e9 for i in range(n))
+            elif channel == "flight":
+                values.extend((press[i + 1] - release[i]) / 1e9 for i in range(n - 1))
+            else:
+                raise ValueError(f"Unknown feature channel {channel}")
+        return values
+
+
+def feature_count(num_keys, channels=FEATURE_CHANNELS):
+    """Length of the feature vector for a password of num_keys characters"""
+    return sum(num_keys + CHANNEL_LENGTH_OFFSETS[channel] for channel in channels)
+
+
+def keys_for_feature_count(count, channels=FEATURE_CHANNELS):
+    """Inverse of feature_count: password length for a feature vector length"""
+    return (count - sum(CHANNEL_LENGTH_OFFSETS[channel] for channel in channels)) // len(channels)
+
+
+def channel_slices(num_keys, channels=FEATURE_CHANNELS):
+    """Map each channel name to its slice of the feature vector"""
+    slices = {}
+    start = 0
+    for channel in channels:
+        end = start + num_keys + CHANNEL_LENGTH_OFFSETS[channel]
+        slices[channel] = slice(start, end)
+        start = end
+    return slices
+
+
+def model_channels(model):
+    """Feature channels a model was trained with"""
+    return tuple(model.get("feature_channels", None) or LEGACY_CHANNELS)
+
+
+class SyntheticKeySource:
+    """Feeds a scripted key sequence into a capture, for tests and benchmarks without a keyboard"""
+
+    def __init__(self, capture, script):
+        # script: iterable of (delay_ns since the previous event, key_code, is_up)
+        self.capture = capture
+        self.script = list(script)
+
+    @classmethod
+    def from_text(cls, capture, text, intervals_ns, dwell_ns=0):
+        """Type text with the given press-to-press intervals (and optional key-up after dwell_ns)"""
+        script = []
+        for position, char in enumerate(text):
+            delay = intervals_ns[position - 1] if position else 0
+            if dwell_ns:
+                delay -= dwell_ns if position else 0
+                script.append((delay, ord(char.upper()), False))
+                script.append((dwell_ns, ord(char.upper()), True))
+            else:
+                script.append((delay, ord(char.upper()), False))
+        return cls(capture, script)
+
+    def play(self, start_ns=0):
+        """Record the whole script with synthetic timestamps, return the last timestamp"""
+        timestamp = start_ns
+        for delay, key_code, is_up in self.script:
+            timestamp += delay
+            self.capture.record(key_code, is_up, timestamp)
+        return timestamp
+
+
+def interval_seconds(previous_ns, current_ns):
+    """Convert two capture timestamps into an interval in seconds"""
+    return (current_ns - previous_ns) / 1e9
+
+
+# Recording-only low-level hook for windows that have no hook of their own
+# (the training wizard). The lockscreen records from its blocking hook instead.
+_recording_hook = {}
+
+# How long to wait for the hook thread to install its hook
+HOOK_START_TIMEOUT = 2.0
+
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+    WH_KEYBOARD_LL = 13
+    WM_QUIT = 0x0012
+
+    class KBDLLHOOKSTRUCT(ctypes.Structure):
+        _fields_ = [
+            ("vkCode", wintypes.DWORD),
+            ("scanCode", wintypes.DWORD),
+            ("flags", wintypes.DWORD),
+            ("time", wintypes.DWORD),
+            ("dwExtraInfo", ctypes.POINTER(wintypes.ULONG)),
+        ]
+
+    _HOOKPROC = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+    _user32 = ctypes.WinDLL('user32', use_last_error=True)
+    _user32.CallNextHookEx.argtypes = (wintypes.HHOOK, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+    _user32.SetWindowsHookExW.restype = wintypes.HHOOK
+    _user32.UnhookWindowsHookEx.argtypes = (wintypes.HHOOK,)
+    _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    _kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+
+    class KeyboardHookThread:
+        """
+        Low-level keyboard hook installed on a thread of its own.
+
+        Windows runs a low-level hook on the thread that installed it, from
+        that thread's message loop. Installed on the Tk thread, the hook only
+        runs once Tk pumps messages again, so its timestamps carry the same
+        delay as the Tk events. This thread does nothing but pump messages
+        for the hook, so the hook runs (and timestamps) as the key arrives.
+        """
+
+        def __init__(self, proc):
+            self.proc = proc  # HOOKPROC callback, referenced here so it outlives the hook
+            self.hook = None
+            self.error = 0
+            self._thread_id = None
+            self._installed = threading.Event()
+            self._thread = None
+
+        def start(self, timeout=HOOK_START_TIMEOUT):
+            """Install the hook on the hook thread; returns False if Windows refused it"""
+            self._thread = threading.Thread(target=self._run, name="keyboard-hook", daemon=True)
+            self._thread.start()
+            self._installed.wait(timeout)
+            return bool(self.hook)
+
+        def _run(self):
+            self._thread_id = _kernel32.GetCurrentThreadId()
+            self.hook = _user32.SetWindowsHookExW(WH_KEYBOARD_LL, self.proc, _kernel32.GetModuleHandleW(None), 0)
+            self.error = ctypes.get_last_error()
+            self._installed.set()
+            if not self.hook:
+                return
+
+            msg = wintypes.MSG()
+            while _user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                _user32.TranslateMessage(ctypes.byref(msg))
+                _user32.DispatchMessageW(ctypes.byref(msg))
+            _user32.UnhookWindowsHookEx(self.hook)
+            self.hook = None
+
+        def stop(self, timeout=1.0):
+            """Remove the hook and end the thread"""
+            if self._thread is None or not self._thread.is_alive():
+                return
+            _user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            self._thread.join(timeout)
+
+    def install_recording_hook(capture):
+        """Record every key event into capture from a pass-through low-level hook"""
+        if _recording_hook:
+            _recording_hook['capture'] = capture
+            return True
+
+        def hook_proc(nCode, wParam, lParam):
+            if nCode >= 0:
+                # Timestamp first: KBDLLHOOKSTRUCT.time only has tick (ms) resolution
+                timestamp = time.perf_counter_ns()
+                kbd = ctypes.cast(lParam, ctypes.POINTER(KBDLLHOOKSTRUCT)).contents
+                _recording_hook['capture'].record(kbd.vkCode, wParam in KEY_UP_MESSAGES, timestamp)
+            return _user32.CallNextHookEx(None, nCode, wParam, lParam)
+
+        hook_thread = KeyboardHookThread(_HOOKPROC(hook_proc))
+        _recording_hook['capture'] = capture
+        if not hook_thread.start():
+            _recording_hook.clear()
+            return False
+
+        _recording_hook['thread'] = hook_thread
+        atexit.register(uninstall_recording_hook)
+        return True
+
+    def uninstall_recording_hook():
+        """Remove the recording hook if it is installed"""
+        hook_thread = _recording_hook.pop('thread', None)
+        if hook_thread:
+            hook_thread.stop()
+        _recording_hook.clear()
+
+else:
+    def install_recording_hook(capture):
+        """No low-level hook on this platform; handlers fall back to perf_counter_ns"""
+        return False
+
+    def uninstall_recording_hook():
+        """No low-level hook on this platform"""
+        _recording_hook.clear()
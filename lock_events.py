@@ -0,0 +1,415 @@
+import logging
+import queue
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from process_snapshot import ProcessSnapshot
+
+logger = logging.getLogger('LockDetector')
+
+# Event kinds pushed by the sources
+SESSION_LOCK = "session_lock"      # Windows reported the session as locked (authoritative)
+SESSION_UNLOCK = "session_unlock"  # Windows reported the session as unlocked
+PROCESS_START = "process_start"    # A watched process appeared (data: {"name", "pid"})
+PROCESS_STOP = "process_stop"      # A watched process went away (data: {"name", "pid"})
+POLL = "poll"                      # Fallback tick: evaluate the heuristic lock signals
+
+LockEvent = namedtuple("LockEvent", ["kind", "timestamp", "data"])
+
+# Processes whose start and stop are interesting to the detector
+WATCHED_PROCESSES = ("logonui.exe", "consent.exe")
+
+# Seconds between process list diffs of the process watcher
+PROCESS_WATCH_INTERVAL = 1.0
+
+# Adaptive polling (fallback source), overridable per detector
+DEFAULT_POLL_SETTINGS = {
+    "fast_interval": 0.25,   # While precursor signals are present or a lock is being confirmed
+    "ceiling": 2.0,          # Longest interval while the desktop is stable
+    "backoff": 1.5,          # Interval growth per quiet poll
+    "error_initial": 0.5,    # First delay after a failed detection cycle
+    "error_ceiling": 30.0    # Longest delay after repeated failures
+}
+
+# Windows session change notification (WM_WTSSESSION_CHANGE)
+WM_WTSSESSION_CHANGE = 0x02B1
+WTS_SESSION_LOCK = 0x7
+WTS_SESSION_UNLOCK = 0x8
+NOTIFY_FOR_THIS_SESSION = 0
+
+
+def make_event(kind, data=None, timestamp=None):
+    """Create an event stamped with the monotonic clock"""
+    return LockEvent(kind, time.monotonic() if timestamp is None else timestamp, data or {})
+
+
+class EventSource:
+    """
+    A producer of lock events running on its own thread.
+
+    Subclasses implement _run(), which pushes events with emit() until
+    self.stopping is set. A source whose _run() returns is finished (only
+    simulated feeds ever finish).
+    """
+
+    name = "source"
+
+    def __init__(self):
+        self.events = None
+        self.thread = None
+        self.stopping = threading.Event()
+        self.finished = threading.Event()
+
+    def emit(self, kind, data=None, timestamp=None):
+        """Push an event to the pipeline"""
+        self.events.put(make_event(kind, data, timestamp))
+
+    def start(self, events):
+        """Start producing into the events queue; return False if the source is unavailable here"""
+        self.events = events
+        self.thread = threading.Thread(target=self._thread_main, name=f"lock-events-{self.name}", daemon=True)
+        self.thread.start()
+        return True
+
+    def _thread_main(self):
+        try:
+            self._run()
+        except Exception as e:
+            logger.error(f"Event source {self.name} failed: {e}")
+        finally:
+            self.finished.set()
+
+    def _run(self):
+        raise NotImplementedError
+
+    def stop(self):
+        """Ask the source to stop and wait briefly for its thread"""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(1.0)
+
+
+class AdaptivePollScheduler:
+    """
+    Polling interval that follows the detector's state.
+
+    After every poll the detector reports whether precursor signals were
+    present (any lock signal fired, or a lock is being confirmed). Then the
+    interval drops to fast_interval; while polls stay quiet it grows by the
+    backoff factor up to the ceiling. A lock is therefore first seen within
+    ceiling seconds and confirmed at the fast rate, which bounds detection
+    latency by ceiling + (confirmations - 1) * fast_interval. Other sources
+    can hurry() the next poll (e.g. when LogonUI starts).
+
+    A failed cycle backs off the polling only: the wait grows to the error
+    delay while failures repeat, and the detector keeps handling the other
+    events (session notifications) meanwhile.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(DEFAULT_POLL_SETTINGS)
+        self.settings.update(settings or {})
+        self.interval = self.settings["fast_interval"]
+        self.error_delay = 0.0
+        self.wake = threading.Event()
+        self.hurried = False
+        self.poll_queued = False  # A POLL is waiting in the pipeline (set by the source, cleared by the detector)
+
+    @property
+    def delay(self):
+        """Time between polls: the interval, or the error delay while cycles fail"""
+        return max(self.interval, self.error_delay)
+
+    def observe(self, precursor):
+        """Adjust the interval after a poll"""
+        previous = self.delay
+        if precursor:
+            self.interval = self.settings["fast_interval"]
+        else:
+            self.interval = min(self.interval * self.settings["backoff"], self.settings["ceiling"])
+        self.error_delay = 0.0
+        # The polling thread chose its wait before this poll ran: cut it short
+        if self.delay < previous:
+            self.wake.set()
+
+    def hurry(self):
+        """Poll now and fall back to the fast interval"""
+        self.interval = self.settings["fast_interval"]
+        self.hurried = True
+        self.wake.set()
+
+    def failed(self):
+        """Back the polling off after a failed cycle, doubling on repeated failures; returns the delay"""
+        if self.error_delay:
+            self.error_delay = min(self.error_delay * 2, self.settings["error_ceiling"])
+        else:
+            self.error_delay = self.settings["error_initial"]
+        return self.error_delay
+
+    def worst_case_latency(self, confirmations):
+        """Longest time from a lock appearing to its confirmation"""
+        return self.settings["ceiling"] + (confirmations - 1) * self.settings["fast_interval"]
+
+    def wait(self, stopping):
+        """
+        Sleep until the next poll is due (or hurried); return False if stopping was set.
+
+        The wait starts with the current delay, measured from the previous
+        poll. If the delay shrinks meanwhile (the detector observed that
+        poll) the wait ends at the shorter one; a longer one applies from the
+        next wait on. lock_probes.replay() models the same ordering.
+        """
+        started = time.monotonic()
+        interval = self.delay
+        while not stopping.is_set():
+            remaining = started + interval - time.monotonic()
+            if remaining <= 0:
+                break
+            self.wake.wait(remaining)
+            self.wake.clear()
+            if self.hurried:
+                self.hurried = False
+                break
+            interval = min(interval, self.delay)
+        return not stopping.is_set()
+
+
+class PollingSource(EventSource):
+    """Fallback: POLL ticks at the interval of an AdaptivePollScheduler"""
+
+    name = "polling"
+
+    def __init__(self, scheduler):
+        super().__init__()
+        self.scheduler = scheduler
+
+    @property
+    def interval(self):
+        return self.scheduler.delay
+
+    def _run(self):
+        while self.scheduler.wait(self.stopping):
+            # Never queue a POLL behind one the detector has not handled yet: it would be stale
+            if not self.scheduler.poll_queued:
+                self.scheduler.poll_queued = True
+                self.emit(POLL)
+
+    def stop(self):
+        self.stopping.set()
+        self.scheduler.wake.set()
+        if self.thread is not None:
+            self.thread.join(1.0)
+
+
+class ProcessWatchSource(EventSource):
+    """
+    Start/stop events for the watched processes, from diffs of the PID list.
+
+    Backed by its own ProcessSnapshot, so only PIDs that are new since the
+    previous diff have their name looked up. The PID and name functions are
+    pluggable so simulated process tables can drive it.
+    """
+
+    name = "processes"
+
+    def __init__(self, names=WATCHED_PROCESSES, interval=PROCESS_WATCH_INTERVAL, list_pids=None, name_of=None,
+                 created_of=None):
+        super().__init__()
+        self.names = {name.lower() for name in names}
+        self.interval = interval
+        self.snapshot = ProcessSnapshot(list_pids, name_of, created_of)
+
+    def start(self, events):
+        if not self.snapshot.available:
+            return False
+        return super().start(events)
+
+    def diff(self, initial=False):
+        """Compare the PID list with the previous one and emit events for watched processes"""
+        started, stopped = self.snapshot.refresh()
+        # Stops first: a reused PID is in both, and its old process went first
+        for pid, name in stopped.items():
+            if name in self.names:
+                self.emit(PROCESS_STOP, {"name": name, "pid": pid})
+        for pid, name in started.items():
+            if name in self.names:
+                # Processes already running at start are reported too, so the detector starts in sync
+                self.emit(PROCESS_START, {"name": name, "pid": pid, "initial": initial})
+
+    def _run(self):
+        self.diff(initial=True)
+        while not self.stopping.wait(self.interval):
+            self.diff()
+
+
+class SimulatedSource(EventSource):
+    """
+    Scripted events for running the pipeline without Windows.
+
+    script: iterable of (delay_s since the previous event, kind, data).
+    With speed None the events are pushed back to back (timestamps still
+    follow the script); otherwise delays are divided by speed.
+    """
+
+    name = "simulated"
+
+    def __init__(self, script, speed=None, start_time=0.0):
+        super().__init__()
+        self.script = list(script)
+        self.speed = speed
+        self.start_time = start_time
+
+    def _run(self):
+        timestamp = self.start_time
+        for delay, kind, data in self.script:
+            if self.speed is not None and self.stopping.wait(delay / self.speed):
+                return
+            if self.stopping.is_set():
+                return
+            timestamp += delay
+            self.emit(kind, data, timestamp if self.speed is None else None)
+
+
+if sys.platform == "win32":
+    class SessionNotificationSource(EventSource):
+        """Lock/unlock notifications from Windows (WTSRegisterSessionNotification on a message-only window)"""
+
+        name = "session"
+
+        def __init__(self):
+            super().__init__()
+            self.hwnd = None
+            self.ready = threading.Event()
+            self.registered = False
+
+        def start(self, events):
+            try:
+                import win32gui  # noqa: F401
+                import win32ts  # noqa: F401
+            except ImportError:
+                return False
+            super().start(events)
+            self.ready.wait(2.0)
+            return self.registered
+
+        def _window_proc(self, hwnd, message, wparam, lparam):
+            import win32con
+            import win32gui
+            if message == WM_WTSSESSION_CHANGE:
+                if wparam == WTS_SESSION_LOCK:
+                    self.emit(SESSION_LOCK)
+                elif wparam == WTS_SESSION_UNLOCK:
+                    self.emit(SESSION_UNLOCK)
+                return 0
+            if message == win32con.WM_DESTROY:
+                win32gui.PostQuitMessage(0)
+                return 0
+            return win32gui.DefWindowProc(hwnd, message, wparam, lparam)
+
+        def _run(self):
+            import win32api
+            import win32con
+            import win32gui
+            import win32ts
+
+            # The window has to be created on the thread that pumps its messages
+            window_class = win32gui.WNDCLASS()
+            window_class.lpfnWndProc = self._window_proc
+            window_class.lpszClassName = "KeystrokeLockDetectorSession"
+            window_class.hInstance = win32api.GetModuleHandle(None)
+            try:
+                win32gui.RegisterClass(window_class)
+                self.hwnd = win32gui.CreateWindow(window_class.lpszClassName, "", 0, 0, 0, 0, 0,
+                                                  win32con.HWND_MESSAGE, 0, window_class.hInstance, None)
+                win32ts.WTSRegisterSessionNotification(self.hwnd, NOTIFY_FOR_THIS_SESSION)
+                self.registered = True
+            except Exception as e:
+                logger.warning(f"Session notifications unavailable: {e}")
+                return
+            finally:
+                self.ready.set()
+
+            try:
+                win32gui.PumpMessages()
+            finally:
+                win32ts.WTSUnRegisterSessionNotification(self.hwnd)
+
+        def stop(self):
+            self.stopping.set()
+            if self.hwnd:
+                import win32con
+                import win32gui
+                win32gui.PostMessage(self.hwnd, win32con.WM_CLOSE, 0, 0)
+            if self.thread is not None:
+                self.thread.join(1.0)
+
+else:
+    class SessionNotificationSource(EventSource):
+        """Session notifications need Windows; unavailable elsewhere"""
+
+        name = "session"
+
+        def start(self, events):
+            return False
+
+
+class EventPipeline:
+    """
+    Queue between the event sources and the detector.
+
+    Sources that cannot start on this machine are dropped, and the polling
+    fallback is only started when session notifications are not running,
+    so the detector polls only when Windows cannot tell it about locks.
+    With always_poll the fallback runs regardless (recording probe traces).
+    """
+
+    def __init__(self, sources, fallback=None, always_poll=False):
+        self.events = queue.Queue()
+        self.sources = list(sources)
+        self.fallback = fallback
+        self.always_poll = always_poll
+        self.running = []
+
+    def start(self):
+        """Start every available source, return the names of the running ones"""
+        for source in self.sources:
+            if source.start(self.events):
+                self.running.append(source)
+            else:
+                logger.info(f"Event source {source.name} unavailable")
+
+        if self.fallback is not None and self.always_poll:
+            logger.info(f"Polling alongside the other sources (currently every {self.fallback.interval}s)")
+            if self.fallback.start(self.events):
+                self.running.append(self.fallback)
+        elif self.fallback is not None and not any(isinstance(source, SessionNotificationSource)
+                                                   for source in self.running):
+            logger.info(f"No session notifications, polling (currently every {self.fallback.interval}s)")
+            if self.fallback.start(self.events):
+                self.running.append(self.fallback)
+        return [source.name for source in self.running]
+
+    @property
+    def polling(self):
+        """Whether the polling fallback is running"""
+        return self.fallback is not None and self.fallback in self.running
+
+    def stop(self):
+        """Stop every running source"""
+        for source in self.running:
+            source.stop()
+        self.running = []
+
+    @property
+    def exhausted(self):
+        """All sources finished and every event consumed (only simulated feeds get here)"""
+        return all(source.finished.is_set() for source in self.running) and self.events.empty()
+
+    def get(self, timeout=None):
+        """Next event, or None if none arrived within timeout"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
@@ -0,0 +1,397 @@
+import bisect
+import ctypes
+import struct
+import time
+
+from process_snapshot import psutil_process_table
+from window_tracker import WindowTracker
+
+try:
+    import win32gui
+except ImportError:
+    win32gui = None
+
+# Binary trace format: header, then fixed-size records (a NAME record is followed by its UTF-8 bytes)
+TRACE_MAGIC = b"KLDT"
+TRACE_VERSION = 1
+HEADER = struct.Struct("<4sHd")   # magic, version, wall clock at start (epoch seconds)
+RECORD = struct.Struct("<dBq")    # seconds since start, kind, value
+NAME_LENGTH = struct.Struct("<H")
+
+# Record kinds
+FOREGROUND = 1     # value: foreground window handle
+IDLE = 2           # value: idle time in ms (only written when it departs from linear growth)
+WINDOWS = 3        # value: visible titled window count
+PROCESS_START = 4  # value: pid | name id << 32
+PROCESS_STOP = 5   # value: pid
+NAME = 6           # value: name id, followed by the name
+SESSION = 7        # value: 1 locked, 0 unlocked (session notification, the ground truth)
+TRIGGER = 8        # value: 0 (the detector launched the lockscreen)
+
+# Idle time grows by itself; a new IDLE record is only written when it is off by more than this
+IDLE_TOLERANCE_MS = 250
+
+
+class DesktopProbes:
+    """
+    What LockDetector reads from the desktop.
+
+    The Windows implementation calls the real APIs; the recording wrapper
+    writes every change to a trace, and the replay implementation answers
+    from a trace on a virtual clock so the detector runs anywhere.
+    """
+
+    available = False
+
+    def now(self):
+        """Monotonic clock in seconds (virtual when replaying)"""
+        return time.monotonic()
+
+    def foreground_window(self):
+        raise NotImplementedError
+
+    def idle_time_ms(self):
+        raise NotImplementedError
+
+    def window_count(self):
+        raise NotImplementedError
+
+    def pids(self):
+        raise NotImplementedError
+
+    def process_name(self, pid):
+        raise NotImplementedError
+
+    def process_created(self, pid):
+        """Creation time of a process (tells a reused PID apart), None if unknown"""
+        return None
+
+    def note_session(self, locked):
+        """A session lock/unlock notification arrived (ground truth for recordings)"""
+
+    def note_trigger(self):
+        """The detector launched the lockscreen"""
+
+    def summary(self):
+        """Probe counters as one log line, or None if there are none"""
+        return None
+
+    def close(self):
+        """Release whatever the probes hold (hooks, threads)"""
+
+
+class WindowsProbes(DesktopProbes):
+    """The real desktop through win32gui, user32 and psutil"""
+
+    def __init__(self):
+        self.list_pids, self.name_of, self.created_of = psutil_process_table()
+        self.available = win32gui is not None
+        self.windows = WindowTracker()  # Incremental window index behind window_count
+
+    def foreground_window(self):
+        return win32gui.GetForegroundWindow()
+
+    def idle_time_ms(self):
+        """Get system idle time in milliseconds."""
+        class LASTINPUTINFO(ctypes.Structure):
+            _fields_ = [
+                ('cbSize', ctypes.c_uint),
+                ('dwTime', ctypes.c_uint),
+            ]
+
+        lastInputInfo = LASTINPUTINFO()
+        lastInputInfo.cbSize = ctypes.sizeof(lastInputInfo)
+        if ctypes.windll.user32.GetLastInputInfo(ctypes.byref(lastInputInfo)):
+            millis = ctypes.windll.kernel32.GetTickCount() - lastInputInfo.dwTime
+            return millis
+        return 0
+
+    def window_count(self):
+        """Count the visible windows with a title."""
+        return self.windows.count()
+
+    def pids(self):
+        return self.list_pids() if self.list_pids else []
+
+    def process_name(self, pid):
+        return self.name_of(pid) if self.name_of else None
+
+    def process_created(self, pid):
+        return self.created_of(pid) if self.created_of else None
+
+    def summary(self):
+        return self.windows.summary()
+
+    def close(self):
+        self.windows.stop()
+
+
+class TraceWriter:
+    """Writes a compact binary trace of probe values"""
+
+    def __init__(self, path, clock=time.monotonic):
+        self.clock = clock
+        self.start = clock()
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, time.time()))
+        self.name_ids = {}
+        self.records = 0
+
+    def write(self, kind, value, timestamp=None):
+        """Append a record (timestamp on the writer's clock, now by default)"""
+        offset = (self.clock() if timestamp is None else timestamp) - self.start
+        self.file.write(RECORD.pack(offset, kind, value))
+        self.records += 1
+
+    def name_id(self, name, timestamp=None):
+        """Id of a process name, defined in the trace on first use"""
+        if name not in self.name_ids:
+            self.name_ids[name] = len(self.name_ids)
+            encoded = name.encode("utf-8")[:0xFFFF]
+            self.write(NAME, self.name_ids[name], timestamp)
+            self.file.write(NAME_LENGTH.pack(len(encoded)) + encoded)
+        return self.name_ids[name]
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_trace(path):
+    """
+    Read a trace file.
+
+    Returns:
+        (start wall time, list of (time_s, kind, value, name)); name is set
+        for PROCESS_START records, value is the pid for process records
+    """
+    with open(path, "rb") as trace_file:
+        data = trace_file.read()
+    magic, version, wall_start = HEADER.unpack_from(data, 0)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION:
+        raise ValueError(f"{path} is not a version {TRACE_VERSION} detector trace")
+
+    names = {}
+    records = []
+    position = HEADER.size
+    while position + RECORD.size <= len(data):
+        offset, kind, value = RECORD.unpack_from(data, position)
+        position += RECORD.size
+        if kind == NAME:
+            (length,) = NAME_LENGTH.unpack_from(data, position)
+            position += NAME_LENGTH.size
+            names[value] = data[position:position + length].decode("utf-8")
+            position += length
+        elif kind == PROCESS_START:
+            records.append((offset, kind, value & 0xFFFFFFFF, names.get(value >> 32)))
+        else:
+            records.append((offset, kind, value, None))
+    return wall_start, records
+
+
+class RecordingProbes(DesktopProbes):
+    """Passes probe calls through to another implementation and writes the changes to a trace"""
+
+    def __init__(self, inner, writer):
+        self.inner = inner
+        self.writer = writer
+        self.available = inner.available
+        self.last = {}
+        self.last_idle = None  # (time, idle ms) of the last IDLE record
+        self.names = {}        # pid -> name of the processes seen so far
+        self.created = {}      # pid -> creation time of that process (a reused PID is a new process)
+
+    def now(self):
+        return self.inner.now()
+
+    def _changed(self, kind, value):
+        if self.last.get(kind) != value:
+            self.last[kind] = value
+            self.writer.write(kind, value)
+        return value
+
+    def foreground_window(self):
+        return self._changed(FOREGROUND, self.inner.foreground_window())
+
+    def idle_time_ms(self):
+        idle = self.inner.idle_time_ms()
+        now = self.writer.clock()
+        if self.last_idle is not None:
+            last_time, last_idle = self.last_idle
+            if abs(idle - (last_idle + (now - last_time) * 1000)) <= IDLE_TOLERANCE_MS:
+                return idle
+        self.last_idle = (now, idle)
+        self.writer.write(IDLE, idle, now)
+        return idle
+
+    def window_count(self):
+        return self._changed(WINDOWS, self.inner.window_count())
+
+    def pids(self):
+        pids = self.inner.pids()
+        current = set(pids)
+        for pid in self.names.keys() - current:
+            self._stopped(pid)
+        for pid in current:
+            created = self.inner.process_created(pid)
+            if pid in self.names:
+                if self.created[pid] == created:
+                    continue
+                self._stopped(pid)  # Reused PID
+            name = self.inner.process_name(pid)
+            if name:  # Unreadable names are asked for again next time
+                self.names[pid] = name
+                self.created[pid] = created
+                self.writer.write(PROCESS_START, pid | self.writer.name_id(name) << 32)
+        return pids
+
+    def _stopped(self, pid):
+        del self.names[pid]
+        del self.created[pid]
+        self.writer.write(PROCESS_STOP, pid)
+
+    def process_name(self, pid):
+        if pid in self.names:
+            return self.names[pid]
+        return self.inner.process_name(pid)
+
+    def process_created(self, pid):
+        if pid in self.created:
+            return self.created[pid]
+        return self.inner.process_created(pid)
+
+    def note_session(self, locked):
+        self.writer.write(SESSION, 1 if locked else 0)
+        self.writer.flush()
+
+    def note_trigger(self):
+        self.writer.write(TRIGGER, 0)
+        self.writer.flush()
+
+    def summary(self):
+        return self.inner.summary()
+
+    def close(self):
+        self.inner.close()
+
+
+class ReplayProbes(DesktopProbes):
+    """
+    Answers probes from trace records at a virtual time set with advance().
+
+    Idle time grows with the virtual clock from the last IDLE record, like
+    the real one between inputs.
+    """
+
+    available = True
+
+    def __init__(self, records):
+        self.records = [record for record in records if record[1] not in (SESSION, TRIGGER)]
+        self.times = [record[0] for record in self.records]
+        self.virtual_time = 0.0
+        self.position = 0
+        self.foreground = 0
+        self.idle = (0.0, 0)
+        self.windows = 0
+        self.processes = {}
+
+    def advance(self, virtual_time):
+        """Move the virtual clock forward and apply the records up to it"""
+        self.virtual_time = virtual_time
+        end = bisect.bisect_right(self.times, virtual_time)
+        for offset, kind, value, name in self.records[self.position:end]:
+            if kind == FOREGROUND:
+                self.foreground = value
+            elif kind == IDLE:
+                self.idle = (offset, value)
+            elif kind == WINDOWS:
+                self.windows = value
+            elif kind == PROCESS_START:
+                self.processes[value] = name
+            elif kind == PROCESS_STOP:
+                self.processes.pop(value, None)
+        self.position = max(self.position, end)
+
+    def now(self):
+        return self.virtual_time
+
+    def foreground_window(self):
+        return self.foreground
+
+    def idle_time_ms(self):
+        offset, idle = self.idle
+        return int(idle + (self.virtual_time - offset) * 1000)
+
+    def window_count(self):
+        return self.windows
+
+    def pids(self):
+        return list(self.processes)
+
+    def process_name(self, pid):
+        return self.processes.get(pid)
+
+
+def session_episodes(records, end=None):
+    """Locked intervals (start, end) from the SESSION records of a trace"""
+    episodes = []
+    locked_since = None
+    for offset, kind, value, _ in records:
+        if kind != SESSION:
+            continue
+        if value and locked_since is None:
+            locked_since = offset
+        elif not value and locked_since is not None:
+            episodes.append((locked_since, offset))
+            locked_since = None
+    if locked_since is not None:
+        episodes.append((locked_since, end if end is not None else records[-1][0]))
+    return episodes
+
+
+def replay(detector, records, end=None):
+    """
+    Run a detector (built on ReplayProbes of the same records) over a trace
+    as fast as possible, polling at its scheduler's intervals.
+
+    Returns:
+        Dictionary with per-lock detection latencies, missed locks, false
+        triggers and polls per hour, judged against the SESSION records
+    """
+    probes = detector.probes
+    end = end if end is not None else (records[-1][0] if records else 0.0)
+
+    # Record triggers instead of launching anything
+    triggers = []
+    detector.trigger_lockscreen = lambda: triggers.append(probes.now())
+
+    polls = 0
+    virtual_time = 0.0
+    while virtual_time <= end:
+        probes.advance(virtual_time)
+        # Like the polling thread: the wait is chosen before the poll runs,
+        # and only cut short if the poll shrinks the interval
+        interval = detector.poll_scheduler.delay
+        detector.poll()
+        polls += 1
+        virtual_time += min(interval, detector.poll_scheduler.delay)
+
+    latencies = []
+    missed = 0
+    matched = set()
+    for lock_start, lock_end in session_episodes(records, end):
+        hits = [t for t in triggers if lock_start <= t < lock_end]
+        if hits:
+            latencies.append(hits[0] - lock_start)
+            matched.update(hits)
+        else:
+            missed += 1
+    return {
+        "latencies": sorted(latencies),
+        "missed": missed,
+        "false_triggers": len([t for t in triggers if t not in matched]),
+        "polls_per_hour": polls / (end / 3600) if end else 0.0,
+        "triggers": triggers
+    }
@@ -0,0 +1,109 @@
+import time
+
+# Declared relative costs of the probes (roughly microseconds on a typical desktop)
+COST_TRIVIAL = 1          # Comparing values read once per cycle
+COST_WINDOW_SCAN = 200    # EnumWindows with a Python callback per top-level window
+COST_PROCESS_SCAN = 500   # Process enumeration (shared per cycle by the process snapshot)
+
+
+class Signal:
+    """
+    One lock indicator: a probe returning True when it fires, its weight in
+    the lock score and its declared cost. Keeps its own timing statistics.
+    """
+
+    def __init__(self, name, weight, cost, probe):
+        self.name = name
+        self.weight = weight
+        self.cost = cost
+        self.probe = probe
+
+        # Statistics
+        self.calls = 0
+        self.skipped = 0
+        self.hits = 0
+        self.total_ns = 0
+
+    def __call__(self):
+        start = time.perf_counter_ns()
+        fired = bool(self.probe())
+        self.total_ns += time.perf_counter_ns() - start
+        self.calls += 1
+        self.hits += fired
+        return fired
+
+
+class SignalPipeline:
+    """
+    Cost-ordered, short-circuiting lock score.
+
+    Signals run cheapest first (heavier weight first among equal costs).
+    Evaluation stops as soon as the outcome is decided: once the score has
+    reached the threshold, or once even every remaining signal firing could
+    not lift it there. Vetoes (UAC) only matter for a score at the
+    threshold, so they run only then, also cheapest first, and stop at the
+    first that fires.
+    """
+
+    def __init__(self, signals, threshold, vetoes=(), short_circuit=True):
+        self.signals = sorted(signals, key=lambda signal: (signal.cost, -signal.weight))
+        self.vetoes = sorted(vetoes, key=lambda signal: signal.cost)
+        self.threshold = threshold
+        self.short_circuit = short_circuit  # False runs every signal (the old behaviour, for comparison)
+        self.evaluations = 0
+
+    def evaluate(self):
+        """
+        Compute the lock score of this cycle.
+
+        Returns:
+            (score, vetoed); score only counts the signals that ran, which
+            is enough to decide whether it reaches the threshold
+        """
+        self.evaluations += 1
+        score = 0
+        remaining = sum(signal.weight for signal in self.signals)
+        for index, signal in enumerate(self.signals):
+            if self.short_circuit and (score >= self.threshold or score + remaining < self.threshold):
+                for skipped in self.signals[index:]:
+                    skipped.skipped += 1
+                break
+            remaining -= signal.weight
+            if signal():
+                score += signal.weight
+
+        vetoed = False
+        if score >= self.threshold or not self.short_circuit:
+            for index, veto in enumerate(self.vetoes):
+                if veto():
+                    vetoed = True
+                    if self.short_circuit:
+                        for skipped in self.vetoes[index + 1:]:
+                            skipped.skipped += 1
+                        break
+        else:
+            for veto in self.vetoes:
+                veto.skipped += 1
+        return score, vetoed
+
+    def stats(self):
+        """Per-signal statistics, most expensive in total first"""
+        rows = []
+        for signal in self.signals + self.vetoes:
+            rows.append({
+                "name": signal.name,
+                "calls": signal.calls,
+                "skipped": signal.skipped,
+                "hits": signal.hits,
+                "total_ms": signal.total_ns / 1e6,
+                "mean_us": signal.total_ns / signal.calls / 1e3 if signal.calls else 0.0
+            })
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def summary(self):
+        """Per-signal timing as one log line"""
+        total = sum(row["total_ms"] for row in self.stats()) or 1.0
+        parts = [f"{row['name']} {row['total_ms']:.1f} ms ({row['total_ms'] / total:.0%}, "
+                 f"{row['calls']} run, {row['skipped']} skipped, {row['mean_us']:.0f} us avg)"
+                 for row in self.stats()]
+        return f"Lock signals over {self.evaluations} cycles: " + "; ".join(parts)
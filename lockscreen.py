@@ -11,16 +11,26 @@ import win32gui
 import win32file
 import win32api
 import win32process
-import random
+import win32event
 import atexit
-import threading
+import importlib
 from ctypes import wintypes, windll
+from keystroke_capture import KeyboardHookThread, KeystrokeCapture, KeystrokeRecord, model_channels
+import frame_governor
+import lockscreen_launcher
+import model_loader
+import readiness
+import startup_profile
 
 # Define fallback constants
 FALLBACK_THRESHOLD = 70
 
+# Modules that pull in numpy: loaded on the background thread once the first frame is up
+# (numpy is the only third-party package the lockscreen needs besides pywin32)
+DEFERRED_MODULES = ("numpy", "model_store", "scoring", "matrix_rain", "glyph_atlas", "rain_compositor")
+
 # Lock file path
-LOCK_FILE_PATH = "lockscreen.lock"
+LOCK_FILE_PATH = lockscreen_launcher.LOCK_FILE_PATH
 LOCK_FILE_HANDLE = None
 
 # Global variable to track authentication scores
@@ -76,6 +86,9 @@ security_mode_active = False
 # Initialize _hook_references as a global dictionary to fix the error
 _hook_references = {}
 
+# Key events timestamped in the keyboard hook, read back by the Tk handlers
+keystroke_capture = KeystrokeCapture()
+
 def create_temp_lock_file():
     """Create a temporary lock file that will be automatically removed when the process exits"""
     global LOCK_FILE_HANDLE
@@ -99,7 +112,7 @@ def create_temp_lock_file():
         LOCK_FILE_HANDLE = win32file.CreateFile(
             LOCK_FILE_PATH,                           # File name
             win32file.GENERIC_READ | win32file.GENERIC_WRITE,  # Access mode
-            0,                                        # Share mode - no sharing
+            win32file.FILE_SHARE_READ,                # Share mode - readers only (the detector reads the PID)
             None,                                     # Security attributes
             win32file.CREATE_ALWAYS,                  # Creation disposition
             win32file.FILE_ATTRIBUTE_TEMPORARY | win32file.FILE_FLAG_DELETE_ON_CLOSE,  # Flags and attributes
@@ -139,39 +152,45 @@ def keyboard_hook_proc(nCode, wParam, lParam):
     if nCode < 0:
         return user32.CallNextHookEx(keyboard_hook, nCode, wParam, lParam)
     
+    # Timestamp the key before anything else (kbd.time only has millisecond ticks);
+    # the hook runs on its own thread, so this is not delayed by the Tk thread.
+    # That thread has no keyboard state of its own: modifiers are read with GetAsyncKeyState.
+    timestamp = time.perf_counter_ns()
+    kbd = ctypes.cast(lParam, ctypes.POINTER(KBDLLHOOKSTRUCT)).contents
+    keystroke_capture.record(kbd.vkCode, wParam in (WM_KEYUP, WM_SYSKEYUP), timestamp)
+    
     # Always block dangerous system keys regardless of mode
     if wParam in (WM_KEYDOWN, WM_SYSKEYDOWN):
-        kbd = ctypes.cast(lParam, ctypes.POINTER(KBDLLHOOKSTRUCT)).contents
         
         # Allow Windows+L and Ctrl+Alt+Del
-        if kbd.vkCode == 0x4C and (user32.GetKeyState(win32con.VK_LWIN) & 0x8000 or 
-                                user32.GetKeyState(win32con.VK_RWIN) & 0x8000):
+        if kbd.vkCode == 0x4C and (user32.GetAsyncKeyState(win32con.VK_LWIN) & 0x8000 or 
+                                user32.GetAsyncKeyState(win32con.VK_RWIN) & 0x8000):
             return user32.CallNextHookEx(keyboard_hook, nCode, wParam, lParam)
             
         if (kbd.vkCode == win32con.VK_DELETE and 
-            (user32.GetKeyState(win32con.VK_CONTROL) & 0x8000) and 
-            (user32.GetKeyState(win32con.VK_MENU) & 0x8000)):
+            (user32.GetAsyncKeyState(win32con.VK_CONTROL) & 0x8000) and 
+            (user32.GetAsyncKeyState(win32con.VK_MENU) & 0x8000)):
             return user32.CallNextHookEx(keyboard_hook, nCode, wParam, lParam)
         
         # Block Alt+Tab, Alt+Esc, Ctrl+Esc, etc.
         if ((kbd.vkCode == win32con.VK_TAB and (kbd.flags & LLKHF_ALTDOWN)) or
             (kbd.vkCode == win32con.VK_ESCAPE and (kbd.flags & LLKHF_ALTDOWN)) or
-            (kbd.vkCode == win32con.VK_ESCAPE and (user32.GetKeyState(win32con.VK_CONTROL) & 0x8000)) or
-            (kbd.vkCode == win32con.VK_ESCAPE and (user32.GetKeyState(win32con.VK_SHIFT) & 0x8000) and 
-             (user32.GetKeyState(win32con.VK_CONTROL) & 0x8000)) or
+            (kbd.vkCode == win32con.VK_ESCAPE and (user32.GetAsyncKeyState(win32con.VK_CONTROL) & 0x8000)) or
+            (kbd.vkCode == win32con.VK_ESCAPE and (user32.GetAsyncKeyState(win32con.VK_SHIFT) & 0x8000) and 
+             (user32.GetAsyncKeyState(win32con.VK_CONTROL) & 0x8000)) or
             kbd.vkCode == win32con.VK_LWIN or kbd.vkCode == win32con.VK_RWIN or
             (kbd.vkCode == win32con.VK_F4 and (kbd.flags & LLKHF_ALTDOWN))):
             return 1  # Block the key
             
         # Block Windows+R, Windows+E, Windows+X, etc.
-        if ((user32.GetKeyState(win32con.VK_LWIN) & 0x8000 or 
-             user32.GetKeyState(win32con.VK_RWIN) & 0x8000)):
+        if ((user32.GetAsyncKeyState(win32con.VK_LWIN) & 0x8000 or 
+             user32.GetAsyncKeyState(win32con.VK_RWIN) & 0x8000)):
             return 1  # Block Windows key combinations
             
         # Block Ctrl+Shift+Esc (Task Manager)
         if (kbd.vkCode == win32con.VK_ESCAPE and 
-            (user32.GetKeyState(win32con.VK_CONTROL) & 0x8000) and 
-            (user32.GetKeyState(win32con.VK_SHIFT) & 0x8000)):
+            (user32.GetAsyncKeyState(win32con.VK_CONTROL) & 0x8000) and 
+            (user32.GetAsyncKeyState(win32con.VK_SHIFT) & 0x8000)):
             return 1  # Block the key
             
         # Block all function keys (F1-F12)
@@ -189,8 +208,9 @@ def keyboard_hook_proc(nCode, wParam, lParam):
     return user32.CallNextHookEx(keyboard_hook, nCode, wParam, lParam)
 
 class KeystrokeLockscreen:
-    def __init__(self, root):
+    def __init__(self, root, startup=None):
         self.root = root
+        self.startup = startup or startup_profile.StartupProfile()  # Timeline of this launch
         self.root.title("Security Lockscreen")
         
         # Flag to prevent double cleanup
@@ -201,7 +221,9 @@ class KeystrokeLockscreen:
         self.root.configure(bg='black')
 
         # Initialize basic variables
-        self.matrix_rain_drops = []
+        self.matrix_rain = None  # MatrixRain, created once the canvas exists
+        self.rain_compositor = None  # RainCompositor when the composited backend is used
+        self.matrix_photo = None  # Image the compositor's frames are shown in
         self.matrix_rain_running = True
         self.security_questions = {}
         self.current_question_index = 0
@@ -217,15 +239,15 @@ class KeystrokeLockscreen:
             "matrix_density": 5
         }
         self.current_input = ""
-        self.keystroke_times = []
-        self.last_keystroke_time = None
+        self.key_record = KeystrokeRecord()  # Press/release times of the current attempt
         self.model = None
+        self.compiled_model = None
         self.PASSWORD = ""
         self.THRESHOLD = FALLBACK_THRESHOLD
         self.hook_installed = False
-        self.last_matrix_update = 0
-        self.matrix_update_interval = 50  # ms
-        self.char_image_cache = {}  # For caching character images
+        self.frame_governor = frame_governor.FrameGovernor()  # Paces the matrix rain from measured frame cost
+        self.matrix_after_id = None  # Pending after() of the animation loop
+        self.char_image_cache = None  # GlyphAtlas of pre-rendered matrix sprites, created with the canvas
         
         # Create the canvas for the Matrix Rain effect - deferred initialization
         self.canvas = None
@@ -239,14 +261,27 @@ class KeystrokeLockscreen:
         # Create minimal GUI first for faster startup
         self.quick_setup_gui()
         
-        # Start a thread to load the model and heavy components
-        threading.Thread(target=self.deferred_initialization, daemon=True).start()
+        # Load the model and heavy modules on a worker; its result comes back on the Tk thread
+        self.loader = model_loader.BackgroundLoader(self.root)
+        self.model_future = self.loader.submit(load_in_background)
+        self.model_future.add_done_callback(self.on_model_loaded)
+        self.verify_pending = False  # An Enter press is waiting for the model
         
         # Start time update right away
         self.update_time()
         
         # Override window manager and block all escape methods
         self.setup_window_manager_override()
+        
+        # Announce readiness (0.bat restores explorer on it) once the window has been drawn
+        self.readiness = readiness.ReadinessChannel("lockscreen")
+        self.root.after_idle(self.on_first_frame)
+
+    def on_first_frame(self):
+        """The window has been drawn: record it and tell whoever waits for the lockscreen"""
+        self.startup.mark(startup_profile.FIRST_FRAME)
+        self.readiness.signal(readiness.READY)
+        self.root.after(0, self.deferred_initialization)
 
     def setup_window_manager_override(self):
         """Make sure window stays on top and intercepts all keys"""
@@ -274,7 +309,7 @@ class KeystrokeLockscreen:
             self.root.after(100, self.keep_on_top)
 
     def deferred_initialization(self):
-        """Load heavy components after initial GUI is shown"""
+        """Create the rest of the GUI once the first frame is up (Tk thread)"""
         # Create the canvas for the Matrix Rain effect - deferred for faster startup
         self.canvas = tk.Canvas(self.root, width=self.root.winfo_screenwidth(), 
                                height=self.root.winfo_screenheight(), 
@@ -282,14 +317,6 @@ class KeystrokeLockscreen:
         self.canvas.pack(fill='both', expand=True)
         self.frame.lift()  # Keep UI elements on top of canvas
         
-        # Import heavy modules only when needed
-        import numpy as np
-        from sklearn.preprocessing import StandardScaler
-        import pickle
-        
-        # These imports are used later and can be loaded in background
-        self.np = np
-        
         # Hide taskbar (deferred to reduce startup time)
         self.root.after(100, self.hide_taskbar)
         
@@ -299,51 +326,42 @@ class KeystrokeLockscreen:
         # Block Windows keys using Tkinter bindings as backup
         self.root.after(300, self.block_windows_keys)
         
-        # Load model (potentially slow operation)
-        if not self.load_model():
-            logging.error("No trained model found! Closing application.")
-            self.root.after(0, lambda: self.show_error_and_close("Error: No trained model found! Please run training first."))
+        # The model may have arrived before the canvas
+        if self.model is not None:
+            self.init_matrix_rain_effect_incremental()
+
+    def on_model_loaded(self, future):
+        """Take over the loaded model and finish the GUI (Tk thread)"""
+        if future.exception() is not None:
+            logging.error(f"{future.exception()} Closing application.")
+            self.show_error_and_close("Error: No trained model found! Please run training first.")
             self.root.after(2000, self.cleanup)  # Close after 2 seconds
             return
-            
-        # Now that we have the necessary data, initialize matrix effect
-        # Use after() to ensure this runs on the main thread
-        self.root.after(0, self.init_matrix_rain_effect_incremental)
         
-        # Complete the GUI setup with all elements
-        self.root.after(0, self.complete_gui_setup)
+        self.apply_model(*future.result())
+        self.startup.mark(startup_profile.MODEL_LOADED)
+        
+        # Start the matrix effect (once the canvas exists) and complete the GUI
+        self.init_matrix_rain_effect_incremental()
+        self.complete_gui_setup()
 
     def install_keyboard_hook(self):
-        """Install keyboard hook with fixes for .exe compatibility"""
+        """Install the keyboard hook on a thread of its own (its timestamps then miss the Tk thread's delays)"""
         global keyboard_hook, _hook_references
 
         if self.hook_installed:
             return
 
         try:
-            # Store reference to prevent garbage collection
-            _hook_references['proc'] = keyboard_hook_proc  
-
-            # Get module handle for PyInstaller EXE
-            if getattr(sys, 'frozen', False):  
-                module_handle = ctypes.windll.kernel32.GetModuleHandleW(None)  # Use EXE handle
-            else:
-                module_handle = win32api.GetModuleHandle(None)  # Normal script execution
-
-            # Use SetWindowsHookExW instead of SetWindowsHookExA
-            keyboard_hook = user32.SetWindowsHookExW(
-                WH_KEYBOARD_LL,
-                _hook_references['proc'],  # Use stored reference
-                module_handle,
-                0
-            )
-
-            if not keyboard_hook:
-                error_code = ctypes.get_last_error()
-                logging.error(f"Failed to install keyboard hook: {error_code}")
+            # The thread keeps the callback referenced for as long as the hook is installed
+            hook_thread = KeyboardHookThread(keyboard_hook_proc)
+            if not hook_thread.start():
+                logging.error(f"Failed to install keyboard hook: {hook_thread.error}")
             else:
+                keyboard_hook = hook_thread.hook
                 self.hook_installed = True
-                _hook_references['hook_id'] = keyboard_hook  # Store hook handle
+                self.startup.mark(startup_profile.HOOK_INSTALLED)
+                _hook_references['thread'] = hook_thread
                 logging.info("Keyboard hook installed successfully in .exe")
 
         except Exception as e:
@@ -353,18 +371,13 @@ class KeystrokeLockscreen:
         """Remove the low-level keyboard hook when exiting"""
         global keyboard_hook, _hook_references
         
-        if keyboard_hook and self.hook_installed:
+        hook_thread = _hook_references.get('thread')
+        if hook_thread and self.hook_installed:
             try:
-                if user32.UnhookWindowsHookEx(keyboard_hook):
-                    keyboard_hook = None
-                    self.hook_installed = False
-                    logging.info("Keyboard hook uninstalled successfully")
-
-                    # Don't reinstall the hook after closing
-                    # time.sleep(1)  
-                    # self.install_keyboard_hook()  
-                else:
-                    logging.error(f"Failed to uninstall keyboard hook: {ctypes.get_last_error()}")
+                hook_thread.stop()
+                keyboard_hook = None
+                self.hook_installed = False
+                logging.info("Keyboard hook uninstalled successfully")
             except Exception as e:
                 logging.error(f"Error uninstalling keyboard hook: {e}")
 
@@ -478,6 +491,9 @@ class KeystrokeLockscreen:
         
         # Start blinking cursor
         self.update_cursor()
+        
+        # The password prompt is up
+        self.startup.mark(startup_profile.INPUT_READY)
 
     def update_cursor(self):
         """Create blinking cursor effect for security question input"""
@@ -666,66 +682,39 @@ class KeystrokeLockscreen:
         
         # Main key handler
         self.root.bind('<Key>', self.on_key_press)
+        self.root.bind('<KeyRelease>', self.on_key_release)
         
         # Force focus back if it's lost
         self.root.bind_all("<FocusOut>", lambda e: self.root.focus_force())
         
-    def load_model(self):
-        """Load the trained keystroke model"""
-        try:
-            # Import pickle only when needed
-            import pickle
+    def apply_model(self, model, compiled_model):
+        """Use a model opened and checked by model_loader.load_model_data"""
+        self.model = model
+        self.compiled_model = compiled_model
+        self.PASSWORD = model["password"]
             
-            with open("typing_model.pkl", "rb") as model_file:
-                self.model = pickle.load(model_file)
-                
-            # Get the password from the model - handle field name changes
-            if "password" in self.model:
-                self.PASSWORD = self.model["password"]
-            else:
-                logging.error("No password found in model!")
-                return False
-                
-            # Get the threshold - handle field name changes
-            if "threshold" in self.model:
-                self.THRESHOLD = self.model["threshold"]
-            else:
-                logging.warning("No threshold found in model, using default")
-                self.THRESHOLD = FALLBACK_THRESHOLD
-                
-            # Load security questions from model
-            if "security_questions" in self.model:
-                self.security_questions = self.model["security_questions"]
-                if not self.security_questions:
-                    logging.warning("Security questions dict is empty")
-            else:
-                logging.warning("No security questions found in model!")
-                
-            # Load matrix settings from model
-            if "matrix_settings" in self.model:
-                self.matrix_settings = self.model["matrix_settings"]
+        # Get the threshold - handle field name changes
+        if "threshold" in model:
+            self.THRESHOLD = model["threshold"]
+        else:
+            logging.warning("No threshold found in model, using default")
+            self.THRESHOLD = FALLBACK_THRESHOLD
             
-            # Verify critical components exist in the model
-            if "train_data" not in self.model and "training_data" not in self.model:
-                logging.error("No training data found in model!")
-                return False
-                
-            # Handle potential field name differences between old and new model
-            if "train_data" in self.model:
-                self.model["training_data"] = self.model["train_data"]
-                
-            if "avg_self_similarity" not in self.model:
-                logging.error("No average self similarity found in model!")
-                return False
-                
-            logging.info("Model loaded successfully")
-            return True
-        except FileNotFoundError:
-            logging.error("No trained model found!")
-            return False
-        except Exception as e:
-            logging.error(f"Error loading model: {e}")
-            return False
+        # Load security questions from model
+        if "security_questions" in model:
+            self.security_questions = model["security_questions"]
+            if not self.security_questions:
+                logging.warning("Security questions dict is empty")
+        else:
+            logging.warning("No security questions found in model!")
+            
+        # Load matrix settings from model
+        if "matrix_settings" in model:
+            self.matrix_settings = model["matrix_settings"]
+            self.frame_governor = frame_governor.FrameGovernor(
+                frame_governor.governor_settings(self.matrix_settings))
+            
+        logging.info("Model loaded successfully")
             
     def show_error_and_close(self, message):
         """Show error message and close on key press"""
@@ -748,8 +737,8 @@ class KeystrokeLockscreen:
     def reset_input(self):
         """Reset all input-related variables"""
         self.current_input = ""
-        self.keystroke_times = []
-        self.last_keystroke_time = None
+        self.key_record.clear()
+        keystroke_capture.clear()  # Keys from before this attempt must not be matched
         self.password_display.config(text="")
         
     def blink_text(self, label):
@@ -773,112 +762,38 @@ class KeystrokeLockscreen:
         if event.keysym == 'BackSpace':
             if self.current_input:
                 self.current_input = self.current_input[:-1]
-                self.keystroke_times = self.keystroke_times[:-1] if self.keystroke_times else []
+                self.key_record.pop()
                 self.password_display.config(text="*" * len(self.current_input))
             return 'break'
             
         if event.char and event.char.isprintable():
-            current_time = time.time()
-            
-            if self.last_keystroke_time is not None:
-                interval = current_time - self.last_keystroke_time
-                self.keystroke_times.append(interval)
-            
-            self.last_keystroke_time = current_time
+            # Hook-level timestamp of this key (perf_counter_ns if it was not captured)
+            self.key_record.press(event.keycode, keystroke_capture.take_press(event.keycode))
+            self.frame_governor.note_key()  # Thin out the animation while typing
             self.current_input += event.char
             
             self.password_display.config(text="*" * len(self.current_input))
                 
         return 'break'
 
-    def calculate_pattern_score(self, test_intervals):
-        """Calculate pattern similarity score (0.0 to 1.0)"""
-        import numpy as np
-        # Import numpy here for late loading if needed
-        if not hasattr(self, 'np'):
-            import numpy as np
-            self.np = np
-            
-        # Get required components from model
-        scaler = self.model.get("scaler", None)
-        train_data = self.model.get("train_data", self.model.get("training_data", None))
-        avg_self_similarity = self.model.get("avg_self_similarity", 1.0)
-        
-        if scaler is None or train_data is None:
-            return 0.0  # Cannot calculate without these components
-            
-        # Scale the test features for comparison    
-        test_features = np.array([test_intervals])
-        test_features_scaled = scaler.transform(test_features)
-        
-        # Calculate pattern similarity
-        distances = [np.linalg.norm(test_features_scaled - train_sample) 
-                   for train_sample in train_data]
-        avg_distance = np.mean(distances)
-
-        # Add a tolerance factor (0.5 means 50% more lenient)
-        tolerance_factor = 0.5
-        adjusted_distance = avg_distance * (1 - tolerance_factor)
-        
-        # Calculate similarity score (0.0 to 1.0)
-        similarity = avg_self_similarity / (avg_self_similarity + adjusted_distance)
-        
-        # Cap at 1.0 and ensure non-negative
-        return max(0.0, min(similarity, 1.0))
-
-    def calculate_interval_score(self, test_intervals):
-        """Calculate interval matching score (0.0 to 1.0)"""
-        import numpy as np
-        if "interval_lower_thresholds" not in self.model or "interval_upper_thresholds" not in self.model:
-            return 0.0  # Cannot calculate without thresholds
-            
-        lower_bounds = self.model["interval_lower_thresholds"]
-        upper_bounds = self.model["interval_upper_thresholds"]
-
-        # Add padding to the bounds 
-        lower_bounds = [bound * 0.00 for bound in lower_bounds]
-        upper_bounds = [bound * 2.00 for bound in upper_bounds]
-        
-        # Check how many intervals are within acceptable ranges
-        within_bounds = []
-        for i, interval in enumerate(test_intervals):
-            if i < len(lower_bounds) and lower_bounds[i] <= interval <= upper_bounds[i]:
-                within_bounds.append(True)
-            else:
-                within_bounds.append(False)
-        
-        # Return percentage of intervals that match
-        if not within_bounds:
-            return 0.0
-            
-        return sum(within_bounds) / len(within_bounds)
-
-    def calculate_speed_score(self, test_intervals):
-        """Calculate speed consistency score (0.0 to 1.0)"""
-        import numpy as np
-        if "avg_typing_speed" not in self.model or "std_dev_typing_speed" not in self.model:
-            return 0.0  # Cannot calculate without these parameters
-            
-        avg_typing_speed = self.model.get("avg_typing_speed", 0)
-        std_dev_typing_speed = self.model.get("std_dev_typing_speed", 0.01)  # Prevent division by zero
-        
-        # Calculate current typing speed
-        current_avg_speed = sum(test_intervals) / len(test_intervals)
-        
-        # Calculate z-score (how many standard deviations from mean)
-        z_score = abs((current_avg_speed - avg_typing_speed) / std_dev_typing_speed)
-        
-        # Convert to score (0.0 to 1.0)
-        # A z-score of 2.0 or greater results in a score of 0.0
-        return max(0.0, min(1.0 - (z_score / 2.0), 1.0))
+    def on_key_release(self, event):
+        """Record when a password key is released (dwell and flight times)"""
+        if self.security_mode:
+            return
+        self.key_record.release(event.keycode, keystroke_capture.take_release(event.keycode))
 
     def verify_input(self):
         """Verify password using the enhanced hybrid security approach"""
-        import numpy as np
-        if not hasattr(self, 'np'):
-            import numpy as np
-            self.np = np
-            
+        # Enter before the model is in: check this attempt as soon as it is
+        if not self.model_future.done():
+            if not self.verify_pending:
+                self.verify_pending = True
+                self.instruction_label.config(text="Loading model...")
+                self.model_future.add_done_callback(self.verify_when_loaded)
+            return
+        if self.model is None:
+            return  # Loading failed; the error is on screen
+        
         # Reset global auth scores for this attempt
         global_auth_scores = {
             "weighted_score": 0.0,
@@ -896,7 +811,7 @@ class KeystrokeLockscreen:
             self.reset_input()
             return
             
-        if len(self.keystroke_times) != len(self.PASSWORD) - 1:
+        if len(self.key_record) != len(self.PASSWORD):
             self.handle_failed_attempt("Incomplete keystroke data")
             self.reset_input()
             return
@@ -907,65 +822,31 @@ class KeystrokeLockscreen:
             self.reset_input()
             return
                 
-        # STEP 1: Calculate individual scores using the hybrid approach
-        pattern_score = self.calculate_pattern_score(self.keystroke_times)
-        interval_score = self.calculate_interval_score(self.keystroke_times)
-        speed_score = self.calculate_speed_score(self.keystroke_times)
+        # STEP 1: Calculate all scores and the weighted decision in one pass
+        import scoring
+        if self.compiled_model is None:
+            self.compiled_model = scoring.compile_model(self.model)
+        features = self.key_record.features(model_channels(self.model))
+        scores = scoring.score_attempt(self.compiled_model, features, scoring.LOCKSCREEN_PROFILE)
+        pattern_score = scores["pattern_score"]
+        interval_score = scores["interval_score"]
+        speed_score = scores["speed_score"]
+        weighted_score = scores["weighted_score"]
+        overall_threshold = scores["threshold"]
 
         global_auth_scores["pattern_score"] = pattern_score
         global_auth_scores["interval_score"] = interval_score
         global_auth_scores["speed_score"] = speed_score
-        
-        # STEP 2: Security level settings
-        security_settings = {
-            "low":       (0.25, 0.30, 0.50),  # Much more forgiving
-            "medium":    (0.30, 0.35, 0.60),  # More reasonable thresholds
-            "high":      (0.40, 0.40, 0.65),  # Less strict than current
-            "very_high": (0.50, 0.50, 0.70)   # Still strict but achievable
-        }
-        
-        # Get security level from model or use default
-        security_level = self.model.get("security_level", "high")
-        interval_minimum, secondary_minimum, overall_threshold = security_settings.get(
-            security_level, security_settings["high"])
-
-        # Use the actual user-defined threshold 
-        overall_threshold = self.THRESHOLD / 100.0
-
-        # Convert percentage to decimal (e.g., 70 -> 0.70)
-        user_threshold = self.THRESHOLD / 100.0
+        global_auth_scores["threshold"] = overall_threshold
 
-        # Calculate weighted score 
-        weights = {"interval": 0.40, "pattern": 0.40, "speed": 0.20}
-        weighted_score = (
-            weights["interval"] * interval_score +
-            weights["pattern"] * pattern_score +
-            weights["speed"] * speed_score
-        )
-    
-        # Add bonus for excellence in interval matching
-        if interval_score > 0.70:  # If most intervals are already correct
-            bonus = 0.05 + ((interval_score - 0.60) * 0.50)
-            weighted_score += bonus
-
-        # If ANY factor is excellent (>0.8), add bonus
-        best_factor = max(pattern_score, speed_score)
-        if best_factor > 0.8:
-            bonus1 = (best_factor - 0.8) * 0.25
-            weighted_score += bonus1
-
-        # Consistency bonus if scores are similar
-        if abs(pattern_score - interval_score) < 0.2:
-            weighted_score += 0.05  # 5% bonus for consistent scores
-        
         # Store the weighted score globally
         global_auth_scores["weighted_score"] = weighted_score
         global_auth_scores["valid_scores"] = True  # Now we have valid scores
 
         # Authentication criteria
-        interval_passed = interval_score >= interval_minimum
-        secondary_passed = pattern_score >= secondary_minimum or speed_score >= secondary_minimum
-        threshold_passed = weighted_score >= overall_threshold
+        interval_passed = scores["interval_passed"]
+        secondary_passed = scores["secondary_passed"]
+        threshold_passed = scores["threshold_passed"]
 
         # Status indicator
         password_status = "✔"
@@ -979,6 +860,7 @@ class KeystrokeLockscreen:
             success_message = f"AUTHENTICATION STATUS: {int(weighted_score*100)} > {int(overall_threshold*100)}"
             logging.info(f"Authentication successful: {success_message}")
             self.unlock_system()
+            self.adapt_model(features)
             return
     
         # Authentication failed - determine reason and create appropriate message
@@ -995,6 +877,12 @@ class KeystrokeLockscreen:
         self.handle_failed_attempt(error_message)
         self.reset_input()
 
+    def verify_when_loaded(self, future):
+        """Check the attempt typed while the model was loading"""
+        self.verify_pending = False
+        if future.exception() is None:
+            self.verify_input()
+
     def handle_failed_attempt(self, message):
         """Handle failed authentication attempts"""
         global global_auth_scores
@@ -1017,212 +905,122 @@ class KeystrokeLockscreen:
         self.uninstall_keyboard_hook()
         self.root.after(1000, self.cleanup)
 
+    def adapt_model(self, features):
+        """Fold the accepted attempt into the model when adaptive enrollment is enabled"""
+        import adaptive_enrollment
+        try:
+            start = time.perf_counter()
+            if adaptive_enrollment.adapt_model(self.model, features) is not None:
+                self.compiled_model = None
+                logging.info(f"Adaptive enrollment updated in {(time.perf_counter() - start) * 1000:.1f} ms")
+        except Exception as e:
+            # Never let adaptation get in the way of unlocking
+            logging.error(f"Adaptive enrollment update failed: {e}")
+
     def get_character_set(self):
         """Get characters for matrix rain based on settings"""
-        char_set = self.matrix_settings["char_set"]
-        
-        if char_set == "alphanumeric":
-            return 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-        elif char_set == "latin":
-            return 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
-        elif char_set == "numbers":
-            return '0123456789'
-        elif char_set == "symbols":
-            return '!@#$%^&*()_+-=[]{}|;:,./<>?~`'
-        elif char_set == "custom" and self.matrix_settings["custom_chars"]:
-            return self.matrix_settings["custom_chars"]
-        else:
-            return 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+        import matrix_rain
+        return matrix_rain.character_set(self.matrix_settings)
+
+    def get_glyph_atlas(self):
+        """Sprite cache shared by every matrix rain effect of this window"""
+        if self.char_image_cache is None:
+            import glyph_atlas
+            self.char_image_cache = glyph_atlas.GlyphAtlas(self.root)
+            if not self.char_image_cache.available:
+                logging.warning("No glyph rasterizer available, matrix rain falls back to text items")
+        return self.char_image_cache
 
     def init_matrix_rain_effect_incremental(self):
         """Initialize the Matrix Rain effect with incremental loading for better performance"""
         # Check if canvas exists yet - it might not during startup
         if not self.canvas:
             return
+        import matrix_rain
+        import rain_compositor
             
-        # Get settings from model
-        screen_width = self.root.winfo_screenwidth()
-        screen_height = self.root.winfo_screenheight()
-        
-        # Get density from settings
-        density = self.matrix_settings["matrix_density"]
-        density_factor = density / 10  # Convert 1-20 scale to a multiplier
-        drop_spacing = max(5, int(7.5 / density_factor))  # Adjust spacing based on density
-        
-        # Characters to use
-        chars = self.get_character_set()
-        special_char = self.matrix_settings["special_char"]
-        
-        # Get speed from settings
-        speed_setting = self.matrix_settings["matrix_speed"]
-        base_speed = max(2, min(int(speed_setting / 2), 15))
-        
-        # Clear existing drops
-        self.matrix_rain_drops = []
-        
-        # Create initial set of drops for immediate visual feedback
-        # Use every column but fewer drops per column initially
-        for x in range(0, screen_width, drop_spacing):
-            # Initial number of drops in each column
-            num_initial_drops = int(max(10, 20 * density_factor * 0.6))  # 60% of full density
+        # Replace any previous effect (settings may have changed)
+        if self.matrix_rain is not None:
+            self.matrix_rain.clear()
+        self.stop_matrix_compositor()
+        
+        width = self.root.winfo_screenwidth()
+        height = self.root.winfo_screenheight()
+        atlas = self.get_glyph_atlas()
+        backend = self.matrix_settings.get("render_backend", rain_compositor.DEFAULT_RENDER_BACKEND)
+        if backend == "composited" and atlas.available:
+            # Drops are simulated and drawn by a worker; the canvas only shows one image
+            self.matrix_rain = matrix_rain.MatrixRain(None, self.matrix_settings, width, height)
+            self.matrix_rain.seed_initial_drops()
+            self.rain_compositor = rain_compositor.RainCompositor(self.matrix_rain, atlas, width, height)
+            self.matrix_photo = tk.PhotoImage(master=self.root, width=width, height=height)
+            self.canvas.create_image(0, 0, anchor='nw', image=self.matrix_photo, tags=('matrix_image',))
+            self.rain_compositor.start()
+        else:
+            self.matrix_rain = matrix_rain.MatrixRain(self.canvas, self.matrix_settings, width, height, atlas=atlas)
             
-            for i in range(num_initial_drops):
-                # Distribute evenly across full height range
-                y_position = int((i / num_initial_drops) * screen_height * 2) - screen_height // 2
-                # Add some randomness to positions
-                y_position += random.randint(-100, 100)
-                
-                speed = random.randint(base_speed, base_speed + 5)
-                is_special = random.random() < 0.01  # 1% chance to be special
-                
-                drop = {
-                    'x': x,
-                    'y': y_position,
-                    'speed': speed,
-                    'char': special_char if is_special else random.choice(chars)
-                }
-                self.matrix_rain_drops.append(drop)
+            # Create initial set of drops for immediate visual feedback
+            self.matrix_rain.seed_initial_drops()
         
         # Start the animation with initial drops
         self.update_matrix_rain_effect()
         
         # Schedule adding remaining drops
-        self.root.after(50, lambda: self.add_remaining_drops(drop_spacing, chars, special_char, base_speed, 
-                                                            density_factor, screen_height, screen_width))
+        self.root.after(50, lambda: self.add_remaining_drops(self.matrix_rain))
 
-    def add_remaining_drops(self, drop_spacing, chars, special_char, base_speed, density_factor, screen_height, screen_width):
+    def add_remaining_drops(self, rain):
         """Add the remaining matrix drops to complete the effect to match original density"""
-        # Check if window still exists
-        if not self.root.winfo_exists():
+        # Check if window still exists and the effect was not replaced meanwhile
+        if not self.root.winfo_exists() or rain is not self.matrix_rain:
             return
             
-        # Calculate how many total drops we should have based on original algorithm
-        total_columns = screen_width // drop_spacing
-        target_drops_per_column = int(20 * density_factor)
-        target_total_drops = total_columns * target_drops_per_column
-        
-        # Only add the difference between target and current
-        current_drops = len(self.matrix_rain_drops)
-        drops_to_add = target_total_drops - current_drops
-        
-        if drops_to_add <= 0:
-            return  # Already at or above target
-        
         # Add remaining drops in batches for better performance
-        batch_size = min(500, drops_to_add)
-        
-        for _ in range(batch_size):
-            # Random position in same columns as original
-            x = random.choice(range(0, screen_width, drop_spacing))
-            y_position = random.randint(-screen_height, screen_height)
-            
-            speed = random.randint(base_speed, base_speed + 5)
-            is_special = random.random() < 0.01  # 1% chance
-            
-            drop = {
-                'x': x,
-                'y': y_position,
-                'speed': speed,
-                'char': special_char if is_special else random.choice(chars)
-            }
-            self.matrix_rain_drops.append(drop)
+        remaining = rain.add_drops()
         
         # If we have more drops to add, schedule the next batch
-        remaining = drops_to_add - batch_size
         if remaining > 0:
-            self.root.after(20, lambda: self.add_remaining_drops(drop_spacing, chars, special_char, base_speed, 
-                                                            density_factor, screen_height, screen_width))
+            self.root.after(20, lambda: self.add_remaining_drops(rain))
+
+    def stop_matrix_compositor(self):
+        """Stop the compositor worker and remove its image, if the composited backend is running"""
+        if self.rain_compositor is None:
+            return
+        self.rain_compositor.stop()
+        self.rain_compositor = None
+        if self.canvas:
+            self.canvas.delete('matrix_image')
+        self.matrix_photo = None
 
     def update_matrix_rain_effect(self):
-        """Update the Matrix Rain effect animation - optimized version"""
-        if not self.matrix_rain_running or not self.canvas:
+        """Update the Matrix Rain effect animation, paced by the frame governor"""
+        # Only one animation loop at a time (resume and restart call in here directly)
+        if self.matrix_after_id is not None:
+            self.root.after_cancel(self.matrix_after_id)
+            self.matrix_after_id = None
+            
+        if not self.matrix_rain_running or not self.canvas or self.matrix_rain is None:
             return
         
-        # Performance: Check if enough time has passed since last update
-        current_time = time.time() * 1000
-        if current_time - self.last_matrix_update < self.matrix_update_interval:
-            self.root.after(self.matrix_update_interval, self.update_matrix_rain_effect)
-            return
+        start = time.perf_counter()
         
-        self.last_matrix_update = current_time
-        self.canvas.delete('all')
-        
-        char_set = self.get_character_set()
-        special_char = self.matrix_settings["special_char"]
-        color = self.matrix_settings["matrix_color"]
-        screen_height = self.root.winfo_screenheight()
-        screen_width = self.root.winfo_screenwidth()
-
-        # Define the brighter color for special character
-        special_color = color
-        if color == "lime":
-            special_color = "#AAFFAA"  # Brighter lime
-        elif color == "green":
-            special_color = "#228B22"  # Brighter green
-        elif color == "cyan":
-            special_color = "#AAFFFF"  # Brighter cyan
-        elif color == "red":
-            special_color = "#EE4B2B"  # Brighter red
-        elif color == "white":
-            special_color = "#FFFFFF"  # Pure white
-        elif color == "yellow":
-            special_color = "#FFFFAA"  # Brighter yellow
-
-        # Font sizes
-        standard_size = 15
-        special_size = int(standard_size * 1.05)
-
-        # Performance optimization: Only update drops within viewport with some margin
-        visible_drops = []
-        for drop in self.matrix_rain_drops:
-            # Update position first
-            drop['y'] += drop['speed']
-            
-            # If in visible area (with margin), add to visible drops
-            if -100 <= drop['y'] <= screen_height + 100 and 0 <= drop['x'] <= screen_width:
-                visible_drops.append(drop)
-                
-                # If drop goes off screen, reset it
-                if drop['y'] > screen_height:
-                    drop['y'] = random.randint(-100, 0)  # Start slightly above the screen
-                    drop['char'] = random.choice(char_set)
-                    
-                    # Small chance to make it a special character
-                    if random.random() < 0.01:  # 1% chance
-                        drop['char'] = special_char
-                    
-                    # Update speed based on settings
-                    speed_value = max(2, min(int(self.matrix_settings["matrix_speed"] / 2), 15))
-                    drop['speed'] = random.randint(speed_value, speed_value + 5)
-        
-        # Performance optimization: Batch processing for rendering
-        for drop in visible_drops:
-            # Determine if this is a special character
-            is_special = drop['char'] == special_char
-            
-            # Create text with appropriate properties
-            if is_special:
-                self.canvas.create_text(
-                    drop['x'], drop['y'], 
-                    text=drop['char'], 
-                    fill=special_color,
-                    font=('Courier', special_size, 'bold'),
-                    tags=('matrix_char', 'special_char')
-                )
-            else:
-                self.canvas.create_text(
-                    drop['x'], drop['y'], 
-                    text=drop['char'], 
-                    fill=color,
-                    font=('Courier', standard_size), 
-                    tags='matrix_char'
-                )
+        if self.rain_compositor is not None:
+            # Show the worker's newest frame and let it start on the next
+            self.rain_compositor.present(self.matrix_photo)
+        else:
+            # Advance the drops and update only the canvas items that changed
+            self.matrix_rain.frame()
         
         # Ensure UI elements remain on top
         self.frame.lift()
-                
-        # Schedule next update with adaptive timing
-        self.root.after(self.matrix_update_interval, self.update_matrix_rain_effect)
+        
+        # Let Tk redraw now so the measured cost includes the drawing
+        self.canvas.update_idletasks()
+        
+        # Next frame after the rest of the frame period, at the density the budget allows
+        self.startup.mark(startup_profile.MATRIX_RUNNING)
+        delay = self.frame_governor.record_frame(start, (time.perf_counter() - start) * 1000)
+        self.matrix_rain.set_density(self.frame_governor.density)
+        self.matrix_after_id = self.root.after(delay, self.update_matrix_rain_effect)
    
     def toggle_matrix_rain(self):
         """Toggle the Matrix Rain effect"""
@@ -1231,17 +1029,22 @@ class KeystrokeLockscreen:
             self.update_matrix_rain_effect()
             if self.canvas:
                 self.canvas.tag_unbind('special_char', '<Double-1>')
+                self.canvas.tag_unbind('matrix_image', '<Double-1>')
         else:
             # Bind double-click event to check for special character when paused
+            # (the composited backend has one image item, so it is checked by position)
             if self.canvas:
                 self.canvas.tag_bind('special_char', '<Double-1>', self.matrix_double_click_handler)
+                self.canvas.tag_bind('matrix_image', '<Double-1>', self.matrix_double_click_handler)
 
     def matrix_double_click_handler(self, event):
         """Handle double-clicks on matrix characters"""
         if not self.matrix_rain_running:
-            item = self.canvas.find_closest(event.x, event.y)
             try:
-                char = self.canvas.itemcget(item, 'text')
+                if self.rain_compositor is not None:
+                    char = self.matrix_rain.char_near(event.x, event.y)
+                else:
+                    char = self.matrix_rain.char_for_item(self.canvas.find_closest(event.x, event.y))
                 special_char = self.matrix_settings["special_char"]
                 
                 if char == special_char:
@@ -1257,17 +1060,22 @@ class KeystrokeLockscreen:
             return
         
         self.cleanup_done = True
+        self.readiness.signal(readiness.EXITING)
+        self.startup.write()  # Partial timeline if startup never completed
+        
+        # Stop the matrix rain worker before the window goes away
+        self.stop_matrix_compositor()
     
         # Explicit hook uninstallation with error handling
         global keyboard_hook, _hook_references
         try:
-            if keyboard_hook:
-                success = user32.UnhookWindowsHookEx(keyboard_hook)
-                if not success:
-                    logging.error(f"Failed to unhook: {ctypes.get_last_error()}")
-                else:
-                    logging.info("Hook successfully removed")
-                    keyboard_hook = None
+            hook_thread = _hook_references.get('thread')
+            if hook_thread:
+                # The hook thread unhooks before it ends
+                hook_thread.stop()
+                logging.info("Hook successfully removed")
+                keyboard_hook = None
+                self.hook_installed = False
                     
             # Clear reference dictionary to help garbage collection
             if '_hook_references' in globals():
@@ -1292,7 +1100,57 @@ class KeystrokeLockscreen:
         except Exception as e:
             logging.error(f"Error during cleanup: {e}")
 
+def load_in_background():
+    """Worker: import the numpy-based modules, then open the model and warm the scoring engine"""
+    preload_modules()
+    return model_loader.load_model_data()
+
+def preload_modules():
+    """Import the numpy-based modules (a no-op once they are loaded)"""
+    start = time.perf_counter()
+    for name in DEFERRED_MODULES:
+        importlib.import_module(name)
+    logging.info(f"Deferred modules loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+def wait_for_show_signal(root):
+    """
+    Warm start: stay hidden with the imports done until the detector signals a lock.
+
+    The wait can last hours, so it keeps pumping the window messages: a GUI
+    thread that does not would hang the senders of broadcasts (setting,
+    theme and DPI changes, shutdown queries) and be marked not responding.
+
+    Returns:
+        True once signalled, False if the hidden window was destroyed meanwhile
+    """
+    preload_modules()  # Loaded now so that showing does not wait for them
+    
+    event = lockscreen_launcher.show_event()
+    logging.info("Warm lockscreen waiting for the show signal")
+    while True:
+        # Wakes for the event or for any message sent or posted to this thread
+        result = win32event.MsgWaitForMultipleObjects([event], False, win32event.INFINITE, win32event.QS_ALLINPUT)
+        if result == win32event.WAIT_OBJECT_0:
+            break
+        try:
+            root.update()  # Let Tk dispatch the pending messages
+        except tk.TclError:
+            logging.info("Warm lockscreen closed while waiting for the show signal")
+            return False
+    logging.info("Show signal received")
+    return True
+
 def main():
+    # Pre-spawned by the detector: Tk is up but hidden until the lock happens
+    warm = lockscreen_launcher.WARM_ARGUMENT in sys.argv[1:]
+    startup = startup_profile.StartupProfile(warm=warm)
+    if warm:
+        root = tk.Tk()
+        root.withdraw()
+        if not wait_for_show_signal(root):
+            return
+        startup.mark(startup_profile.SHOW_SIGNAL)
+    
     # Create a temporary lock file
     if not create_temp_lock_file():
         print("Lockscreen is already running or cannot create lock file.")
@@ -1305,8 +1163,11 @@ def main():
     except:
         pass
         
-    root = tk.Tk()
-    app = KeystrokeLockscreen(root)
+    if warm:
+        root.deiconify()
+    else:
+        root = tk.Tk()
+    app = KeystrokeLockscreen(root, startup)
     
     # Don't call install_keyboard_hook here since it's called in deferred_initialization
     root.protocol("WM_DELETE_WINDOW", lambda: None)  # Block window closure attempt
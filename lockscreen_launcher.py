@@ -0,0 +1,146 @@
+import logging
+import os
+import subprocess
+
+try:
+    import win32api
+    import win32con
+    import win32event
+    import win32file
+except ImportError:
+    # Off Windows only cold launches are possible and the lock file cannot be read
+    win32event = None
+    win32file = None
+
+logger = logging.getLogger('LockDetector')
+
+LOCK_FILE_PATH = "lockscreen.lock"
+
+# Named event a warm (pre-spawned, hidden) lockscreen waits on before showing itself
+SHOW_EVENT_NAME = "Local\\KeystrokeLockscreenShow"
+WARM_ARGUMENT = "--warm"
+
+
+def show_event():
+    """Handle of the auto-reset show event, created by whichever side opens it first"""
+    return win32event.CreateEvent(None, False, False, SHOW_EVENT_NAME)
+
+
+def read_lock_pid(path=LOCK_FILE_PATH):
+    """PID written to the lockscreen's lock file, or None if there is no running lockscreen"""
+    if win32file is None or not os.path.exists(path):
+        return None
+    try:
+        # The lockscreen holds the file open with delete-on-close, so readers must share delete
+        handle = win32file.CreateFile(
+            path, win32file.GENERIC_READ,
+            win32file.FILE_SHARE_READ | win32file.FILE_SHARE_WRITE | win32file.FILE_SHARE_DELETE,
+            None, win32file.OPEN_EXISTING, 0, None)
+        try:
+            _, data = win32file.ReadFile(handle, 64)
+        finally:
+            win32file.CloseHandle(handle)
+        return int(data.decode('utf-8').strip())
+    except Exception:
+        return None
+
+
+def pid_alive(pid):
+    """Whether a process with this PID is running"""
+    if win32event is None:
+        return False
+    try:
+        handle = win32api.OpenProcess(win32con.SYNCHRONIZE, False, pid)
+    except Exception:
+        return False
+    try:
+        return win32event.WaitForSingleObject(handle, 0) == win32event.WAIT_TIMEOUT
+    finally:
+        win32api.CloseHandle(handle)
+
+
+class LockscreenLauncher:
+    """
+    Starts the lockscreen without blocking the detector.
+
+    The lockscreen is started directly (no shell) and its lifetime tracked
+    through the child handle and the PID in lockscreen.lock, so the
+    detector keeps monitoring while it is up and never starts a second
+    one. With warm=True a hidden lockscreen is kept pre-spawned and the
+    trigger only signals it to show, so locking costs one event round
+    trip instead of a process start.
+    """
+
+    def __init__(self, path, warm=False, lock_file=LOCK_FILE_PATH):
+        self.path = path
+        self.lock_file = lock_file
+        self.warm = warm and win32event is not None
+        if warm and not self.warm:
+            logger.warning("Warm lockscreen needs pywin32 - launching on demand instead")
+        self.event = show_event() if self.warm else None
+        self.child = None        # Shown lockscreen started by us
+        self.warm_child = None   # Hidden lockscreen waiting for the show event
+        self.launches = 0
+        self.warm_launches = 0
+
+    def running(self):
+        """Whether a lockscreen is shown (started by us or by anyone else)"""
+        if self.child is not None:
+            if self.child.poll() is None:
+                return True
+            logger.info(f"Lockscreen exited with code {self.child.returncode}")
+            self.child = None
+        pid = read_lock_pid(self.lock_file)
+        return pid is not None and pid_alive(pid)
+
+    def spawn_warm(self):
+        """Start a hidden lockscreen that shows itself on the show event"""
+        # A stale signal would make the new process show immediately
+        win32event.ResetEvent(self.event)
+        try:
+            self.warm_child = subprocess.Popen([self.path, WARM_ARGUMENT])
+            logger.debug(f"Warm lockscreen started (PID {self.warm_child.pid})")
+        except OSError as e:
+            logger.error(f"Error starting warm lockscreen: {e}")
+            self.warm_child = None
+
+    def update(self):
+        """Reap exited lockscreens and keep a warm one ready; call once per detector cycle"""
+        shown = self.running()
+        if not self.warm:
+            return
+        if self.warm_child is not None and self.warm_child.poll() is not None:
+            logger.warning(f"Warm lockscreen exited with code {self.warm_child.returncode}")
+            self.warm_child = None
+        if self.warm_child is None and not shown:
+            self.spawn_warm()
+
+    def launch(self):
+        """
+        Show the lockscreen unless one already is.
+
+        Returns:
+            True if a lockscreen was shown or started
+        """
+        if self.running():
+            logger.debug("Lockscreen already running - not starting another")
+            return False
+
+        if self.warm_child is not None and self.warm_child.poll() is None:
+            # It is already loaded: just tell it to show
+            win32event.SetEvent(self.event)
+            self.child, self.warm_child = self.warm_child, None
+            self.warm_launches += 1
+            logger.info(f"Signalled warm lockscreen (PID {self.child.pid}) to show")
+            return True
+
+        self.child = subprocess.Popen([self.path])
+        self.launches += 1
+        logger.info(f"Started lockscreen (PID {self.child.pid})")
+        return True
+
+    def stop(self):
+        """Terminate the hidden warm lockscreen (a shown one stays up)"""
+        if self.warm_child is not None and self.warm_child.poll() is None:
+            self.warm_child.terminate()
+        self.warm_child = None
@@ -8,11 +8,6 @@ common_analysis = {
     'binaries': [],
     'datas': [],
     'hiddenimports': [
-        'sklearn.neighbors._partition_nodes',
-        'sklearn.utils._cython_blas',
-        'sklearn.utils._weight_vector',
-        'sklearn.neighbors._typedefs',
-        'sklearn.metrics.pairwise',
         'win32api',
         'win32con',
         'win32gui',
@@ -26,7 +21,8 @@ common_analysis = {
     'hookspath': [],
     'hooksconfig': {},
     'runtime_hooks': [],
-    'excludes': [],
+    # Models are scored with numpy only (legacy pickles load without sklearn)
+    'excludes': ['sklearn', 'scipy'],
     'win_no_prefer_redirects': False,
     'win_private_assemblies': False,
     'cipher': block_cipher,
@@ -0,0 +1,297 @@
+import numpy as np
+
+# Brighter variant of each matrix color, used for the special character
+SPECIAL_COLORS = {
+    "lime": "#AAFFAA",
+    "green": "#228B22",
+    "cyan": "#AAFFFF",
+    "red": "#EE4B2B",
+    "white": "#FFFFFF",
+    "yellow": "#FFFFAA"
+}
+
+# Font sizes
+STANDARD_SIZE = 15
+SPECIAL_SIZE = int(STANDARD_SIZE * 1.05)
+
+# Chance for a (re)spawned drop to show the special character
+SPECIAL_CHANCE = 0.01
+
+# Drops are drawn while inside the screen plus this margin
+VIEW_MARGIN = 100
+
+# Initial drops hold 60% of the full density, the rest is added in batches
+INITIAL_FRACTION = 0.6
+ADD_BATCH_SIZE = 500
+
+# Number of distinct speeds above the base speed (speeds are base .. base + 5)
+SPEED_SPREAD = 6
+
+# Drops are split at random into this many levels (tagged level0..level9);
+# showing fewer levels thins the rain out evenly over the screen
+DENSITY_LEVELS = 10
+
+# Rendering modes
+#   recreate:   delete every item and create one for each visible drop per frame
+#   persistent: one item per drop created once; each frame moves the items with
+#               one canvas.move per speed tag and only reconfigures respawned drops
+RENDER_MODES = ("recreate", "persistent")
+DEFAULT_RENDER_MODE = "persistent"
+
+
+def character_set(settings):
+    """Get characters for matrix rain based on settings"""
+    char_set = settings["char_set"]
+
+    if char_set == "alphanumeric":
+        return 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+    elif char_set == "latin":
+        return 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    elif char_set == "numbers":
+        return '0123456789'
+    elif char_set == "symbols":
+        return '!@#$%^&*()_+-=[]{}|;:,./<>?~`'
+    elif char_set == "custom" and settings.get("custom_chars"):
+        return settings["custom_chars"]
+    else:
+        return 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+
+def special_color_for(color):
+    """Brighter color for the special character"""
+    return SPECIAL_COLORS.get(color, color)
+
+
+class MatrixRain:
+    """
+    Matrix rain simulation and its drawing on a Tk canvas.
+
+    Drop state is kept as a structure of arrays (x, y, speed, glyph index,
+    special flag) sized for the full density up front, advanced and
+    respawned with vectorized updates from a seeded generator. The
+    lockscreen owns scheduling (after() loop, pause/resume); this class owns
+    the drops and the canvas items. Anything with the canvas methods used
+    here can stand in for the canvas, which is how the benchmarks run
+    without a display.
+
+    With a glyph atlas the drops are image items showing pre-rendered
+    sprites, so Tk never lays out text while animating; without one (no
+    rasterizer available) they fall back to text items.
+    """
+
+    def __init__(self, canvas, settings, width, height, render_mode=DEFAULT_RENDER_MODE, seed=None,
+                 atlas=None):
+        if render_mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode {render_mode}")
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.render_mode = render_mode
+        self.rng = np.random.default_rng(seed)
+
+        self.chars = character_set(settings)
+        self.special_char = settings["special_char"]
+        self.color = settings["matrix_color"]
+        self.special_color = special_color_for(self.color)
+
+        # Sprites per glyph index (and for the special char), held here so that
+        # atlas eviction never blanks an item still on the canvas
+        self.sprites = None
+        self.special_sprite = None
+        if atlas is not None and atlas.available and canvas is not None:
+            self.sprites = [atlas.sprite(char, self.color, STANDARD_SIZE) for char in self.chars]
+            self.special_sprite = atlas.sprite(self.special_char, self.special_color, SPECIAL_SIZE, bold=True)
+
+        # Get density from settings
+        density_factor = settings["matrix_density"] / 10  # Convert 1-20 scale to a multiplier
+        self.density_factor = density_factor
+        self.drop_spacing = max(5, int(7.5 / density_factor))  # Adjust spacing based on density
+        self.columns = np.arange(0, width, self.drop_spacing, dtype=np.int32)
+
+        # Get speed from settings
+        self.base_speed = max(2, min(int(settings["matrix_speed"] / 2), 15))
+
+        # Drop state, preallocated for the full density; only the first count are live
+        capacity = max(self.target_drop_count, len(self.columns) * self._initial_drops_per_column())
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.speed = np.zeros(capacity, dtype=np.int16)
+        self.glyph = np.zeros(capacity, dtype=np.int16)
+        self.special = np.zeros(capacity, dtype=bool)
+        self.items = np.zeros(capacity, dtype=np.int64)  # Last canvas item drawn for each drop
+        self.level = np.zeros(capacity, dtype=np.uint8)  # Density level of each drop
+
+        # Drops with a level below this are shown
+        self.shown_levels = DENSITY_LEVELS
+
+    @property
+    def target_drop_count(self):
+        """Total drops at full density"""
+        return (self.width // self.drop_spacing) * int(20 * self.density_factor)
+
+    def _initial_drops_per_column(self):
+        """Drops per column in the initial, partial set"""
+        return int(max(10, 20 * self.density_factor * INITIAL_FRACTION))
+
+    def __len__(self):
+        return self.count
+
+    def char_at(self, index):
+        """Character shown by a drop"""
+        return self.special_char if self.special[index] else self.chars[self.glyph[index]]
+
+    def char_for_item(self, item):
+        """Character shown by a canvas item (find_closest result or item id), None if it is not a drop"""
+        if isinstance(item, (tuple, list)):
+            if not item:
+                return None
+            item = item[0]
+        matches = np.flatnonzero(self.items[:self.count] == int(item))
+        return self.char_at(matches[0]) if len(matches) else None
+
+    def char_near(self, x, y, radius=STANDARD_SIZE):
+        """Character of the shown drop closest to a point, None if none is within radius"""
+        visible = self.visible()
+        if not len(visible):
+            return None
+        distances = (self.x[visible] - x) ** 2 + (self.y[visible] - y) ** 2
+        closest = int(np.argmin(distances))
+        return self.char_at(visible[closest]) if distances[closest] <= radius ** 2 else None
+
+    def _respawn_state(self, count):
+        """Random speed, glyph and special flag for count new or respawned drops"""
+        speed = self.rng.integers(self.base_speed, self.base_speed + SPEED_SPREAD, count, dtype=np.int16)
+        glyph = self.rng.integers(0, len(self.chars), count, dtype=np.int16)
+        special = self.rng.random(count) < SPECIAL_CHANCE
+        return speed, glyph, special
+
+    def _append(self, x, y):
+        """Append drops at the given positions (and their canvas items in persistent mode)"""
+        start = self.count
+        end = start + len(x)
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.speed[start:end], self.glyph[start:end], self.special[start:end] = self._respawn_state(len(x))
+        self.level[start:end] = self.rng.integers(0, DENSITY_LEVELS, len(x))
+        self.count = end
+
+        if self.render_mode == "persistent" and self.canvas is not None:
+            for index in range(start, end):
+                self.items[index] = self._create_item(index)
+
+    def seed_initial_drops(self):
+        """Create the initial drops for immediate visual feedback, spread over every column"""
+        self.clear()
+        num_initial_drops = self._initial_drops_per_column()
+
+        # Distribute evenly across full height range, with some randomness
+        rows = np.arange(num_initial_drops)
+        y = (rows / num_initial_drops * self.height * 2).astype(np.int32) - self.height // 2
+        y = np.tile(y, len(self.columns)) + self.rng.integers(-100, 101, len(self.columns) * num_initial_drops)
+        x = np.repeat(self.columns, num_initial_drops)
+        self._append(x, y)
+
+    def add_drops(self, batch_size=ADD_BATCH_SIZE):
+        """Add a batch of the remaining drops, return how many are still missing"""
+        drops_to_add = self.target_drop_count - self.count
+        if drops_to_add <= 0:
+            return 0
+
+        # Random position in the same columns
+        batch = min(batch_size, drops_to_add)
+        self._append(self.rng.choice(self.columns, batch),
+                     self.rng.integers(-self.height, self.height + 1, batch))
+        return max(0, drops_to_add - batch_size)
+
+    def _item_style(self, index):
+        """Sprite (or text, color and font) and tags of a drop's canvas item"""
+        speed_tag = f"speed{self.speed[index]}"
+        level_tag = f"level{self.level[index]}"
+        if self.sprites is not None:
+            if self.special[index]:
+                return dict(image=self.special_sprite, tags=('matrix_char', 'special_char', speed_tag, level_tag))
+            return dict(image=self.sprites[self.glyph[index]], tags=('matrix_char', speed_tag, level_tag))
+        if self.special[index]:
+            return dict(text=self.special_char, fill=self.special_color, font=('Courier', SPECIAL_SIZE, 'bold'),
+                        tags=('matrix_char', 'special_char', speed_tag, level_tag))
+        return dict(text=self.chars[self.glyph[index]], fill=self.color, font=('Courier', STANDARD_SIZE),
+                    tags=('matrix_char', speed_tag, level_tag))
+
+    def _create_item(self, index):
+        """Create the canvas item of a drop"""
+        style = self._item_style(index)
+        if self.level[index] >= self.shown_levels:
+            style["state"] = 'hidden'
+        if self.sprites is not None:
+            return self.canvas.create_image(int(self.x[index]), int(self.y[index]), **style)
+        return self.canvas.create_text(int(self.x[index]), int(self.y[index]), **style)
+
+    def set_density(self, fraction):
+        """
+        Show only a fraction of the drops (rounded to tenths, at least one level).
+
+        Hidden drops keep falling so they reappear in place; in persistent
+        mode this costs one itemconfig per level that changes state.
+        """
+        levels = max(1, min(DENSITY_LEVELS, round(fraction * DENSITY_LEVELS)))
+        if levels == self.shown_levels:
+            return
+        if self.render_mode == "persistent" and self.canvas is not None:
+            for level in range(min(levels, self.shown_levels), max(levels, self.shown_levels)):
+                self.canvas.itemconfig(f"level{level}", state='normal' if level < levels else 'hidden')
+        self.shown_levels = levels
+
+    def step(self):
+        """Advance the simulation one frame, return the indexes of drops that respawned"""
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        y += self.speed[:n]
+
+        # Drops that fall off the bottom (while in view) restart above the screen
+        respawned = np.flatnonzero((y > self.height) & (y <= self.height + VIEW_MARGIN) &
+                                   (x >= 0) & (x <= self.width))
+        if len(respawned):
+            y[respawned] = self.rng.integers(-100, 1, len(respawned))
+            (self.speed[respawned], self.glyph[respawned],
+             self.special[respawned]) = self._respawn_state(len(respawned))
+        return respawned
+
+    def frame(self):
+        """Advance and draw one frame"""
+        if self.render_mode == "persistent":
+            # Items follow the drops by speed group, so move them before the respawns
+            for speed in range(self.base_speed, self.base_speed + SPEED_SPREAD):
+                self.canvas.move(f"speed{speed}", 0, speed)
+            self._render_persistent(self.step())
+        else:
+            self.step()
+            self._render_recreate()
+
+    def visible(self):
+        """Indexes of the shown drops inside the view (with margin)"""
+        x = self.x[:self.count]
+        y = self.y[:self.count]
+        shown = self.level[:self.count] < self.shown_levels
+        return np.flatnonzero((y >= -VIEW_MARGIN) & (y <= self.height + VIEW_MARGIN) &
+                              (x >= 0) & (x <= self.width) & shown)
+
+    def _render_recreate(self):
+        """Delete everything and create an item per visible drop"""
+        self.canvas.delete('all')
+        for index in self.visible():
+            self.items[index] = self._create_item(index)
+
+    def _render_persistent(self, respawned):
+        """Reposition and restyle only the drops that respawned"""
+        for index in respawned:
+            item = int(self.items[index])
+            self.canvas.coords(item, int(self.x[index]), int(self.y[index]))
+            self.canvas.itemconfig(item, **self._item_style(index))
+
+    def clear(self):
+        """Remove every drop and its canvas items"""
+        self.count = 0
+        if self.canvas is not None:
+            self.canvas.delete('matrix_char')
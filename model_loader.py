@@ -0,0 +1,150 @@
+import logging
+import queue
+import threading
+import time
+
+# How often the Tk thread checks for finished background work
+POLL_INTERVAL_MS = 15
+
+
+class ModelLoadError(Exception):
+    """The model is missing or lacks what the lockscreen needs"""
+
+
+class LoadFuture:
+    """
+    Result of work running on the background thread.
+
+    It is completed on the Tk thread, and done callbacks run there too, so
+    they may touch widgets. A callback added after completion runs at once.
+    """
+
+    def __init__(self):
+        self._done = False
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+
+    def done(self):
+        return self._done
+
+    def result(self):
+        """The work's return value; raises its exception if it failed"""
+        if not self._done:
+            raise RuntimeError("Background work has not finished")
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self):
+        """The exception the work raised, or None"""
+        if not self._done:
+            raise RuntimeError("Background work has not finished")
+        return self._exception
+
+    def add_done_callback(self, callback):
+        """Call callback(future) on the Tk thread once the work has finished"""
+        if self._done:
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def _complete(self, result, exception):
+        self._result = result
+        self._exception = exception
+        self._done = True
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                logging.error(f"Error in load callback: {e}")
+
+
+class BackgroundLoader:
+    """
+    Runs I/O and numeric work off the Tk thread.
+
+    The worker never touches Tk: results go through a queue that the Tk
+    thread drains with after(), which then completes the futures.
+    """
+
+    def __init__(self, root, poll_ms=POLL_INTERVAL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.results = queue.Queue()
+        self.pending = 0
+        self.after_id = None
+
+    def submit(self, work, *args):
+        """Start work(*args) on a worker thread; returns its LoadFuture"""
+        future = LoadFuture()
+
+        def run():
+            try:
+                result, exception = work(*args), None
+            except Exception as e:
+                result, exception = None, e
+            self.results.put((future, result, exception))
+
+        self.pending += 1
+        threading.Thread(target=run, daemon=True).start()
+        if self.after_id is None:
+            self.after_id = self.root.after(self.poll_ms, self.poll)
+        return future
+
+    def poll(self):
+        """Complete the futures of finished work (Tk thread)"""
+        self.after_id = None
+        while True:
+            try:
+                future, result, exception = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            future._complete(result, exception)
+        if self.pending:
+            self.after_id = self.root.after(self.poll_ms, self.poll)
+
+
+def load_model_data(path=None):
+    """
+    Open the model, check it and warm the scoring engine (worker thread: no Tk).
+
+    Returns:
+        (model, compiled model)
+
+    Raises:
+        ModelLoadError: no model, or one without the fields the lockscreen needs
+    """
+    import model_store
+    import scoring
+
+    try:
+        # Open the model lazily: only the header and metadata are read here,
+        # the arrays are mapped from the file when they are first scored
+        model = model_store.load_model(path, lazy=True)
+    except FileNotFoundError:
+        raise ModelLoadError("No trained model found!")
+    except Exception as e:
+        raise ModelLoadError(f"Error loading model: {e}")
+
+    # Verify critical components exist in the model
+    if "password" not in model:
+        raise ModelLoadError("No password found in model!")
+    if "train_data" not in model:
+        raise ModelLoadError("No training data found in model!")
+    if "avg_self_similarity" not in model:
+        raise ModelLoadError("No average self similarity found in model!")
+
+    # Compile and score one neutral attempt so the first Enter press finds
+    # the arrays mapped and numpy's code paths warm
+    start = time.perf_counter()
+    compiled = scoring.compile_model(model)
+    try:
+        if compiled.mean is not None:
+            scoring.score_attempt(compiled, compiled.mean, scoring.LOCKSCREEN_PROFILE)
+    except Exception as e:
+        logging.warning(f"Scoring warm-up failed: {e}")
+    logging.info(f"Scoring engine warmed in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return model, compiled
@@ -0,0 +1,446 @@
+import json
+import os
+import pickle
+import struct
+import sys
+import zlib
+from collections.abc import Mapping
+
+import numpy as np
+
+# Default model locations, relative to the working directory like the rest of the app
+MODEL_PATH = "typing_model.ktm"
+LEGACY_MODEL_PATH = "typing_model.pkl"
+
+# Sidecar written by adaptive enrollment; overlays the base model when it matches
+ADAPTED_MODEL_PATH = "typing_model.adapt"
+
+# Version of the compiled model layout (arrays + metadata)
+COMPILED_FORMAT_VERSION = 1
+
+# Model keys that hold per-interval float arrays in the compiled format
+ARRAY_KEYS = (
+    "scaler_mean",
+    "scaler_scale",
+    "train_data",
+    "raw_training_data",
+    "interval_lower_thresholds",
+    "interval_upper_thresholds",
+    "interval_m2"
+)
+
+# Model keys that hold single float statistics in the compiled format
+FLOAT_KEYS = (
+    "avg_typing_speed",
+    "std_dev_typing_speed",
+    "avg_self_similarity",
+    "min_self_similarity"
+)
+
+# Running state of adaptive enrollment, only valid for the training data it was built from
+ADAPTATION_STATE_KEYS = ("interval_m2", "interval_m2_count", "adapted_samples")
+
+# Keys an adaptive enrollment sidecar may override in the base model
+ADAPTED_KEYS = ARRAY_KEYS + FLOAT_KEYS + ("interval_m2_count", "adapted_samples")
+
+# Binary container layout:
+#   header      magic, version, header size, array count, metadata length,
+#               CRC32 of (array table + metadata), offset of the array data
+#   array table one fixed-size entry per array: name, rows, cols, offset, CRC32, ndim
+#   metadata    UTF-8 JSON with every non-array model field
+#   data        little-endian float64 arrays in C order, each aligned to DATA_ALIGNMENT
+BINARY_MAGIC = b"ENTYPTM\x00"
+BINARY_VERSION = 1
+HEADER_STRUCT = struct.Struct("<8sHHIIIQ")
+ENTRY_STRUCT = struct.Struct("<32sIIQIHH")
+DATA_ALIGNMENT = 64
+
+
+class ModelFormatError(Exception):
+    """Raised when a model file is not a valid model container"""
+
+
+class _FrozenEstimator:
+    """Stand-in for pickled sklearn estimators that only keeps their fitted attributes"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            self.__dict__.update(state)
+
+
+class _ModelUnpickler(pickle.Unpickler):
+    """Unpickler that maps sklearn classes to _FrozenEstimator so sklearn is never imported"""
+
+    def find_class(self, module, name):
+        if module == "sklearn" or module.startswith("sklearn."):
+            return _FrozenEstimator
+        return super().find_class(module, name)
+
+
+def fit_scaler(train_data):
+    """Return (mean, scale) arrays equivalent to a fitted StandardScaler"""
+    train_data = np.asarray(train_data, dtype=np.float64)
+    mean = train_data.mean(axis=0)
+    scale = train_data.std(axis=0)
+    # Constant features are left unscaled, as StandardScaler does
+    scale[scale < 10 * np.finfo(np.float64).eps] = 1.0
+    return mean, scale
+
+
+def freeze_model(model):
+    """Convert a model dictionary to the compiled format with plain arrays and floats"""
+    frozen = dict(model)
+
+    # Replace the scaler object (legacy models) by its frozen parameters
+    scaler = frozen.pop("scaler", None)
+    if scaler is not None and "scaler_mean" not in frozen:
+        mean = getattr(scaler, "mean_", None)
+        scale = getattr(scaler, "scale_", None)
+        if mean is not None:
+            frozen["scaler_mean"] = mean
+            frozen["scaler_scale"] = scale if scale is not None else np.ones_like(mean)
+
+    # Older models stored the scaled samples under "training_data"
+    if "train_data" not in frozen and "training_data" in frozen:
+        frozen["train_data"] = frozen.pop("training_data")
+
+    for key in ARRAY_KEYS:
+        if frozen.get(key) is not None:
+            frozen[key] = np.ascontiguousarray(frozen[key], dtype=np.float64)
+    for key in FLOAT_KEYS:
+        if frozen.get(key) is not None:
+            frozen[key] = float(frozen[key])
+
+    frozen["format"] = "compiled"
+    frozen["format_version"] = COMPILED_FORMAT_VERSION
+    return frozen
+
+
+def _json_default(value):
+    """Serialize numpy values that end up in the metadata section"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Cannot store {type(value).__name__} in model metadata")
+
+
+def _align(offset):
+    """Round an offset up to the data alignment"""
+    return (offset + DATA_ALIGNMENT - 1) // DATA_ALIGNMENT * DATA_ALIGNMENT
+
+
+def write_binary_model(model, path=MODEL_PATH):
+    """Write a model as a binary container, replacing the previous file atomically"""
+    frozen = freeze_model(model)
+
+    arrays = {}
+    metadata = {}
+    for key, value in frozen.items():
+        if key in ARRAY_KEYS and value is not None:
+            if len(key) > 32:
+                raise ModelFormatError(f"Array name {key} is longer than 32 bytes")
+            if value.ndim > 2:
+                raise ModelFormatError(f"Array {key} has {value.ndim} dimensions, at most 2 are supported")
+            arrays[key] = np.ascontiguousarray(value, dtype="<f8")
+        else:
+            metadata[key] = value
+    metadata_bytes = json.dumps(metadata, default=_json_default).encode("utf-8")
+
+    # Lay out the data section after the header, table and metadata
+    table_size = ENTRY_STRUCT.size * len(arrays)
+    offset = _align(HEADER_STRUCT.size + table_size + len(metadata_bytes))
+    data_offset = offset
+    entries = []
+    for key, value in arrays.items():
+        rows = value.shape[0] if value.ndim >= 1 else 1
+        cols = value.shape[1] if value.ndim == 2 else 0
+        crc = zlib.crc32(value.tobytes())
+        entries.append((key, value, ENTRY_STRUCT.pack(key.encode("ascii"), rows, cols, offset, crc, value.ndim, 0)))
+        offset = _align(offset + value.nbytes)
+
+    table_bytes = b"".join(entry for _, _, entry in entries)
+    table_crc = zlib.crc32(table_bytes + metadata_bytes)
+    header = HEADER_STRUCT.pack(BINARY_MAGIC, BINARY_VERSION, HEADER_STRUCT.size, len(arrays),
+                                len(metadata_bytes), table_crc, data_offset)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as model_file:
+        model_file.write(header)
+        model_file.write(table_bytes)
+        model_file.write(metadata_bytes)
+        for key, value, entry in entries:
+            array_offset = ENTRY_STRUCT.unpack(entry)[3]
+            model_file.write(b"\x00" * (array_offset - model_file.tell()))
+            model_file.write(value.tobytes())
+    os.replace(temp_path, path)
+    return frozen
+
+
+class BinaryModel(Mapping):
+    """
+    Read-only model backed by a binary container.
+
+    Opening the model only reads the header, array table and metadata; the
+    arrays are mapped with numpy.memmap and their checksums verified on
+    first access, so callers can use the metadata (password, threshold,
+    settings) before the arrays are paged in.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._buffer = None
+        self._arrays = {}
+        self._overlay = None
+        self._overlay_keys = ()
+
+        with open(path, "rb") as model_file:
+            header = model_file.read(HEADER_STRUCT.size)
+            if len(header) < HEADER_STRUCT.size:
+                raise ModelFormatError("Model file is truncated")
+            (magic, version, header_size, array_count, metadata_length,
+             table_crc, self._data_offset) = HEADER_STRUCT.unpack(header)
+            if magic != BINARY_MAGIC:
+                raise ModelFormatError("Not a binary model file")
+            if version > BINARY_VERSION:
+                raise ModelFormatError(f"Unsupported model version {version}")
+
+            model_file.seek(header_size)
+            table_bytes = model_file.read(ENTRY_STRUCT.size * array_count)
+            metadata_bytes = model_file.read(metadata_length)
+
+        if zlib.crc32(table_bytes + metadata_bytes) != table_crc:
+            raise ModelFormatError("Model header checksum mismatch")
+        # The table holds every array CRC, so this also fingerprints the whole model
+        self.checksum = table_crc
+
+        self._entries = {}
+        for index in range(array_count):
+            name, rows, cols, offset, crc, ndim, _ = ENTRY_STRUCT.unpack_from(table_bytes, index * ENTRY_STRUCT.size)
+            shape = (rows, cols) if ndim == 2 else ((rows,) if ndim == 1 else ())
+            self._entries[name.rstrip(b"\x00").decode("ascii")] = (shape, offset, crc)
+
+        self._metadata = json.loads(metadata_bytes.decode("utf-8"))
+
+    def _load_array(self, key):
+        """Map an array from the file and verify its checksum"""
+        shape, offset, crc = self._entries[key]
+        if self._buffer is None:
+            self._buffer = np.memmap(self.path, dtype=np.uint8, mode="r")
+
+        count = int(np.prod(shape)) if shape else 1
+        raw = self._buffer[offset:offset + count * 8]
+        if len(raw) != count * 8:
+            raise ModelFormatError(f"Array {key} extends past the end of the file")
+        if zlib.crc32(raw) != crc:
+            raise ModelFormatError(f"Checksum mismatch for array {key}")
+
+        array = raw.view("<f8").reshape(shape)
+        self._arrays[key] = array
+        return array
+
+    def overlay(self, adapted):
+        """Serve the adapted keys of another model (an adaptation sidecar) instead of our own"""
+        self._overlay = adapted
+        self._overlay_keys = tuple(key for key in ADAPTED_KEYS if key in adapted)
+
+    def __getitem__(self, key):
+        if key in self._overlay_keys:
+            return self._overlay[key]
+        if key in self._arrays:
+            return self._arrays[key]
+        if key in self._entries:
+            return self._load_array(key)
+        return self._metadata[key]
+
+    def __contains__(self, key):
+        return key in self._overlay_keys or key in self._entries or key in self._metadata
+
+    def __iter__(self):
+        yield from self._entries
+        yield from self._metadata
+        for key in self._overlay_keys:
+            if key not in self._entries and key not in self._metadata:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        """Return a plain dictionary with in-memory copies of every array"""
+        model = dict(self._metadata)
+        for key in self:
+            value = self[key]
+            model[key] = np.array(value) if isinstance(value, np.ndarray) else value
+        return model
+
+    def close(self):
+        """Drop the file mapping (arrays handed out keep their own reference)"""
+        self._arrays = {}
+        self._buffer = None
+
+
+def is_binary_model(path):
+    """Check the magic bytes of a model file"""
+    try:
+        with open(path, "rb") as model_file:
+            return model_file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    except OSError:
+        return False
+
+
+def load_pickle_model(path=LEGACY_MODEL_PATH):
+    """Load a pickled model in compiled form without importing sklearn"""
+    with open(path, "rb") as model_file:
+        model = _ModelUnpickler(model_file).load()
+
+    if not isinstance(model, dict):
+        raise ModelFormatError(f"Unexpected model type: {type(model).__name__}")
+
+    if model.get("format") == "compiled":
+        return model
+    return freeze_model(model)
+
+
+def find_model_path():
+    """Return the path of the current model file, preferring the binary container"""
+    for path in (MODEL_PATH, LEGACY_MODEL_PATH):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def model_exists():
+    """Check whether a trained model has been saved"""
+    return find_model_path() is not None
+
+
+def load_adapted_model(base, path=ADAPTED_MODEL_PATH):
+    """
+    Open the adaptive enrollment sidecar for a binary base model.
+
+    The sidecar is read into memory rather than mapped, so the next
+    adaptation can replace the file while this one is in use (Windows
+    refuses to replace a mapped file).
+
+    Returns None when there is no sidecar, when it was written for a
+    different base model (retrained or edited since) or when it is damaged;
+    the base model is then used as is.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        sidecar = BinaryModel(path)
+        try:
+            if sidecar.get("base_checksum") != base.checksum:
+                return None
+            # The sidecar is small: copying it verifies every array now rather than mid-unlock
+            return sidecar.to_dict()
+        finally:
+            sidecar.close()
+    except (OSError, ValueError, ModelFormatError):
+        return None
+
+
+def write_adapted_model(base, values, path=ADAPTED_MODEL_PATH):
+    """Atomically write adapted arrays and statistics for a binary base model"""
+    checksum = getattr(base, "checksum", None)
+    if checksum is None:
+        raise ModelFormatError("Adaptive enrollment needs a binary base model")
+
+    adapted = {key: value for key, value in values.items() if key in ADAPTED_KEYS}
+    adapted["base_checksum"] = checksum
+    return write_binary_model(adapted, path)
+
+
+def load_model(path=None, lazy=False):
+    """
+    Load a model from a binary container or a legacy pickle.
+
+    With lazy=True a binary model is returned as a read-only BinaryModel
+    whose arrays are mapped on first access; otherwise a plain dictionary
+    with in-memory arrays is returned. Legacy pickles found at the default
+    location are converted to the binary container on the way, and the
+    adaptive enrollment sidecar is overlaid on a default binary model.
+    """
+    default_location = path is None
+    if path is None:
+        path = find_model_path()
+        if path is None:
+            raise FileNotFoundError(MODEL_PATH)
+
+    if not is_binary_model(path):
+        model = load_pickle_model(path)
+        if path == LEGACY_MODEL_PATH and not os.path.exists(MODEL_PATH):
+            try:
+                write_binary_model(model, MODEL_PATH)
+            except OSError:
+                pass  # Keep working from the pickle if the directory is read-only
+        return model
+
+    binary_model = BinaryModel(path)
+    if default_location:
+        adapted = load_adapted_model(binary_model)
+        if adapted is not None:
+            binary_model.overlay(adapted)
+    if lazy:
+        return binary_model
+    model = binary_model.to_dict()
+    binary_model.close()
+    return model
+
+
+def save_model(model, path=MODEL_PATH):
+    """Save a model in the binary container format"""
+    frozen = write_binary_model(model, path)
+    # The new model already contains whatever adaptation it was built from
+    if path == MODEL_PATH and os.path.exists(ADAPTED_MODEL_PATH):
+        os.remove(ADAPTED_MODEL_PATH)
+    return frozen
+
+
+def delete_model():
+    """Remove the model file, any legacy pickle and the adaptation sidecar"""
+    for path in (MODEL_PATH, LEGACY_MODEL_PATH, ADAPTED_MODEL_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def convert_pickle(source=LEGACY_MODEL_PATH, destination=MODEL_PATH):
+    """Convert a pickled model to the binary container format"""
+    model = load_pickle_model(source)
+    write_binary_model(model, destination)
+
+    # Read the result back to make sure it round-trips
+    converted = BinaryModel(destination)
+    for key in ARRAY_KEYS:
+        if key in model and model[key] is not None:
+            if not np.array_equal(converted[key], model[key]):
+                raise ModelFormatError(f"Array {key} did not round-trip")
+    converted.close()
+    return destination
+
+
+def main(argv=None):
+    """Command line entry point: python model_store.py convert [source] [destination]"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] != "convert":
+        print("Usage: python model_store.py convert [source.pkl] [destination.ktm]")
+        return 2
+
+    source = argv[1] if len(argv) > 1 else LEGACY_MODEL_PATH
+    destination = argv[2] if len(argv) > 2 else MODEL_PATH
+    try:
+        convert_pickle(source, destination)
+    except (OSError, ModelFormatError, pickle.UnpicklingError) as e:
+        print(f"Conversion failed: {e}")
+        return 1
+    print(f"Converted {source} -> {destination}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
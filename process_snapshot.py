@@ -0,0 +1,152 @@
+import logging
+
+logger = logging.getLogger('LockDetector')
+
+
+def psutil_process_table():
+    """PID list, name and creation time lookups backed by psutil, or (None, None, None) if it is not installed"""
+    try:
+        import psutil
+    except ImportError:
+        return None, None, None
+
+    def name_of(pid):
+        try:
+            return psutil.Process(pid).name()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+    def created_of(pid):
+        try:
+            return psutil.Process(pid).create_time()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+    return psutil.pids, name_of, created_of
+
+
+class ProcessSnapshot:
+    """
+    Process names indexed by lower-cased name, refreshed at most once per cycle.
+
+    Every lookup in a cycle (LogonUI, UAC, ...) is answered from the same
+    index. Refreshing diffs the PID list against the previous one, so only
+    processes started since then have their name queried; the counters
+    show how many full enumerations and name queries that saved compared
+    to one psutil.process_iter(['name']) scan per lookup.
+
+    Windows reuses PIDs, and refreshes can be hours apart, so an entry is
+    only trusted while its PID still has the same creation time (when the
+    table can tell it); a reused PID is reported as stopped and started.
+    Names that could not be read (the process exited between the listing
+    and the lookup) are not cached, the next refresh asks again.
+    """
+
+    def __init__(self, list_pids=None, name_of=None, created_of=None):
+        if list_pids is None or name_of is None:
+            default_list_pids, default_name_of, default_created_of = psutil_process_table()
+            list_pids = list_pids or default_list_pids
+            name_of = name_of or default_name_of
+            created_of = created_of or default_created_of
+        self.list_pids = list_pids
+        self.name_of = name_of
+        self.created_of = created_of
+
+        self.names = {}    # pid -> lower-cased name
+        self.created = {}  # pid -> creation time the name was read for (None if unknown)
+        self.by_name = {}  # lower-cased name -> set of pids
+        self.fresh = False  # Index is current for this cycle
+
+        # Counters
+        self.cycles = 0
+        self.lookups = 0
+        self.enumerations = 0
+        self.name_queries = 0
+        self.reused_pids = 0
+        self.full_scan_queries = 0  # Name queries one process_iter scan per lookup would have made
+
+    @property
+    def available(self):
+        return self.list_pids is not None
+
+    def begin_cycle(self):
+        """Start a new detector cycle: the next lookup refreshes the index"""
+        self.cycles += 1
+        self.fresh = False
+
+    def refresh(self):
+        """
+        Diff the PID list against the index.
+
+        Returns:
+            (started, stopped): dicts of pid -> name for processes that
+            appeared and went away since the previous refresh
+        """
+        pids = set(self.list_pids())
+        self.enumerations += 1
+
+        stopped = {}
+        for pid in self.names.keys() - pids:
+            stopped[pid] = self.forget(pid)
+
+        started = {}
+        for pid in pids:
+            created = self.created_of(pid) if self.created_of is not None else None
+            if pid in self.names:
+                if self.created[pid] == created:
+                    continue
+                # Same PID, different process: the old one is gone
+                self.reused_pids += 1
+                stopped[pid] = self.forget(pid)
+
+            name = self.name_of(pid)
+            self.name_queries += 1
+            if not name:
+                continue  # Exited (or not readable yet): not cached, asked again next refresh
+            name = name.lower()
+            self.names[pid] = name
+            self.created[pid] = created
+            self.by_name.setdefault(name, set()).add(pid)
+            started[pid] = name
+
+        self.fresh = True
+        return started, stopped
+
+    def forget(self, pid):
+        """Drop a PID from the index, return its name"""
+        name = self.names.pop(pid)
+        del self.created[pid]
+        pids_with_name = self.by_name.get(name)
+        if pids_with_name is not None:
+            pids_with_name.discard(pid)
+            if not pids_with_name:
+                del self.by_name[name]
+        return name
+
+    def running(self, name):
+        """Whether a process with this (case-insensitive) name is running"""
+        self.lookups += 1
+        if not self.available:
+            return False
+        if not self.fresh:
+            self.refresh()
+        self.full_scan_queries += len(self.names)
+        return bool(self.by_name.get(name.lower()))
+
+    def pids(self, name):
+        """PIDs of the processes with this (case-insensitive) name"""
+        if self.available and not self.fresh:
+            self.refresh()
+        return set(self.by_name.get(name.lower(), ()))
+
+    @property
+    def enumerations_saved(self):
+        """Full enumerations avoided compared to one scan per lookup"""
+        return self.lookups - self.enumerations
+
+    def summary(self):
+        """Counters as one log line"""
+        return (f"Process snapshot: {self.cycles} cycles, {self.lookups} lookups, "
+                f"{self.enumerations} enumerations ({self.enumerations_saved} saved), "
+                f"{self.name_queries} name queries (vs {self.full_scan_queries} with a scan per lookup), "
+                f"{self.reused_pids} reused PIDs")
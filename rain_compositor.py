@@ -0,0 +1,197 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+import matrix_rain
+from glyph_atlas import parse_color
+
+# Rendering backends of the lockscreen matrix rain
+#   canvas:     one canvas item per drop, updated on the Tk thread (MatrixRain.frame)
+#   composited: a worker thread draws every drop into a pixel buffer and the Tk
+#               thread only swaps the single image item showing it
+RENDER_BACKENDS = ("canvas", "composited")
+DEFAULT_RENDER_BACKEND = "canvas"
+
+# Seconds to wait for the worker when stopping
+STOP_TIMEOUT = 1.0
+
+
+class GlyphStamp:
+    """Pixels of one colored glyph as offsets from the drop position (text is centered like create_text)"""
+
+    def __init__(self, mask, rgb):
+        rows, cols = np.nonzero(mask)
+        height, width = mask.shape
+        self.rows = (rows - height // 2).astype(np.int32)
+        self.cols = (cols - width // 2).astype(np.int32)
+        self.extent = max(height, width)
+        self.offsets = None  # Flat pixel offsets, set once the buffer row length is known
+        # Premultiplied on the black background
+        coverage = mask[rows, cols].astype(np.uint16)
+        self.colors = (coverage[:, None] * np.asarray(rgb, dtype=np.uint16) // 255).astype(np.uint8)
+
+
+class RainCompositor:
+    """
+    Matrix rain rendered off the Tk thread into one image.
+
+    The simulation (MatrixRain without a canvas) and the drawing run on a
+    worker thread. Drops are stamped into a scratch RGB canvas with a border
+    wide enough for any drawn drop, so glyphs are stamped with flat offsets
+    and no clipping. Its screen part is then copied into the back of two
+    preallocated PPM frames (header in front of the pixels) which is swapped
+    with the front, so the worker never touches the pixels being presented.
+
+    present() is the only call on the Tk thread: it hands the newest frame
+    to a PhotoImage and asks the worker for the next one. _tkinter only
+    passes bytes objects to Tk, so the worker makes one immutable copy of
+    each finished frame; Tk still decodes the PPM on the Tk thread, which
+    bench_rain_compositor measures when a display is available.
+
+    Without a PhotoImage (headless) render() draws a frame synchronously,
+    which is how the rasterizer is benchmarked without a display.
+    """
+
+    def __init__(self, rain, atlas, width, height):
+        self.rain = rain
+        self.width = width
+        self.height = height
+
+        # PPM (P6) header in front of the pixels, so a frame can be handed to Tk as is
+        self.header = f"P6 {width} {height} 255\n".encode("ascii")
+        self.frame_number = 0       # Frames finished by the worker
+        self.presented_number = 0   # Frame last handed to Tk
+        self.encoded = None         # Newest finished frame as PPM data (bytes, what Tk accepts)
+        self.render_ms = 0.0        # Worker time of the newest frame
+
+        # Stamps per glyph index plus the special char, rasterized once from the atlas masks
+        color = parse_color(rain.color, atlas.master)
+        self.stamps = [GlyphStamp(atlas.mask(char, matrix_rain.STANDARD_SIZE), color) for char in rain.chars]
+        self.special_stamp = GlyphStamp(
+            atlas.mask(rain.special_char, matrix_rain.SPECIAL_SIZE, bold=True),
+            parse_color(rain.special_color, atlas.master))
+
+        # Border: drops are drawn up to VIEW_MARGIN outside the screen, plus half a glyph
+        stamps = self.stamps + [self.special_stamp]
+        self.border = matrix_rain.VIEW_MARGIN + max(stamp.extent for stamp in stamps)
+        self.row_length = width + 2 * self.border
+        for stamp in stamps:
+            stamp.offsets = stamp.rows * self.row_length + stamp.cols
+        self.canvas = np.zeros((height + 2 * self.border, self.row_length, 3), dtype=np.uint8)
+
+        # Two PPM frames, allocated once; the pixels are written through a numpy view after the header
+        self.frames = []
+        self.frame_pixels = []
+        for _ in range(2):
+            frame = bytearray(len(self.header) + width * height * 3)
+            frame[:len(self.header)] = self.header
+            self.frames.append(frame)
+            self.frame_pixels.append(np.frombuffer(frame, dtype=np.uint8, offset=len(self.header))
+                                     .reshape(height, width, 3))
+        self.front = 0
+
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+
+    def _stamp(self, flat, stamp, x, y):
+        """Draw one glyph at many positions"""
+        origins = (y + self.border) * self.row_length + (x + self.border)
+        flat[origins[:, None] + stamp.offsets[None, :]] = stamp.colors
+
+    def draw(self, buffer):
+        """Draw the visible drops into a bordered buffer (cleared first)"""
+        buffer.fill(0)
+        pixels = buffer.reshape(-1, 3)
+        rain = self.rain
+        visible = rain.visible()
+        if not len(visible):
+            return
+
+        special = rain.special[visible]
+        normal = visible[~special]
+        if len(normal):
+            # One vectorized stamp per glyph in use
+            order = np.argsort(rain.glyph[normal], kind="stable")
+            normal = normal[order]
+            glyphs = rain.glyph[normal]
+            starts = np.flatnonzero(np.r_[True, glyphs[1:] != glyphs[:-1]])
+            ends = np.r_[starts[1:], len(normal)]
+            for start, end in zip(starts, ends):
+                drops = normal[start:end]
+                self._stamp(pixels, self.stamps[glyphs[start]], rain.x[drops], rain.y[drops])
+
+        drops = visible[special]
+        if len(drops):
+            self._stamp(pixels, self.special_stamp, rain.x[drops], rain.y[drops])
+
+    def render(self):
+        """Advance and draw one frame into the back frame, then swap it to the front"""
+        start = time.perf_counter()
+        self.rain.step()
+        back = 1 - self.front
+        self.draw(self.canvas)
+        np.copyto(self.frame_pixels[back], self._visible_area(self.canvas))
+        # Tk only takes immutable bytes: the one copy per frame is made here, off the Tk thread
+        encoded = bytes(self.frames[back])
+        with self.lock:
+            self.front = back
+            self.encoded = encoded
+            self.frame_number += 1
+        self.render_ms = (time.perf_counter() - start) * 1000
+
+    def _visible_area(self, buffer):
+        """Screen part of a bordered buffer"""
+        return buffer[self.border:self.border + self.height, self.border:self.border + self.width]
+
+    def pixels(self):
+        """Screen pixels of the newest finished frame"""
+        return self.frame_pixels[self.front]
+
+    def _run(self):
+        """Worker loop: render a frame whenever the Tk thread asks for one"""
+        while self.running:
+            self.wake.wait()
+            self.wake.clear()
+            if not self.running:
+                break
+            try:
+                self.render()
+            except Exception as e:
+                logging.error(f"Matrix rain compositor failed: {e}")
+                self.running = False
+
+    def start(self):
+        """Start the worker and have it render the first frame"""
+        if self.thread is not None:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="matrix-rain-compositor", daemon=True)
+        self.thread.start()
+        self.wake.set()
+
+    def stop(self):
+        """Stop the worker"""
+        self.running = False
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(STOP_TIMEOUT)
+            self.thread = None
+
+    def present(self, photo):
+        """
+        Show the newest finished frame in photo and request the next one (Tk thread).
+
+        Returns:
+            True if a new frame was shown
+        """
+        with self.lock:
+            encoded = self.encoded if self.frame_number != self.presented_number else None
+            self.presented_number = self.frame_number
+        if encoded is not None:
+            photo.configure(data=encoded, format="ppm")
+        self.wake.set()
+        return encoded is not None
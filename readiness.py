@@ -0,0 +1,98 @@
+import os
+import time
+
+try:
+    import win32event
+except ImportError:
+    # Without pywin32 the state goes through a small file polled at a short interval
+    win32event = None
+
+READY = "ready"
+EXITING = "exiting"
+STATES = (READY, EXITING)
+
+EVENT_PREFIX = "Local\\KeystrokeAuth"
+FALLBACK_POLL_INTERVAL = 0.02  # Seconds between state file checks when there are no named events
+
+
+def event_name(name, state):
+    """Name of the manual-reset event for one state of a channel (also usable from PowerShell)"""
+    return f"{EVENT_PREFIX}.{name}.{state}"
+
+
+class ReadinessChannel:
+    """
+    Cross-process "ready"/"exiting" notification for one application.
+
+    On Windows every state is a named manual-reset event: waiters block on
+    it and wake as soon as the application sets it. The signalling process
+    keeps its handles open, so the state lives exactly as long as some
+    process still refers to it and a crashed application does not leave a
+    stale "ready" behind for later waiters. Elsewhere the state is written
+    to <name>.state and waiters poll it every FALLBACK_POLL_INTERVAL.
+    """
+
+    def __init__(self, name, directory="."):
+        self.name = name
+        self.state_path = os.path.join(directory, f"{name}.state")
+        self.events = {}
+        if win32event is not None:
+            for state in STATES:
+                self.events[state] = win32event.CreateEvent(None, True, False, event_name(name, state))
+
+    @property
+    def uses_events(self):
+        return bool(self.events)
+
+    def signal(self, state):
+        """Announce a state; the other state is cleared"""
+        if state not in STATES:
+            raise ValueError(f"Unknown state: {state}")
+        if self.events:
+            for other, handle in self.events.items():
+                if other != state:
+                    win32event.ResetEvent(handle)
+            win32event.SetEvent(self.events[state])
+        else:
+            # Write then rename so a waiter never reads a half-written state
+            temporary = self.state_path + ".tmp"
+            with open(temporary, "w") as state_file:
+                state_file.write(state)
+            os.replace(temporary, self.state_path)
+
+    def current(self):
+        """The announced state, or None"""
+        if self.events:
+            for state, handle in self.events.items():
+                if win32event.WaitForSingleObject(handle, 0) == win32event.WAIT_OBJECT_0:
+                    return state
+            return None
+        try:
+            with open(self.state_path) as state_file:
+                return state_file.read().strip() or None
+        except OSError:
+            return None
+
+    def wait(self, state=READY, timeout=None):
+        """
+        Block until the state is announced.
+
+        Returns:
+            True if it was, False on timeout
+        """
+        if self.events:
+            milliseconds = win32event.INFINITE if timeout is None else int(timeout * 1000)
+            return win32event.WaitForSingleObject(self.events[state], milliseconds) == win32event.WAIT_OBJECT_0
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.current() != state:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(FALLBACK_POLL_INTERVAL)
+        return True
+
+    def close(self):
+        """Release the named events"""
+        for handle in self.events.values():
+            handle.Close()
+        self.events = {}
@@ -0,0 +1,116 @@
+import numpy as np
+
+# Width of the per-interval acceptance bounds, in standard deviations
+BOUNDS_WIDTH = 1.5
+
+# Fallback typing speed deviation when every sample is identical
+MIN_SPEED_STD_DEV = 0.01
+
+
+class RunningIntervalStats:
+    """
+    Incremental per-interval statistics (Welford's algorithm).
+
+    Keeps count, mean and M2 (sum of squared deviations) for every interval
+    so the means, standard deviations, bounds and recommended threshold are
+    available in O(k) after each sample instead of being recomputed from the
+    whole training matrix.
+    """
+
+    def __init__(self, num_features):
+        self.num_features = num_features
+        self.count = 0
+        self.mean = np.zeros(num_features)
+        self.m2 = np.zeros(num_features)
+
+    @classmethod
+    def from_samples(cls, samples):
+        """Build the statistics from an existing (n, k) matrix of samples"""
+        samples = np.asarray(samples, dtype=np.float64)
+        stats = cls(samples.shape[1] if samples.ndim == 2 else 0)
+        for sample in samples:
+            stats.push(sample)
+        return stats
+
+    @classmethod
+    def from_state(cls, count, mean, m2):
+        """Restore statistics saved from count, mean and m2"""
+        mean = np.array(mean, dtype=np.float64).reshape(-1)
+        stats = cls(len(mean))
+        stats.count = int(count)
+        stats.mean = mean
+        stats.m2 = np.array(m2, dtype=np.float64).reshape(-1)
+        return stats
+
+    def push(self, sample):
+        """Add one sample of k intervals"""
+        sample = np.asarray(sample, dtype=np.float64)
+        if sample.shape != (self.num_features,):
+            raise ValueError(f"Expected {self.num_features} intervals, got {sample.shape}")
+
+        self.count += 1
+        delta = sample - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (sample - self.mean)
+
+    def remove(self, sample):
+        """Take back a sample that was previously added (reverse Welford update)"""
+        sample = np.asarray(sample, dtype=np.float64)
+        if sample.shape != (self.num_features,):
+            raise ValueError(f"Expected {self.num_features} intervals, got {sample.shape}")
+        if self.count <= 1:
+            self.count = 0
+            self.mean = np.zeros(self.num_features)
+            self.m2 = np.zeros(self.num_features)
+            return
+
+        old_mean = self.mean.copy()
+        self.count -= 1
+        self.mean = old_mean - (sample - old_mean) / self.count
+        self.m2 -= (sample - old_mean) * (sample - self.mean)
+        # Cancellation can leave tiny negative values for constant intervals
+        np.maximum(self.m2, 0.0, out=self.m2)
+
+    @property
+    def variance(self):
+        """Population variance per interval (same as np.var with ddof=0)"""
+        if self.count == 0:
+            return np.zeros(self.num_features)
+        return np.maximum(self.m2 / self.count, 0.0)
+
+    @property
+    def std(self):
+        """Population standard deviation per interval (same as np.std)"""
+        return np.sqrt(self.variance)
+
+    def bounds(self, width=BOUNDS_WIDTH):
+        """Lower and upper acceptance bounds per interval"""
+        std = self.std
+        return self.mean - width * std, self.mean + width * std
+
+    def scaler(self):
+        """Return (mean, scale) equivalent to a StandardScaler fitted on the samples"""
+        scale = self.std
+        scale[scale < 10 * np.finfo(np.float64).eps] = 1.0
+        return self.mean.copy(), scale
+
+    def speed_stats(self, columns=slice(None)):
+        """Global average typing speed and its deviation across intervals (or the given columns)"""
+        avg_speed = float(np.mean(self.mean[columns]))
+        std_dev = float(np.mean(self.std[columns]))
+        if std_dev == 0:
+            std_dev = MIN_SPEED_STD_DEV
+        return avg_speed, std_dev
+
+    def consistency_ratio(self, columns=slice(None)):
+        """Average deviation relative to the average interval (lower = more consistent)"""
+        return float(np.mean(self.std[columns]) / np.mean(self.mean[columns]))
+
+    def recommended_threshold(self, columns=slice(None)):
+        """Threshold (in percent) recommended for the typing consistency seen so far"""
+        # Typical ratios range from 0.1 (very consistent) to 0.5+ (inconsistent)
+        consistency_score = max(0, min(1, 1 - (self.consistency_ratio(columns) * 2)))
+
+        # Map to threshold range
+        recommended = 50 + (consistency_score * 35)
+        return (int(recommended / 5) * 5) - 3
@@ -0,0 +1,313 @@
+import numpy as np
+
+import keystroke_capture
+
+# Security level settings: (interval_minimum, secondary_minimum, overall_threshold)
+SECURITY_SETTINGS = {
+    "low":       (0.25, 0.30, 0.50),  # Much more forgiving
+    "medium":    (0.30, 0.35, 0.60),  # More reasonable thresholds
+    "high":      (0.40, 0.40, 0.65),  # Less strict than current
+    "very_high": (0.50, 0.50, 0.70)   # Still strict but achievable
+}
+
+# Stricter settings used by the hybrid verifier in the training wizard
+HYBRID_SECURITY_SETTINGS = {
+    "low":       (0.50, 0.40, 0.70),
+    "medium":    (0.65, 0.52, 0.80),
+    "high":      (0.75, 0.60, 0.85),
+    "very_high": (0.85, 0.68, 0.90)
+}
+
+# Scoring profiles hold the constants that differ between the places that
+# verify a typing attempt, so they can all share the same code path.
+#   interval_bonus:    (cutoff, base, pivot, slope) -> base + (score - pivot) * slope
+#   factor_bonus:      (cutoff, slope) applied to max(pattern, speed)
+#   consistency_bonus: (max gap between pattern and interval, bonus)
+LOCKSCREEN_PROFILE = {
+    "pattern_tolerance": 0.5,
+    "bounds_padding": (0.00, 2.00),
+    "weights": {"interval": 0.40, "pattern": 0.40, "speed": 0.20},
+    "interval_bonus": (0.70, 0.05, 0.60, 0.50),
+    "factor_bonus": (0.8, 0.25),
+    "consistency_bonus": (0.2, 0.05),
+    "security_settings": SECURITY_SETTINGS,
+    "use_user_threshold": True
+}
+
+# Verification dialog shown before deleting a model in the training wizard
+VERIFY_DIALOG_PROFILE = dict(
+    LOCKSCREEN_PROFILE,
+    pattern_tolerance=0.0,
+    interval_bonus=(0.90, 0.05, 0.70, 0.80)
+)
+
+# Hybrid verifier (50/30/20 weighting, tighter bounds, no user threshold)
+HYBRID_PROFILE = {
+    "pattern_tolerance": 0.0,
+    "bounds_padding": (0.80, 1.20),
+    "weights": {"interval": 0.5, "pattern": 0.3, "speed": 0.2},
+    "interval_bonus": (0.90, 0.05, 0.0, 0.0),
+    "factor_bonus": None,
+    "consistency_bonus": None,
+    "security_settings": HYBRID_SECURITY_SETTINGS,
+    "use_user_threshold": False
+}
+
+FALLBACK_THRESHOLD = 70
+
+# Upper bound on the size of the (rows, train samples) distance temporary,
+# so large batches are scored in cache-friendly chunks
+DISTANCE_CHUNK_ELEMENTS = 1 << 18
+
+
+class CompiledModel:
+    """Plain float arrays needed to score an attempt against a trained model"""
+
+    def __init__(self, mean, scale, train_data, lower_bounds, upper_bounds,
+                 avg_typing_speed, std_dev_typing_speed, avg_self_similarity,
+                 threshold=FALLBACK_THRESHOLD, security_level="high", interval_columns=None):
+        self.mean = _as_vector(mean)
+        self.scale = _as_vector(scale)
+        self.train_data = None if train_data is None else np.asarray(train_data, dtype=np.float64)
+        self.lower_bounds = _as_vector(lower_bounds)
+        self.upper_bounds = _as_vector(upper_bounds)
+        self.avg_typing_speed = avg_typing_speed
+        self.std_dev_typing_speed = std_dev_typing_speed
+        self.avg_self_similarity = float(avg_self_similarity)
+        self.threshold = threshold
+        self.security_level = security_level
+        # Columns of the down-down intervals; the interval and speed scores use
+        # only these, the pattern score uses every channel
+        self.interval_columns = slice(None) if interval_columns is None else interval_columns
+
+    @property
+    def num_features(self):
+        """Number of features in a single attempt"""
+        if self.train_data is not None and self.train_data.ndim == 2:
+            return self.train_data.shape[1]
+        if self.lower_bounds is not None:
+            return len(self.lower_bounds)
+        return 0
+
+
+def _as_vector(values):
+    """Convert a sequence to a flat float64 array, keeping None as is"""
+    if values is None:
+        return None
+    return np.asarray(values, dtype=np.float64).reshape(-1)
+
+
+def interval_columns_for(model, num_features):
+    """Slice of the down-down intervals in a model's feature vector"""
+    channels = keystroke_capture.model_channels(model)
+    if channels == keystroke_capture.LEGACY_CHANNELS or not num_features:
+        return slice(None)
+    num_keys = keystroke_capture.keys_for_feature_count(num_features, channels)
+    return keystroke_capture.channel_slices(num_keys, channels)["down_down"]
+
+
+def compile_model(model):
+    """Build a CompiledModel from a model dictionary as saved by the training wizard"""
+    mean = model.get("scaler_mean", None)
+    scale = model.get("scaler_scale", None)
+
+    # Legacy models carry a fitted scaler object instead of its parameters
+    scaler = model.get("scaler", None)
+    if mean is None and scaler is not None:
+        mean = scaler.mean_
+        scale = scaler.scale_
+
+    num_features = len(mean) if mean is not None else 0
+
+    return CompiledModel(
+        mean=mean,
+        scale=scale,
+        train_data=model.get("train_data", model.get("training_data", None)),
+        lower_bounds=model.get("interval_lower_thresholds", None),
+        upper_bounds=model.get("interval_upper_thresholds", None),
+        avg_typing_speed=model.get("avg_typing_speed", None),
+        std_dev_typing_speed=model.get("std_dev_typing_speed", 0.01),
+        avg_self_similarity=model.get("avg_self_similarity", 1.0),
+        threshold=model.get("threshold", FALLBACK_THRESHOLD),
+        security_level=model.get("security_level", "high"),
+        interval_columns=interval_columns_for(model, num_features)
+    )
+
+
+def _mean_distances(scaled, train_data):
+    """Average Euclidean distance of every scaled attempt to all training samples"""
+    # |a - b|^2 = |a|^2 + |b|^2 - 2 a.b turns the pairwise distances into one matrix product
+    train_sq = np.einsum('ij,ij->i', train_data, train_data)
+    rows_per_chunk = max(1, DISTANCE_CHUNK_ELEMENTS // max(1, len(train_data)))
+
+    avg_distance = np.empty(len(scaled))
+    for start in range(0, len(scaled), rows_per_chunk):
+        chunk = scaled[start:start + rows_per_chunk]
+        sq_dist = chunk @ train_data.T
+        sq_dist *= -2.0
+        sq_dist += np.einsum('ij,ij->i', chunk, chunk)[:, None]
+        sq_dist += train_sq
+        # Rounding can push the distance to an identical sample slightly below zero
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        np.sqrt(sq_dist, out=sq_dist)
+        avg_distance[start:start + rows_per_chunk] = sq_dist.mean(axis=1)
+    return avg_distance
+
+
+def pairwise_distances(samples):
+    """(n, n) matrix of Euclidean distances between the rows of samples"""
+    samples = np.asarray(samples, dtype=np.float64)
+    n_samples, n_features = samples.shape
+    # Differences are taken directly (not via the |a|^2 + |b|^2 - 2ab expansion)
+    # so near-identical samples keep full precision; rows go in bounded chunks
+    rows_per_chunk = max(1, DISTANCE_CHUNK_ELEMENTS // max(1, n_samples * n_features))
+
+    distances = np.empty((n_samples, n_samples))
+    for start in range(0, n_samples, rows_per_chunk):
+        diff = samples[start:start + rows_per_chunk, None, :] - samples[None, :, :]
+        distances[start:start + rows_per_chunk] = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+    return distances
+
+
+def self_similarities(train_data, avg_self_similarity=1.0):
+    """
+    Leave-one-out similarity of every training sample to the remaining ones.
+
+    Equivalent to scoring each row against the matrix with that row deleted,
+    but computed from a single pairwise distance matrix: the diagonal is zero,
+    so a row sum divided by n - 1 is the mean distance to the other samples.
+    """
+    train_data = np.asarray(train_data, dtype=np.float64)
+    if train_data.ndim != 2 or len(train_data) < 2:
+        raise ValueError(f"Need at least two training samples, got shape {train_data.shape}")
+
+    avg_distance = pairwise_distances(train_data).sum(axis=1) / (len(train_data) - 1)
+    similarity = avg_self_similarity / (avg_self_similarity + avg_distance)
+    return np.clip(similarity, 0.0, 1.0)
+
+
+def _score_matrix(compiled, attempts, profile):
+    """Score an (N, k) matrix of attempts in one vectorized pass"""
+    n_attempts, n_features = attempts.shape
+
+    # Pattern score: average distance of the scaled attempt to every training sample
+    if compiled.mean is not None and compiled.train_data is not None and len(compiled.train_data):
+        scaled = (attempts - compiled.mean) / compiled.scale
+        avg_distance = _mean_distances(scaled, compiled.train_data)
+        adjusted_distance = avg_distance * (1 - profile["pattern_tolerance"])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similarity = compiled.avg_self_similarity / (compiled.avg_self_similarity + adjusted_distance)
+        pattern_score = np.clip(np.nan_to_num(similarity), 0.0, 1.0)
+    else:
+        pattern_score = np.zeros(n_attempts)
+
+    # Interval and speed scores only look at the down-down intervals
+    intervals = attempts[:, compiled.interval_columns]
+    n_intervals = intervals.shape[1]
+
+    # Interval score: fraction of intervals inside the padded per-interval bounds
+    if compiled.lower_bounds is not None and compiled.upper_bounds is not None and n_intervals:
+        lower_padding, upper_padding = profile["bounds_padding"]
+        lower_bounds = compiled.lower_bounds[compiled.interval_columns]
+        upper_bounds = compiled.upper_bounds[compiled.interval_columns]
+        m = min(n_intervals, len(lower_bounds))
+        window = intervals[:, :m]
+        within = ((lower_bounds[:m] * lower_padding <= window) &
+                  (window <= upper_bounds[:m] * upper_padding))
+        interval_score = within.sum(axis=1) / n_intervals
+    else:
+        interval_score = np.zeros(n_attempts)
+
+    # Speed score: z-score of the average interval, 2 standard deviations -> 0.0
+    if compiled.avg_typing_speed is not None and n_intervals:
+        std_dev = max(compiled.std_dev_typing_speed, 0.001)
+        z_score = np.abs((intervals.mean(axis=1) - compiled.avg_typing_speed) / std_dev)
+        speed_score = np.clip(1.0 - z_score / 2.0, 0.0, 1.0)
+    else:
+        speed_score = np.zeros(n_attempts)
+
+    # Weighted score with the profile's bonuses
+    weights = profile["weights"]
+    weighted_score = (weights["interval"] * interval_score +
+                      weights["pattern"] * pattern_score +
+                      weights["speed"] * speed_score)
+
+    cutoff, base, pivot, slope = profile["interval_bonus"]
+    weighted_score = weighted_score + np.where(
+        interval_score > cutoff, base + (interval_score - pivot) * slope, 0.0)
+
+    if profile["factor_bonus"] is not None:
+        cutoff, slope = profile["factor_bonus"]
+        best_factor = np.maximum(pattern_score, speed_score)
+        weighted_score = weighted_score + np.where(best_factor > cutoff, (best_factor - cutoff) * slope, 0.0)
+
+    if profile["consistency_bonus"] is not None:
+        max_gap, bonus = profile["consistency_bonus"]
+        weighted_score = weighted_score + np.where(
+            np.abs(pattern_score - interval_score) < max_gap, bonus, 0.0)
+
+    # Authentication criteria
+    security_settings = profile["security_settings"]
+    interval_minimum, secondary_minimum, overall_threshold = security_settings.get(
+        compiled.security_level, security_settings["high"])
+    if profile["use_user_threshold"]:
+        overall_threshold = compiled.threshold / 100.0
+
+    interval_passed = interval_score >= interval_minimum
+    secondary_passed = (pattern_score >= secondary_minimum) | (speed_score >= secondary_minimum)
+    threshold_passed = weighted_score >= overall_threshold
+
+    return {
+        "pattern_score": pattern_score,
+        "interval_score": interval_score,
+        "speed_score": speed_score,
+        "weighted_score": weighted_score,
+        "interval_passed": interval_passed,
+        "secondary_passed": secondary_passed,
+        "threshold_passed": threshold_passed,
+        "accepted": interval_passed & secondary_passed & threshold_passed,
+        "threshold": overall_threshold
+    }
+
+
+def score_attempt(compiled, intervals, profile=LOCKSCREEN_PROFILE):
+    """Score a single attempt and return plain Python floats and bools"""
+    attempts = np.asarray(intervals, dtype=np.float64).reshape(1, -1)
+    result = _score_matrix(compiled, attempts, profile)
+
+    scores = {}
+    for key, value in result.items():
+        if key == "threshold":
+            scores[key] = float(value)
+        elif value.dtype == bool:
+            scores[key] = bool(value[0])
+        else:
+            scores[key] = float(value[0])
+    return scores
+
+
+def verify_batch(model, intervals_matrix, profile=LOCKSCREEN_PROFILE):
+    """
+    Score an (N, k) matrix of attempts against a model in one call.
+
+    Args:
+        model: CompiledModel or model dictionary as saved by the training wizard
+        intervals_matrix: Array-like of shape (N, k), one attempt per row
+        profile: Scoring profile to apply
+
+    Returns:
+        Dict of length-N arrays (pattern_score, interval_score, speed_score,
+        weighted_score, interval_passed, secondary_passed, threshold_passed,
+        accepted) plus the scalar threshold that was applied
+    """
+    compiled = model if isinstance(model, CompiledModel) else compile_model(model)
+
+    attempts = np.asarray(intervals_matrix, dtype=np.float64)
+    if attempts.ndim == 1:
+        attempts = attempts.reshape(1, -1)
+    if attempts.ndim != 2:
+        raise ValueError(f"Expected an (N, k) matrix of attempts, got shape {attempts.shape}")
+    if compiled.num_features and attempts.shape[1] != compiled.num_features:
+        raise ValueError(f"Attempts have {attempts.shape[1]} features, model expects {compiled.num_features}")
+
+    return _score_matrix(compiled, attempts, profile)
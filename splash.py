@@ -1,21 +1,22 @@
 import tkinter as tk
 import subprocess
 import threading
-import os
 import time
+import readiness
 
-LOCK_FILE = "training.lock"
 EXECUTABLE = "Training.exe"  # Update if needed
 TIMEOUT = 100  # Max wait time in seconds
 
-# Function to check for training.lock and close the splash
-def wait_for_lock(root):
-    while not os.path.exists(LOCK_FILE):
-        if os.path.exists(LOCK_FILE):
-            root.destroy() # Close if lock file appears
-            return
-        time.sleep(0.5)  # Check every 0.5 seconds
-    root.destroy()  # Auto-close after timeout
+# Readiness of the training app, announced as soon as its window is up
+ready_channel = readiness.ReadinessChannel("training")
+training_ready = threading.Event()
+
+# Function to wait for the training app and close the splash
+def wait_for_ready(root):
+    if not ready_channel.wait(readiness.READY, TIMEOUT):
+        print("Training app did not report ready in time")
+    training_ready.set()
+    root.after(0, root.destroy)  # Close on the Tk thread
 
 # Function to start Training.exe
 def start_executable():
@@ -52,16 +53,16 @@ progress_rect = canvas.create_rectangle(0, 0, 0, 10, fill="gray")  #gray progres
 
 # Looping progress bar animation
 def animate():
-    while not os.path.exists(LOCK_FILE):
+    while not training_ready.is_set():
         for i in range(0, 251, 10):  # Forward animation
-            if os.path.exists(LOCK_FILE):
+            if training_ready.is_set():
                 return
             canvas.coords(progress_rect, 0, 0, i, 10)
             root.update_idletasks()
             time.sleep(0.05)
 
         for i in range(0, 251, 10):  # Reverse animation
-            if os.path.exists(LOCK_FILE):
+            if training_ready.is_set():
                 return
             canvas.coords(progress_rect, 0, 0, i, 10)
             root.update_idletasks()
@@ -85,8 +86,8 @@ threading.Thread(target=start_executable, daemon=True).start()
 threading.Thread(target=animate, daemon=True).start()
 threading.Thread(target=fade_in, daemon=True).start()
 
-# Start the lock file checker in a new thread
-threading.Thread(target=wait_for_lock, args=(root,), daemon=True).start()
+# Wait for the training app's ready signal in a new thread
+threading.Thread(target=wait_for_ready, args=(root,), daemon=True).start()
 
 # Run the splash screen
 root.mainloop()
\ No newline at end of file
@@ -0,0 +1,163 @@
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# One JSON record per lockscreen launch; aggregate with: python startup_profile.py [log] [--last N]
+PROFILE_LOG_PATH = "lockscreen_startup.jsonl"
+
+# Phases in the order they normally happen
+PROCESS_START = "process_start"
+SHOW_SIGNAL = "show_signal"        # Warm start only: the detector asked the hidden lockscreen to show
+FIRST_FRAME = "first_frame"        # The window has been drawn
+HOOK_INSTALLED = "hook_installed"  # Low-level keyboard hook in place
+MODEL_LOADED = "model_loaded"
+MATRIX_RUNNING = "matrix_running"  # First matrix rain frame
+INPUT_READY = "input_ready"        # Password prompt shown
+PHASES = (PROCESS_START, SHOW_SIGNAL, FIRST_FRAME, HOOK_INSTALLED, MODEL_LOADED, MATRIX_RUNNING, INPUT_READY)
+
+# The record is written as soon as all of these have been marked
+FINAL_PHASES = (MATRIX_RUNNING, INPUT_READY)
+
+PERCENTILES = (50, 90, 99)
+
+
+def process_start_time():
+    """Monotonic time at which this process was created (import time if it cannot be told)"""
+    try:
+        import win32api
+        import win32process
+        created = win32process.GetProcessTimes(win32api.GetCurrentProcess())["CreationTime"]
+        return time.monotonic() - (time.time() - created.timestamp())
+    except Exception:
+        pass
+    try:
+        import psutil
+        return time.monotonic() - (time.time() - psutil.Process().create_time())
+    except Exception:
+        return time.monotonic()
+
+
+class StartupProfile:
+    """Monotonic timestamps of the startup phases of one launch"""
+
+    def __init__(self, path=PROFILE_LOG_PATH, warm=False, start=None):
+        self.path = path
+        self.warm = warm
+        self.start = process_start_time() if start is None else start
+        self.launched = datetime.now()
+        self.marks = {PROCESS_START: 0.0}  # phase -> ms since process start
+        self.written = False
+        self.lock = threading.Lock()  # Phases are marked from the Tk thread and the loader thread
+
+    def mark(self, phase):
+        """Record the first time a phase is reached; writes the record once the final phases are in"""
+        with self.lock:
+            if phase in self.marks or self.written:
+                return
+            self.marks[phase] = (time.monotonic() - self.start) * 1000
+            complete = all(final in self.marks for final in FINAL_PHASES)
+        if complete:
+            self.write()
+
+    def record(self):
+        return {
+            "launched": self.launched.isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "warm": self.warm,
+            "complete": all(final in self.marks for final in FINAL_PHASES),
+            "phases_ms": {phase: round(ms, 1) for phase, ms in sorted(self.marks.items(), key=lambda item: item[1])}
+        }
+
+    def write(self):
+        """Append this launch to the log (once; later calls do nothing)"""
+        with self.lock:
+            if self.written:
+                return
+            self.written = True
+            record = self.record()
+        try:
+            with open(self.path, "a") as log_file:
+                log_file.write(json.dumps(record) + "\n")
+            logging.info("Startup timeline: " + ", ".join(f"{phase} {ms:.0f} ms"
+                                                          for phase, ms in record["phases_ms"].items()))
+        except OSError as e:
+            logging.error(f"Error writing startup profile: {e}")
+
+
+def read_records(path):
+    """Launch records of a profile log, skipping lines that do not parse"""
+    records = []
+    with open(path) as log_file:
+        for line in log_file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list"""
+    index = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def phase_table(records):
+    """
+    Percentiles of every phase, measured from when the lockscreen was asked
+    to appear (process start, or the show signal of a warm start).
+
+    Returns:
+        List of (phase, count, {percentile: ms}, max ms) in phase order
+    """
+    durations = {}
+    for record in records:
+        phases = record.get("phases_ms", {})
+        origin = phases.get(SHOW_SIGNAL, 0.0)
+        for phase, ms in phases.items():
+            if phase in (PROCESS_START, SHOW_SIGNAL) or ms < origin:
+                continue
+            durations.setdefault(phase, []).append(ms - origin)
+
+    rows = []
+    for phase in PHASES:
+        values = sorted(durations.get(phase, []))
+        if values:
+            rows.append((phase, len(values), {p: percentile(values, p) for p in PERCENTILES}, values[-1]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Percentiles of the lockscreen startup phases")
+    parser.add_argument("log", nargs="?", default=PROFILE_LOG_PATH)
+    parser.add_argument("--last", type=int, help="only the most recent N launches")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"No startup profile at {args.log}")
+        sys.exit(1)
+    records = read_records(args.log)
+    if args.last:
+        records = records[-args.last:]
+
+    for label, warm in (("cold starts", False), ("warm starts", True)):
+        subset = [record for record in records if bool(record.get("warm")) == warm]
+        if not subset:
+            continue
+        incomplete = sum(not record.get("complete") for record in subset)
+        print(f"{label}: {len(subset)} launches ({incomplete} incomplete), "
+              f"ms since {'the show signal' if warm else 'process start'}")
+        print(f"    {'phase':<16} {'n':>5} " + " ".join(f"{'p' + str(p):>8}" for p in PERCENTILES) + f" {'max':>8}")
+        for phase, count, values, worst in phase_table(subset):
+            print(f"    {phase:<16} {count:>5} " + " ".join(f"{values[p]:>8.0f}" for p in PERCENTILES)
+                  + f" {worst:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
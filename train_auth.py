@@ -1,7 +1,11 @@
 import time
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-import pickle
+import model_store
+import scoring
+from adaptive_enrollment import DEFAULT_ADAPTATION_SETTINGS
+import keystroke_capture
+import readiness
+from running_stats import RunningIntervalStats
 import tkinter as tk
 import winshell
 from win32com.client import Dispatch
@@ -90,7 +94,8 @@ class KeystrokeAuthApp:
             # Configuration data
             "password": "",
             "training_data": [],
-            "scaler": None,
+            "scaler_mean": None,
+            "scaler_scale": None,
             "threshold_value": THRESHOLD,
             "security_questions": {},
             "matrix_settings": {
@@ -100,7 +105,8 @@ class KeystrokeAuthApp:
                 "matrix_speed": 10,  # Fixed value
                 "matrix_density": 5   # Fixed value
             },
-            "security_level": "high"  # Default security level for hybrid system
+            "security_level": "high",  # Default security level for hybrid system
+            "adaptive_enrollment": dict(DEFAULT_ADAPTATION_SETTINGS)  # Opt-in learning from unlocks
         }
         
         # Set password variable
@@ -114,7 +120,7 @@ class KeystrokeAuthApp:
         self.setup_styles()
         
         # Check if model exists before showing UI
-        self.has_existing_model = os.path.exists("typing_model.pkl")
+        self.has_existing_model = model_store.model_exists()
         
         # Setup main UI components
         self.setup_ui()
@@ -706,7 +712,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         
         # Store in wizard state
         self.wizard_state["password"] = new_password
-        self.num_features = len(new_password) - 1
+        self.num_features = keystroke_capture.feature_count(len(new_password))
         
         # Update UI
         self.update_status(self.password_status_text, 
@@ -792,6 +798,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         self.train_entry = ttk.Entry(entry_frame, width=20, font=('Arial', 12), show="•", state=tk.DISABLED)
         self.train_entry.pack(side=tk.LEFT, padx=(0, 10))
         self.train_entry.bind("<Key>", self.on_key_press_training)
+        self.train_entry.bind("<KeyRelease>", self.on_key_release_training)
         self.train_entry.bind("<Return>", self.on_return_press_training)
         
         # Status area in right frame
@@ -804,11 +811,13 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         
         # Training variables
         self.training_data = []
+        self.training_stats = None  # Running per-interval statistics, updated per accepted attempt
         self.current_attempt = 0
         self.max_attempts = 5
         self.recording = False
         self.key_times = []
-        self.last_key_time = None
+        self.key_capture = keystroke_capture.KeystrokeCapture()
+        self.key_record = keystroke_capture.KeystrokeRecord()  # Press/release times of the current attempt
     
     def start_training(self):
         # Get the password from wizard state
@@ -821,6 +830,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         self.recording = False
         self.current_attempt = 0
         self.training_data = []
+        self.training_stats = None
         
         # Reset UI
         self.progress_var.set(0)
@@ -834,13 +844,18 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         self.train_entry.config(state=tk.NORMAL)  # Enable entry field
         self.save_training_button.config(state=tk.DISABLED)  # Disable save button during training
         
+        # Timestamp keys in a low-level hook while training (Windows only)
+        keystroke_capture.install_recording_hook(self.key_capture)
+        
         # Start first attempt
         self.prepare_for_next_attempt()
     
     def reset_training(self):
         self.recording = False
+        keystroke_capture.uninstall_recording_hook()
         self.current_attempt = 0
         self.training_data = []
+        self.training_stats = None
         
         # Reset UI
         self.progress_var.set(0)
@@ -867,14 +882,16 @@ The user bears full responsibility, if any inappropriate occurance by the applic
             # Update progress
             self.attempt_label.config(text=f"{self.current_attempt}/5 attempts")
             
-            # Reset key times for new attempt
+            # Reset key times for new attempt (and drop keys captured before it)
             self.key_times = []
-            self.last_key_time = None
+            self.key_record.clear()
+            self.key_capture.clear()
             
             # Ready to record
             self.recording = True
         else:
             # Training complete, enable save button
+            keystroke_capture.uninstall_recording_hook()
             self.train_button.config(text="Start Training", state=tk.NORMAL)
             self.train_entry.config(state=tk.DISABLED)  # Disable entry field after training
             self.save_training_button.config(state=tk.NORMAL)  # Enable save button
@@ -885,10 +902,11 @@ The user bears full responsibility, if any inappropriate occurance by the applic
     def on_key_press_training(self, event):
         if self.recording:
             if event.char and event.char.isalnum():
-                current_time = time.time()
-                if self.last_key_time is not None:
-                    self.key_times.append(current_time - self.last_key_time)
-                self.last_key_time = current_time
+                self.key_record.press(event.keycode, self.key_capture.take_press(event.keycode))
+
+    def on_key_release_training(self, event):
+        if self.recording:
+            self.key_record.release(event.keycode, self.key_capture.take_release(event.keycode))
 
     def on_return_press_training(self, event):
         if not self.recording:
@@ -902,8 +920,13 @@ The user bears full responsibility, if any inappropriate occurance by the applic
             self.train_entry.delete(0, tk.END)
             # Reset for this attempt
             self.key_times = []
-            self.last_key_time = None
+            self.key_record.clear()
+            self.key_capture.clear()
             return
+        
+        # Down-down, dwell and flight times of the attempt
+        self.key_times = self.key_record.features() if len(self.key_record) == len(current_password) else []
+        down_down = keystroke_capture.channel_slices(len(current_password))["down_down"]
             
         if len(self.key_times) == self.num_features:
 
@@ -912,7 +935,8 @@ The user bears full responsibility, if any inappropriate occurance by the applic
                     prev_attempt = self.training_data[-1]  # Compare with last saved attempt (not failed ones)
                 else:
                     prev_attempt = self.key_times  # First attempt, no comparison needed
-                deviation = np.linalg.norm(np.array(self.key_times) - np.array(prev_attempt))  # Euclidean distance
+                # Euclidean distance between the down-down intervals
+                deviation = np.linalg.norm(np.array(self.key_times[down_down]) - np.array(prev_attempt[down_down]))
         
                 max_allowed_deviation = 0.75  # Adjust this value based on testing
         
@@ -920,12 +944,21 @@ The user bears full responsibility, if any inappropriate occurance by the applic
                     self.update_status(self.train_status_text, "❌ Training attempt rejected: Typing too inconsistent.")
                     self.train_entry.delete(0, tk.END)
                     self.key_times = []  # Reset this attempt
-                    self.last_key_time = None
+                    self.key_record.clear()
+                    self.key_capture.clear()
                     return  # Reject the attempt
 
             self.training_data.append(self.key_times)
+            
+            # Fold the attempt into the running statistics (O(k) per attempt)
+            if self.training_stats is None:
+                self.training_stats = RunningIntervalStats(self.num_features)
+            self.training_stats.push(self.key_times)
+            
             self.update_status(self.train_status_text, f"✓ Attempt {self.current_attempt + 1} recorded successfully.")
-            self.update_status(self.train_status_text, f"  Typing intervals: {[f'{t:.3f}s' for t in self.key_times]}")
+            self.update_status(self.train_status_text, f"  Typing intervals: {[f'{t:.3f}s' for t in self.key_times[down_down]]}")
+            if self.training_stats.count >= 2:
+                self.update_status(self.train_status_text, f"  Recommended threshold so far: {self.training_stats.recommended_threshold(down_down)}%")
             
             # Update progress
             self.current_attempt += 1
@@ -936,10 +969,11 @@ The user bears full responsibility, if any inappropriate occurance by the applic
             self.recording = False
             self.root.after(1000, self.prepare_for_next_attempt)
         else:
-            self.update_status(self.train_status_text, f"❌ Invalid recording. Expected {self.num_features} intervals, got {len(self.key_times)}.")
+            self.update_status(self.train_status_text, f"❌ Invalid recording. Expected {len(current_password)} keys, got {len(self.key_record)}.")
             # Reset for this attempt
             self.key_times = []
-            self.last_key_time = None
+            self.key_record.clear()
+            self.key_capture.clear()
             self.train_entry.delete(0, tk.END)
 
     def process_training_data(self):
@@ -949,44 +983,43 @@ The user bears full responsibility, if any inappropriate occurance by the applic
             return False
                 
         train_data = np.array(self.training_data)
-        scaler = StandardScaler()
-        scaled_train_data = scaler.fit_transform(train_data)
-        
-        # Calculate self-similarity scores for training data
-        self_similarities = []
-        for i in range(len(scaled_train_data)):
-            test_sample = scaled_train_data[i:i+1]
-            remaining_samples = np.delete(scaled_train_data, i, axis=0)
-            sim = self.similarity_score(test_sample, remaining_samples, 1)  # Using 1 to calculate raw similarity
-            self_similarities.append(sim)
+        channels = keystroke_capture.channel_slices(len(self.wizard_state["password"]))
+        down_down = channels["down_down"]
 
-        avg_typing_speed_per_interval = np.mean(train_data, axis=0) if train_data.shape[0] > 0 else np.zeros(train_data.shape[1])
-        std_dev_typing_speed_per_interval = np.std(train_data, axis=0) if train_data.shape[0] > 0 else np.ones(train_data.shape[1]) * 0.01
+        # Running statistics are kept up to date as attempts are accepted;
+        # rebuild them only if the sample list was changed behind their back
+        stats = self.training_stats
+        if stats is None or stats.count != len(train_data) or stats.num_features != train_data.shape[1]:
+            stats = RunningIntervalStats.from_samples(train_data)
+            self.training_stats = stats
 
-        global_avg_speed = np.mean(avg_typing_speed_per_interval)
-        global_std_dev = np.mean(std_dev_typing_speed_per_interval)
-        if global_std_dev == 0:
-            global_std_dev = 0.01
+        scaler_mean, scaler_scale = stats.scaler()
+        scaled_train_data = (train_data - scaler_mean) / scaler_scale
+        
+        # Leave-one-out self-similarity of every training sample (raw similarity, reference 1)
+        self_similarities = scoring.self_similarities(scaled_train_data, 1)
+
+        # Typing speed is measured on the down-down intervals only
+        global_avg_speed, global_std_dev = stats.speed_stats(down_down)
         
         avg_self_similarity = np.mean(self_similarities)
         min_self_similarity = np.min(self_similarities)
 
-        interval_means = np.mean(train_data, axis=0)
-        interval_stds = np.std(train_data, axis=0)
-        lower_thresholds = interval_means - 1.5 * interval_stds
-        upper_thresholds = interval_means + 1.5 * interval_stds
+        lower_thresholds, upper_thresholds = stats.bounds()
         
         # Store temporarily
         self.processed_training = {
             "avg_typing_speed": global_avg_speed,
             "std_dev_typing_speed": global_std_dev,
             "train_data": scaled_train_data,
-            "scaler": scaler,
+            "scaler_mean": scaler_mean,
+            "scaler_scale": scaler_scale,
             "avg_self_similarity": avg_self_similarity,
             "min_self_similarity": min_self_similarity,
             "raw_training_data": train_data,  # Add raw data
             "interval_lower_thresholds": lower_thresholds,  # Add lower thresholds
-            "interval_upper_thresholds": upper_thresholds   # Add upper thresholds
+            "interval_upper_thresholds": upper_thresholds,  # Add upper thresholds
+            "feature_channels": list(keystroke_capture.FEATURE_CHANNELS)
         }
         
         # Add hybrid security elements
@@ -997,34 +1030,16 @@ The user bears full responsibility, if any inappropriate occurance by the applic
             "speed": 0.2
         }
         
-        interval_stds = np.std(train_data, axis=0)
-        consistency_factor = 1.0 - (np.mean(interval_stds) / np.mean(np.mean(train_data, axis=0)))
-
-        # Get training data
-        raw_data = self.processed_training.get("raw_training_data", [])
-    
-        # Calculate consistency ratio (lower = more consistent)
-        avg_intervals = np.mean(raw_data, axis=0)
-        std_devs = np.std(raw_data, axis=0)
-    
-        # Simple ratio of average standard deviation to average interval
-        consistency_ratio = np.mean(std_devs) / np.mean(avg_intervals)
-    
-        # Convert to consistency score (higher = more consistent)
-        # Typical values range from 0.1 (very consistent) to 0.5+ (inconsistent)
-        consistency_score = max(0, min(1, 1 - (consistency_ratio * 2)))
-    
-        # Map to threshold range
-        recommended = 50 + (consistency_score * 35)
-    
-        # Recommended threshold
-        recommended_threshold =(int(recommended / 5) * 5) - 3
+        # Recommended threshold from the consistency of the training samples
+        recommended_threshold = stats.recommended_threshold(down_down)
 
         # Update UI
         self.update_status(self.train_status_text, "\n✅ Training Complete!")
         self.update_status(self.train_status_text, "\nYour typing rhythm statistics:", clear=True)
-        self.update_status(self.train_status_text, f"\n• Average intervals: {[f'{t:.3f}s' for t in np.mean(train_data, axis=0)]}")
-        self.update_status(self.train_status_text, f"• Standard deviations: {[f'{t:.3f}s' for t in np.std(train_data, axis=0)]}")
+        self.update_status(self.train_status_text, f"\n• Average intervals: {[f'{t:.3f}s' for t in stats.mean[down_down]]}")
+        self.update_status(self.train_status_text, f"• Standard deviations: {[f'{t:.3f}s' for t in stats.std[down_down]]}")
+        self.update_status(self.train_status_text, f"• Average key hold (dwell): {[f'{t:.3f}s' for t in stats.mean[channels['dwell']]]}")
+        self.update_status(self.train_status_text, f"• Average release to next key (flight): {[f'{t:.3f}s' for t in stats.mean[channels['flight']]]}")
         self.update_status(self.train_status_text, "\nClick 'Save Training' to save these results.")
         self.update_status(self.train_status_text, f"\n✅ RECOMMENDED THRESHOLD based on the training: {recommended_threshold}%")
         
@@ -1040,7 +1055,8 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         
         # Save processed data to wizard state
         self.wizard_state["training_data"] = self.processed_training["train_data"]
-        self.wizard_state["scaler"] = self.processed_training["scaler"]
+        self.wizard_state["scaler_mean"] = self.processed_training["scaler_mean"]
+        self.wizard_state["scaler_scale"] = self.processed_training["scaler_scale"]
         self.wizard_state["avg_self_similarity"] = self.processed_training["avg_self_similarity"]
         self.wizard_state["min_self_similarity"] = self.processed_training["min_self_similarity"]
         self.wizard_state["raw_training_data"] = self.processed_training["raw_training_data"]
@@ -1048,6 +1064,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         self.wizard_state["interval_upper_thresholds"] = self.processed_training["interval_upper_thresholds"]
         self.wizard_state["avg_typing_speed"] = self.processed_training.get("avg_typing_speed", 0)
         self.wizard_state["std_dev_typing_speed"] = self.processed_training.get("std_dev_typing_speed", 0)
+        self.wizard_state["feature_channels"] = self.processed_training["feature_channels"]
 
         if self.model is None:
             self.model = {}
@@ -1067,68 +1084,6 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         # Move to the threshold tab automatically
         self.go_to_next_step()
 
-    def similarity_score(self, test_features, train_features, avg_self_similarity):
-        """Calculate similarity score without threshold comparison."""
-        # Calculate distances to all training samples
-        distances = [np.linalg.norm(test_features - train_sample) 
-                    for train_sample in train_features]
-        
-        # Average distance to all training samples
-        avg_distance = np.mean(distances)
-        
-        # Convert distance to similarity score (closer to 1.0 is better)
-        similarity = avg_self_similarity / (avg_self_similarity + avg_distance)
-        
-        # Cap at 1.0 and ensure non-negative
-        return max(0.0, min(similarity, 1.0))
-
-    # NEW FUNCTION: Calculate pattern score
-    def calculate_pattern_score(self, test_features, train_features, avg_self_similarity):
-        """Calculate pattern similarity score (0.0 to 1.0)."""
-        # Calculate distances to all training samples
-        distances = [np.linalg.norm(test_features - train_sample) for train_sample in train_features]
-        avg_distance = np.mean(distances)
-
-        # Add a tolerance factor (0.3 means 30% more lenient)
-        tolerance_factor = 0.3
-        adjusted_distance = avg_distance * (1 - tolerance_factor)
-        
-        # Convert distance to similarity score (closer to 1.0 is better)
-        similarity = avg_self_similarity / (avg_self_similarity + avg_distance)
-        
-        # Cap at 1.0 and ensure non-negative
-        return max(0.0, min(similarity, 1.0))
-    
-    # NEW FUNCTION: Calculate interval score
-    def calculate_interval_score(self, test_intervals, lower_thresholds, upper_thresholds):
-        """Calculate interval matching score (0.0 to 1.0)."""
-        # Check how many intervals are within acceptable ranges
-        within_bounds = []
-        for i, interval in enumerate(test_intervals):
-            if i < len(lower_thresholds):
-                lower = lower_thresholds[i]
-                upper = upper_thresholds[i]
-                within_bounds.append(lower <= interval <= upper)
-        
-        # Return percentage of intervals that match
-        if not within_bounds:
-            return 0.0
-        
-        return sum(within_bounds) / len(within_bounds)
-
-    # NEW FUNCTION: Calculate speed score  
-    def calculate_speed_score(self, test_intervals, avg_typing_speed, std_dev_typing_speed):
-        """Calculate speed consistency score (0.0 to 1.0)."""
-        # Calculate current typing speed
-        current_avg_speed = np.mean(test_intervals)
-        
-        # Calculate how many standard deviations from the mean
-        z_score = abs((current_avg_speed - avg_typing_speed) / max(std_dev_typing_speed, 0.001))
-        
-        # Convert to score (0.0 to 1.0)
-        # A z-score of 2.0 or greater results in a score of 0.0
-        return max(0.0, min(1.0 - (z_score / 2.0), 1.0))
-
     def verify_hybrid(self, keystroke_times, model):
         """
         Verify keystroke pattern using the enhanced hybrid security approach.
@@ -1140,48 +1095,14 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         Returns:
             Tuple of (is_authenticated, security_score, details)
         """
-        # Convert to numpy array
-        keystroke_times = np.array(keystroke_times)
-        
-        # Calculate pattern score
-        test_features = keystroke_times.reshape(1, -1)
-        test_scaled = model["scaler"].transform(test_features)[0]
-        train_data = model.get("train_data", model.get("training_data", None))
-        pattern_score = self.calculate_pattern_score(test_scaled, train_data, model["avg_self_similarity"])
-        
-        # Calculate interval score
-        lower_bounds = model["interval_lower_thresholds"]
-        upper_bounds = model["interval_upper_thresholds"]
-
-        # Add padding to the bounds 
-        lower_bounds = [bound * 0.80 for bound in lower_bounds]
-        upper_bounds = [bound * 1.20 for bound in upper_bounds]
-
-        interval_score = self.calculate_interval_score(keystroke_times, lower_bounds, upper_bounds)
-        
-        # Calculate speed score
-        speed_score = self.calculate_speed_score(
-            keystroke_times, 
-            model.get("avg_typing_speed", 0), 
-            model.get("std_dev_typing_speed", 0.001)
-        )
-        
-        # Get security level settings
-        security_settings = {
-            # Each entry contains (interval_minimum, secondary_minimum, overall_threshold)
-            "low":       (0.50, 0.40, 0.70),
-            "medium":    (0.65, 0.52, 0.80),
-            "high":      (0.75, 0.60, 0.85),
-            "very_high": (0.85, 0.68, 0.90)
-        }
-        
-        # Get security level from model or use default
-        security_level = model.get("security_level", "high")
-        interval_minimum, secondary_minimum, overall_threshold = security_settings.get(
-            security_level, security_settings["high"])
+        # Score the attempt with the shared engine using the hybrid profile
+        scores = scoring.score_attempt(scoring.compile_model(model), keystroke_times, scoring.HYBRID_PROFILE)
+        interval_score = scores["interval_score"]
+        pattern_score = scores["pattern_score"]
+        speed_score = scores["speed_score"]
         
         # Check if interval score meets the minimum requirement
-        if interval_score < interval_minimum:
+        if not scores["interval_passed"]:
             return False, 0.0, {
                 "reason": "Interval score below minimum requirement",
                 "scores": {
@@ -1192,7 +1113,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
             }
         
         # Check if at least one secondary factor meets minimum requirement
-        if pattern_score < secondary_minimum and speed_score < secondary_minimum:
+        if not scores["secondary_passed"]:
             return False, 0.0, {
                 "reason": "Both secondary factors below minimum requirements",
                 "scores": {
@@ -1202,20 +1123,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
                 }
             }
         
-        # Calculate weighted score with 50/30/20 weighting
-        weights = {"interval": 0.5, "pattern": 0.3, "speed": 0.2}
-        weighted_score = (
-            weights["interval"] * interval_score +
-            weights["pattern"] * pattern_score +
-            weights["speed"] * speed_score
-        )
-        
-        # Add bonus for excellence in interval matching
-        if interval_score > 0.90:
-            weighted_score += 0.05
-        
-        # Check overall threshold
-        is_authenticated = weighted_score >= overall_threshold
+        weighted_score = scores["weighted_score"]
         
         details = {
             "scores": {
@@ -1224,11 +1132,11 @@ The user bears full responsibility, if any inappropriate occurance by the applic
                 "speed": speed_score,
                 "weighted": weighted_score
             },
-            "threshold": overall_threshold,
-            "security_level": security_level
+            "threshold": scores["threshold"],
+            "security_level": model.get("security_level", "high")
         }
         
-        return is_authenticated, weighted_score, details
+        return scores["threshold_passed"], weighted_score, details
 
      # UPDATED FUNCTION: Modified setup_threshold_tab
     def setup_threshold_tab(self):
@@ -1347,6 +1255,21 @@ The user bears full responsibility, if any inappropriate occurance by the applic
     
             ttk.Label(level_frame, text=f" - {description}", font=('Arial', 9)).pack(side=tk.LEFT, padx=5)
         
+        # Adaptive enrollment (opt-in)
+        adaptive_frame = ttk.LabelFrame(left_frame, text="Adaptive Enrollment", padding="10 10 10 10")
+        adaptive_frame.pack(fill=tk.X, pady=10)
+
+        self.adaptive_var = tk.BooleanVar(value=self.wizard_state["adaptive_enrollment"]["enabled"])
+        ttk.Checkbutton(
+            adaptive_frame,
+            text="Keep learning my typing rhythm from successful unlocks",
+            variable=self.adaptive_var,
+            command=self.update_adaptive_enrollment
+        ).pack(anchor=tk.W, pady=2)
+        ttk.Label(adaptive_frame,
+                  text=f"Uses the last {DEFAULT_ADAPTATION_SETTINGS['window_size']} accepted unlocks as training samples",
+                  font=('Arial', 9)).pack(anchor=tk.W)
+
         # Status area in right frame
         self.threshold_status_text = scrolledtext.ScrolledText(right_frame, font=('Consolas', 10), height=15)
         self.threshold_status_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -1359,6 +1282,10 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         """Update the wizard state when security level changes"""
         self.wizard_state["security_level"] = self.security_level_var.get()
 
+    def update_adaptive_enrollment(self):
+        """Update the wizard state when adaptive enrollment is toggled"""
+        self.wizard_state["adaptive_enrollment"]["enabled"] = self.adaptive_var.get()
+
     def on_threshold_change(self, value):
         """Update threshold value display and security level display"""
         threshold_value = int(float(value))
@@ -2093,10 +2020,11 @@ The user bears full responsibility, if any inappropriate occurance by the applic
             # Verify password used for training matches current password
             if hasattr(self, 'processed_training') and self.processed_training:
                 # If we have processed training data but the password has changed
-                training_password_length = len(self.processed_training["raw_training_data"][0]) + 1
-                current_password_length = len(self.wizard_state["password"])
+                training_feature_count = len(self.processed_training["raw_training_data"][0])
+                current_feature_count = keystroke_capture.feature_count(
+                    len(self.wizard_state["password"]), self.processed_training["feature_channels"])
             
-                if training_password_length != current_password_length:
+                if training_feature_count != current_feature_count:
                     messagebox.showerror(
                         "Password Mismatch", 
                         "The password used for training doesn't match your current password. " +
@@ -2104,12 +2032,16 @@ The user bears full responsibility, if any inappropriate occurance by the applic
                     )
                     return
 
+            # Adaptation state only describes the training data it was built from
+            keep_adaptation_state = False
+
             # IMPORTANT: Check for unsaved but processed training data
             if hasattr(self, 'processed_training') and self.processed_training:
                 # User has completed training but didn't click "Save Training"
                 # Automatically save the processed training data without asking
                 self.wizard_state["training_data"] = self.processed_training["train_data"]
-                self.wizard_state["scaler"] = self.processed_training["scaler"]
+                self.wizard_state["scaler_mean"] = self.processed_training["scaler_mean"]
+                self.wizard_state["scaler_scale"] = self.processed_training["scaler_scale"]
                 self.wizard_state["avg_self_similarity"] = self.processed_training["avg_self_similarity"]
                 self.wizard_state["min_self_similarity"] = self.processed_training["min_self_similarity"]
                 self.wizard_state["raw_training_data"] = self.processed_training["raw_training_data"]
@@ -2117,14 +2049,17 @@ The user bears full responsibility, if any inappropriate occurance by the applic
                 self.wizard_state["interval_upper_thresholds"] = self.processed_training["interval_upper_thresholds"]
                 self.wizard_state["avg_typing_speed"] = self.processed_training.get("avg_typing_speed", 0)
                 self.wizard_state["std_dev_typing_speed"] = self.processed_training.get("std_dev_typing_speed", 0)
+                self.wizard_state["feature_channels"] = self.processed_training["feature_channels"]
 
             elif self.edit_mode and self.model:
                 training_data = self.wizard_state.get("training_data")
                 if training_data is None or (isinstance(training_data, (list, np.ndarray)) and len(training_data) == 0):
 
                     # No new training data, but we're in edit mode - use original data
+                    keep_adaptation_state = True
                     self.wizard_state["training_data"] = self.model.get("train_data", [])
-                    self.wizard_state["scaler"] = self.model.get("scaler", None)
+                    self.wizard_state["scaler_mean"] = self.model.get("scaler_mean", None)
+                    self.wizard_state["scaler_scale"] = self.model.get("scaler_scale", None)
                     self.wizard_state["avg_self_similarity"] = self.model.get("avg_self_similarity", 0)
                     self.wizard_state["min_self_similarity"] = self.model.get("min_self_similarity", 0)
                     self.wizard_state["raw_training_data"] = self.model.get("raw_training_data", [])
@@ -2132,6 +2067,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
                     self.wizard_state["interval_upper_thresholds"] = self.model.get("interval_upper_thresholds", [])
                     self.wizard_state["avg_typing_speed"] = self.model.get("avg_typing_speed", 0)
                     self.wizard_state["std_dev_typing_speed"] = self.model.get("std_dev_typing_speed", 0)
+                    self.wizard_state["feature_channels"] = list(keystroke_capture.model_channels(self.model))
 
             # Create model if it doesn't exist
             if self.model is None:
@@ -2140,13 +2076,15 @@ The user bears full responsibility, if any inappropriate occurance by the applic
             # Copy core data from wizard state
             self.model["password"] = self.wizard_state["password"]
             self.model["train_data"] = self.wizard_state["training_data"]
-            self.model["scaler"] = self.wizard_state["scaler"]
+            self.model["scaler_mean"] = self.wizard_state["scaler_mean"]
+            self.model["scaler_scale"] = self.wizard_state["scaler_scale"]
             self.model["threshold"] = self.wizard_state["threshold_value"]
             self.model["security_questions"] = self.wizard_state["security_questions"]
             self.model["matrix_settings"] = self.wizard_state["matrix_settings"]
             
             # Add hybrid security parameters
             self.model["security_level"] = self.wizard_state.get("security_level", "high")
+            self.model["adaptive_enrollment"] = self.wizard_state["adaptive_enrollment"]
             self.model["weights"] = {
                 "interval": 0.5,
                 "pattern": 0.3,
@@ -2168,10 +2106,14 @@ The user bears full responsibility, if any inappropriate occurance by the applic
                 self.model["avg_typing_speed"] = self.wizard_state["avg_typing_speed"]
             if "std_dev_typing_speed" in self.wizard_state:
                 self.model["std_dev_typing_speed"] = self.wizard_state["std_dev_typing_speed"]
+            if "feature_channels" in self.wizard_state:
+                self.model["feature_channels"] = self.wizard_state["feature_channels"]
+            if not keep_adaptation_state:
+                for key in model_store.ADAPTATION_STATE_KEYS:
+                    self.model.pop(key, None)
             
-            # Save the final model
-            with open("typing_model.pkl", "wb") as f:
-                pickle.dump(self.model, f)
+            # Save the final model in compiled form
+            self.model = model_store.save_model(self.model)
             
             # Create startup shortcut
             self.create_bat_shortcut()
@@ -2199,20 +2141,19 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         model = {
             "password": self.wizard_state["password"],
             "train_data": self.wizard_state["training_data"],
-            "scaler": self.wizard_state["scaler"],
+            "scaler_mean": self.wizard_state["scaler_mean"],
+            "scaler_scale": self.wizard_state["scaler_scale"],
             "avg_self_similarity": self.wizard_state["avg_self_similarity"],
             "min_self_similarity": self.wizard_state["min_self_similarity"],
             "threshold": self.wizard_state["threshold_value"],
             "security_questions": self.wizard_state["security_questions"],
-            "matrix_settings": self.wizard_state["matrix_settings"]
+            "matrix_settings": self.wizard_state["matrix_settings"],
+            "adaptive_enrollment": self.wizard_state["adaptive_enrollment"],
+            "feature_channels": self.wizard_state.get("feature_channels", list(keystroke_capture.LEGACY_CHANNELS))
         }
         
-        # Save to disk
-        with open("typing_model.pkl", "wb") as model_file:
-            pickle.dump(model, model_file)
-        
-        # Store in self.model so we can access it later
-        self.model = model
+        # Save to disk and store in self.model so we can access it later
+        self.model = model_store.save_model(model)
         
         # Create shortcut to 0.bat in the Startup folder
         shortcut_created = self.create_bat_shortcut()
@@ -2420,10 +2361,12 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         button_frame.pack(fill=tk.X, pady=15)
         
         # Variables to track typing pattern verification
-        key_times = []
-        last_key_time = [None]  # Use list to allow modification in nested functions
+        key_record = keystroke_capture.KeystrokeRecord()
+        key_capture = keystroke_capture.KeystrokeCapture()
+        keystroke_capture.install_recording_hook(key_capture)
         password = self.model["password"]
-        num_features = len(password) - 1
+        channels = keystroke_capture.model_channels(self.model)
+        compiled_model = scoring.compile_model(self.model)
         
         # Function to verify password and typing pattern
         def verify_authentication():
@@ -2434,90 +2377,29 @@ The user bears full responsibility, if any inappropriate occurance by the applic
             if entered_password != actual_password:
                 status_var.set("STATUS: Password:✘ Interval:✘ Pattern:✘")
                 password_entry.delete(0, tk.END)
-                key_times.clear()
-                last_key_time[0] = None
+                key_record.clear()
+                key_capture.clear()
                 password_entry.focus()
                 return
         
             # Then verify typing pattern
-            if len(key_times) != num_features:
+            if len(key_record) != len(password):
                 status_var.set("STATUS: Password:✘ Interval:✘ Pattern:✘")
                 password_entry.delete(0, tk.END)
-                key_times.clear()
-                last_key_time[0] = None
+                key_record.clear()
+                key_capture.clear()
                 password_entry.focus()
                 return
         
-            # Use the verification logic
-            # 1. Calculate pattern score
-            test_features = np.array([key_times])
-            test_features_scaled = self.model["scaler"].transform(test_features)
-            train_data = self.model["train_data"]
-            avg_self_similarity = self.model["avg_self_similarity"]
-            pattern_score = self.calculate_pattern_score(test_features_scaled[0], train_data, avg_self_similarity)
-    
-            # 2. Calculate interval score
-            lower_bounds = self.model["interval_lower_thresholds"]
-            upper_bounds = self.model["interval_upper_thresholds"]
-
-            # Add padding to the bounds for more forgiveness (15% additional tolerance)
-            lower_bounds = [bound * 0.00 for bound in lower_bounds]
-            upper_bounds = [bound * 2.00 for bound in upper_bounds]
-            interval_score = self.calculate_interval_score(key_times, lower_bounds, upper_bounds)
-    
-            # 3. Calculate speed score
-            avg_typing_speed = self.model.get("avg_typing_speed", 0)
-            std_dev_typing_speed = self.model.get("std_dev_typing_speed", 0.01)
-            speed_score = self.calculate_speed_score(
-                key_times, 
-                avg_typing_speed, 
-                std_dev_typing_speed
-            )
-    
-            # Get security level settings
-            security_settings = {
-                "low":       (0.25, 0.30, 0.50),
-                "medium":    (0.30, 0.35, 0.60),
-                "high":      (0.40, 0.40, 0.65),
-                "very_high": (0.50, 0.50, 0.70)
-            }
-    
-            # Get security level from model or use default
-            security_level = self.model.get("security_level", "high")
-            interval_minimum, secondary_minimum, overall_threshold = security_settings.get(
-                security_level, security_settings["high"])
-    
-            # IMPORTANT: Use the user's configured threshold instead
-            user_threshold = self.model["threshold"] / 100.0  # Convert percentage to decimal
-            overall_threshold = user_threshold
-
-            # Calculate weighted score with 40/40/20 weighting
-            weights = {"interval": 0.40, "pattern": 0.40, "speed": 0.20}
-            weighted_score = (
-                weights["interval"] * interval_score +
-                weights["pattern"] * pattern_score +
-                weights["speed"] * speed_score
-            )
-
-            # Bonus for excellent interval matching
-            if interval_score > 0.90:
-                interval_bonus = 0.05 + ((interval_score - 0.70) * 0.80)
-                weighted_score += interval_bonus
-
-            # Bonus for excellence in any factor
-            best_factor = max(pattern_score, speed_score)
-            if best_factor > 0.8:
-                factor_bonus = (best_factor - 0.8) * 0.25
-                weighted_score += factor_bonus
-
-            # Consistency bonus
-            if abs(pattern_score - interval_score) < 0.2:
-                weighted_score += 0.05
+            # Score the attempt with the shared engine
+            scores = scoring.score_attempt(compiled_model, key_record.features(channels), scoring.VERIFY_DIALOG_PROFILE)
+            weighted_score = scores["weighted_score"]
+            overall_threshold = scores["threshold"]
             
-            # STEP 5: Evaluate authentication criteria
-            interval_passed = interval_score >= interval_minimum
-            secondary_passed = pattern_score >= secondary_minimum or speed_score >= secondary_minimum
-            threshold_passed = weighted_score >= overall_threshold
+            # Evaluate authentication criteria
+            interval_passed = scores["interval_passed"]
+            secondary_passed = scores["secondary_passed"]
+            threshold_passed = scores["threshold_passed"]
         
             # Create status indicators
             password_status = "✔"
@@ -2541,26 +2423,34 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         
             # Reset for another attempt
             password_entry.delete(0, tk.END)
-            key_times.clear()
-            last_key_time[0] = None
+            key_record.clear()
+            key_capture.clear()
             password_entry.focus()
             
         
         # Capture key press times
         def on_key_press(event):
             if event.char and event.char.isalnum():
-                current_time = time.time()
-                if last_key_time[0] is not None:
-                    key_times.append(current_time - last_key_time[0])
-                last_key_time[0] = current_time
+                key_record.press(event.keycode, key_capture.take_press(event.keycode))
+        
+        # Capture key release times
+        def on_key_release(event):
+            key_record.release(event.keycode, key_capture.take_release(event.keycode))
         
         # Handle the Enter key pressed
         def on_return_press(event):
             verify_authentication()
             
+        # Remove the recording hook whenever the dialog goes away
+        def on_destroy(event):
+            if event.widget is verify_window:
+                keystroke_capture.uninstall_recording_hook()
+        
         # Bind key events
         password_entry.bind("<Key>", on_key_press)
+        password_entry.bind("<KeyRelease>", on_key_release)
         password_entry.bind("<Return>", on_return_press)
+        verify_window.bind("<Destroy>", on_destroy)
         
         # Verify button
         verify_button = ttk.Button(button_frame, text="Verify & Delete", 
@@ -2580,8 +2470,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
     def load_model(self):
         """Load an existing model file"""
         try:
-            with open("typing_model.pkl", "rb") as model_file:
-                self.model = pickle.load(model_file)
+            self.model = model_store.load_model()
                 
             # Add buttons to edit and delete model
             self.add_model_buttons()
@@ -2602,17 +2491,22 @@ The user bears full responsibility, if any inappropriate occurance by the applic
             # Transfer model data to wizard state
             self.wizard_state["password"] = self.model["password"]
             self.wizard_state["training_data"] = self.model["train_data"]
-            self.wizard_state["scaler"] = self.model["scaler"]
+            self.wizard_state["scaler_mean"] = self.model["scaler_mean"]
+            self.wizard_state["scaler_scale"] = self.model["scaler_scale"]
             self.wizard_state["avg_self_similarity"] = self.model["avg_self_similarity"]
             self.wizard_state["min_self_similarity"] = self.model["min_self_similarity"]
             self.wizard_state["threshold_value"] = self.model["threshold"]
             self.wizard_state["security_questions"] = self.model["security_questions"]
             self.wizard_state["matrix_settings"] = self.model["matrix_settings"]
             self.wizard_state["security_level"] = self.model.get("security_level", "high")
+            self.wizard_state["adaptive_enrollment"] = dict(DEFAULT_ADAPTATION_SETTINGS,
+                                                            **self.model.get("adaptive_enrollment", {}))
+            self.wizard_state["feature_channels"] = list(keystroke_capture.model_channels(self.model))
             
             # Set password variable
             self.password.set(self.model["password"])
-            self.num_features = len(self.model["password"]) - 1
+            # Retraining always records every channel
+            self.num_features = keystroke_capture.feature_count(len(self.model["password"]))
             
             # Mark steps as completed
             for step in self.steps[:-1]:  # All except summary
@@ -2657,6 +2551,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
     
         security_level = self.wizard_state.get("security_level", "high")
         self.security_level_var.set(security_level)
+        self.adaptive_var.set(self.wizard_state["adaptive_enrollment"]["enabled"])
 
         # Define color and display_text based on security level
         display_text = "Medium Security"  # Default value
@@ -2701,6 +2596,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
                 self.training_data = self.model["raw_training_data"]
 
             self.current_attempt = len(self.training_data)
+            self.training_stats = RunningIntervalStats.from_samples(self.training_data)
         
             # Update UI to show training is already complete
             self.progress_var.set(5)  # Set to max
@@ -2718,6 +2614,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         else:
             # Only reset if no data found
             self.training_data = []
+            self.training_stats = None
             self.current_attempt = 0
             self.progress_var.set(0)
             self.attempt_label.config(text="0/5 attempts")
@@ -2746,8 +2643,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
     def delete_model(self):
         """Delete the existing model file"""
         # Delete file if it exists
-        if os.path.exists("typing_model.pkl"):
-            os.remove("typing_model.pkl")
+        model_store.delete_model()
             
         self.delete_bat_shortcut()
             
@@ -2755,7 +2651,8 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         self.wizard_state = {
             "password": "",
             "training_data": [],
-            "scaler": None,
+            "scaler_mean": None,
+            "scaler_scale": None,
             "threshold_value": THRESHOLD,
             "security_questions": {},
             "matrix_settings": {
@@ -2765,7 +2662,8 @@ The user bears full responsibility, if any inappropriate occurance by the applic
                 "matrix_speed": 10,
                 "matrix_density": 5
             },
-            "security_level": "high"
+            "security_level": "high",
+            "adaptive_enrollment": dict(DEFAULT_ADAPTATION_SETTINGS)
         }
         
         # Clear model reference
@@ -2809,6 +2707,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         
         # Reset training tab
         self.training_data = []
+        self.training_stats = None
         self.current_attempt = 0
         self.progress_var.set(0)
         self.attempt_label.config(text="0/5 attempts")
@@ -2821,6 +2720,7 @@ The user bears full responsibility, if any inappropriate occurance by the applic
         # Reset threshold tab
         self.threshold_var.set(THRESHOLD)
         self.security_level_var.set("high")
+        self.adaptive_var.set(False)
         self.update_status(self.threshold_status_text, "Adjust the threshold slider and click 'Save Threshold Setting'.", clear=True)
         
         # Reset security questions tab
@@ -2857,4 +2757,10 @@ The user bears full responsibility, if any inappropriate occurance by the applic
 if __name__ == "__main__":
     root = tk.Tk()
     app = KeystrokeAuthApp(root)
+    
+    # Tell the splash screen the moment the window is up, and when we go away
+    ready_channel = readiness.ReadinessChannel("training")
+    root.after_idle(lambda: ready_channel.signal(readiness.READY))
+    atexit.register(lambda: ready_channel.signal(readiness.EXITING))
+    
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,333 @@
+import logging
+import sys
+import threading
+
+try:
+    import win32gui
+except ImportError:
+    win32gui = None
+
+logger = logging.getLogger('LockDetector')
+
+# Every this many refreshes the titles of all visible windows are read again
+# (titles are otherwise only read for new windows and windows that just became visible)
+TITLE_RECHECK_REFRESHES = 20
+
+# With notifications the index is still rebuilt from a full enumeration
+# every this many counts, in case a notification was missed
+RESYNC_COUNTS = 50
+
+# Most changed windows remembered between counts; beyond that the next
+# count rebuilds the index from a full enumeration instead
+MAX_DIRTY_WINDOWS = 1024
+
+
+class WindowSource:
+    """Top-level windows as the tracker sees them; the Win32 one or a synthetic list"""
+
+    available = True
+
+    def handles(self):
+        """Handles of the current top-level windows"""
+        raise NotImplementedError
+
+    def is_visible(self, hwnd):
+        raise NotImplementedError
+
+    def has_title(self, hwnd):
+        raise NotImplementedError
+
+    def exists(self, hwnd):
+        raise NotImplementedError
+
+    def subscribe(self, notify):
+        """
+        Call notify(hwnd) from any thread when a top-level window is
+        created, destroyed, shown, hidden or retitled. Returns False if the
+        source cannot notify; the tracker then enumerates on every count.
+        """
+        return False
+
+    def unsubscribe(self):
+        """Stop the notifications started by subscribe()"""
+
+
+class Win32WindowSource(WindowSource):
+    """EnumWindows for the handles; IsWindowVisible is a cheap style check, GetWindowText a message round trip"""
+
+    available = win32gui is not None
+
+    def __init__(self):
+        self.event_thread = None
+
+    def handles(self):
+        hwnds = []
+        win32gui.EnumWindows(lambda hwnd, found: found.append(hwnd), hwnds)
+        return hwnds
+
+    def is_visible(self, hwnd):
+        return bool(win32gui.IsWindowVisible(hwnd))
+
+    def has_title(self, hwnd):
+        return bool(win32gui.GetWindowText(hwnd))
+
+    def exists(self, hwnd):
+        return bool(win32gui.IsWindow(hwnd))
+
+    def subscribe(self, notify):
+        """WinEvent hooks for window creation, destruction, visibility and title changes"""
+        if not self.available or sys.platform != "win32":
+            return False
+        self.event_thread = WinEventThread(notify)
+        if self.event_thread.start():
+            return True
+        self.unsubscribe()
+        return False
+
+    def unsubscribe(self):
+        if self.event_thread is not None:
+            self.event_thread.stop()
+            self.event_thread = None
+
+
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+    EVENT_OBJECT_CREATE = 0x8000
+    EVENT_OBJECT_DESTROY = 0x8001
+    EVENT_OBJECT_HIDE = 0x8003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    OBJID_WINDOW = 0
+    CHILDID_SELF = 0
+    GA_PARENT = 1
+    WM_QUIT = 0x0012
+
+    _WINEVENTPROC = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND, wintypes.LONG,
+                                       wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+    _user32 = ctypes.WinDLL('user32', use_last_error=True)
+    _user32.SetWinEventHook.restype = wintypes.HANDLE
+    _user32.UnhookWinEvent.argtypes = (wintypes.HANDLE,)
+    _user32.GetAncestor.restype = wintypes.HWND
+    _user32.GetAncestor.argtypes = (wintypes.HWND, wintypes.UINT)
+    _user32.GetDesktopWindow.restype = wintypes.HWND
+    _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+
+    class WinEventThread:
+        """
+        Out-of-context WinEvent hooks on a thread of their own.
+
+        Windows delivers the events through the installing thread's message
+        loop, so the thread does nothing but pump messages. Only events of
+        top-level windows themselves (not their child objects) are passed on.
+        """
+
+        # (first, last) event ranges: create/destroy/show/hide, and title changes.
+        # Location changes sit between the two and fire constantly, so they are left out.
+        RANGES = ((EVENT_OBJECT_CREATE, EVENT_OBJECT_HIDE), (EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE))
+
+        def __init__(self, notify):
+            self.notify = notify
+            self.proc = _WINEVENTPROC(self.on_event)  # Referenced here so it outlives the hooks
+            self.desktop = _user32.GetDesktopWindow()
+            self.hooks = []
+            self._thread = None
+            self._thread_id = None
+            self._installed = threading.Event()
+
+        def start(self, timeout=2.0):
+            """Install the hooks; returns False if Windows refused them"""
+            self._thread = threading.Thread(target=self._run, name="window-events", daemon=True)
+            self._thread.start()
+            self._installed.wait(timeout)
+            return len(self.hooks) == len(self.RANGES)
+
+        def _run(self):
+            self._thread_id = _kernel32.GetCurrentThreadId()
+            for first, last in self.RANGES:
+                hook = _user32.SetWinEventHook(first, last, None, self.proc, 0, 0, WINEVENT_OUTOFCONTEXT)
+                if hook:
+                    self.hooks.append(hook)
+            installed = len(self.hooks) == len(self.RANGES)
+            if not installed:
+                logger.info(f"Window event hooks unavailable ({ctypes.get_last_error()}), enumerating instead")
+            self._installed.set()
+
+            if installed:
+                msg = wintypes.MSG()
+                while _user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                    _user32.TranslateMessage(ctypes.byref(msg))
+                    _user32.DispatchMessageW(ctypes.byref(msg))
+            for hook in self.hooks:
+                _user32.UnhookWinEvent(hook)
+
+        def on_event(self, hook, event, hwnd, id_object, id_child, thread, time_ms):
+            if not hwnd or id_object != OBJID_WINDOW or id_child != CHILDID_SELF:
+                return
+            # A destroyed window cannot be checked for being top-level; the tracker ignores unknown handles
+            if event == EVENT_OBJECT_DESTROY or _user32.GetAncestor(hwnd, GA_PARENT) == self.desktop:
+                self.notify(hwnd)
+
+        def stop(self):
+            """Remove the hooks and end the thread"""
+            if self._thread is not None and self._thread.is_alive():
+                _user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+                self._thread.join(1.0)
+
+
+class WindowTracker:
+    """
+    Index of top-level windows: hwnd -> (visible, has_title), with the
+    number of visible titled windows kept up to date.
+
+    When the source notifies window changes, count() only re-reads the
+    windows that changed since the previous count and rebuilds the index
+    from a full enumeration every RESYNC_COUNTS counts, as a fallback for
+    missed notifications. Without notifications every count refreshes.
+
+    The notifications are system-wide hooks that wake this process for
+    every window change on the desktop, so they are only subscribed on the
+    first count() (a detector that never polls never pays for them) and
+    removed again by stop(). Changes collapse into a bounded set of dirty
+    windows, so nothing grows between counts however long they are apart.
+
+    A refresh enumerates the handles and checks visibility, but reads the
+    title (the expensive part, a message to the owning thread) only for new
+    windows and windows that just became visible, plus all visible ones
+    every TITLE_RECHECK_REFRESHES refreshes.
+    """
+
+    def __init__(self, source=None, notifications=True):
+        self.source = source or Win32WindowSource()
+        self.windows = {}  # hwnd -> (visible, has_title)
+        self.visible_titled = 0  # Windows counted by the lock signal
+        self.use_notifications = notifications
+        self.subscribed = False  # subscribe() was tried (on the first count)
+        self.notified = False    # ... and the source notifies
+        self.dirty = set()       # Windows changed since the last count (notifier thread adds)
+        self.overflowed = False  # Too many changes to remember: enumerate on the next count
+        self.lock = threading.Lock()
+        self.counts = 0
+
+        # Counters
+        self.refreshes = 0
+        self.notifications = 0
+        self.visibility_queries = 0
+        self.title_queries = 0
+        self.full_scan_queries = 0  # Title queries of a full scan per refresh
+
+    @property
+    def available(self):
+        return self.source.available
+
+    def refresh(self):
+        """
+        Diff the window list against the index.
+
+        Returns:
+            (created, destroyed): sets of hwnds since the previous refresh
+        """
+        recheck_titles = self.refreshes % TITLE_RECHECK_REFRESHES == 0
+        self.refreshes += 1
+        handles = set(self.source.handles())
+
+        destroyed = self.windows.keys() - handles
+        for hwnd in destroyed:
+            visible, titled = self.windows.pop(hwnd)
+            self.visible_titled -= visible and titled
+
+        created = set()
+        for hwnd in handles:
+            visible = self.source.is_visible(hwnd)
+            self.visibility_queries += 1
+            if visible:
+                self.full_scan_queries += 1
+
+            previous = self.windows.get(hwnd)
+            if previous is None:
+                created.add(hwnd)
+                titled = self.read_title(hwnd) if visible else False
+            else:
+                was_visible, titled = previous
+                self.visible_titled -= was_visible and titled
+                if visible and (not was_visible or recheck_titles):
+                    titled = self.read_title(hwnd)
+            self.windows[hwnd] = (visible, titled)
+            self.visible_titled += visible and titled
+        return created, destroyed
+
+    def notify(self, hwnd):
+        """Mark a window as changed (any thread); the next count() re-reads it"""
+        with self.lock:
+            self.notifications += 1
+            if self.overflowed:
+                return
+            self.dirty.add(hwnd)
+            if len(self.dirty) > MAX_DIRTY_WINDOWS:
+                self.dirty = set()
+                self.overflowed = True
+
+    def take_dirty(self):
+        """
+        Windows changed since the last call.
+
+        Returns:
+            (set of hwnds, whether changes were lost to the bound and a refresh is needed)
+        """
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            overflowed, self.overflowed = self.overflowed, False
+        return dirty, overflowed
+
+    def apply_notifications(self, dirty):
+        """Re-read the windows that changed"""
+        for hwnd in dirty:
+            previous = self.windows.pop(hwnd, None)
+            if previous is not None:
+                visible, titled = previous
+                self.visible_titled -= visible and titled
+            # Whatever the change, the window's current state is what counts
+            if not self.source.exists(hwnd):
+                continue
+
+            visible = self.source.is_visible(hwnd)
+            self.visibility_queries += 1
+            titled = self.read_title(hwnd) if visible else False
+            self.windows[hwnd] = (visible, titled)
+            self.visible_titled += visible and titled
+
+    def read_title(self, hwnd):
+        self.title_queries += 1
+        return self.source.has_title(hwnd)
+
+    def count(self):
+        """Number of visible titled windows, updated from the notifications (or a refresh)"""
+        resync = self.counts % RESYNC_COUNTS == 0
+        if self.use_notifications and not self.subscribed:
+            # Subscribe before refreshing so no change falls in between
+            self.subscribed = True
+            self.notified = self.source.subscribe(self.notify)
+            resync = True
+
+        dirty, overflowed = self.take_dirty()
+        if not self.notified or overflowed or resync:
+            self.refresh()
+        self.counts += 1
+        # Re-reading is idempotent, so windows the refresh already saw cost a query but stay right
+        self.apply_notifications(dirty)
+        return self.visible_titled
+
+    def stop(self):
+        """Remove the notification hooks; the next count() subscribes again"""
+        if self.notified:
+            self.source.unsubscribe()
+        self.subscribed = False
+        self.notified = False
+        self.take_dirty()
+
+    def summary(self):
+        """Counters as one log line"""
+        return (f"Window tracker: {self.refreshes} refreshes of {len(self.windows)} windows, "
+                f"{self.notifications} notifications, "
+                f"{self.title_queries} title queries (vs {self.full_scan_queries} with a full scan)")